@@ -1,7 +1,18 @@
 # document/controller.py
 
+import threading
+import time
+
 from document.parser import DocumentParser
 from executor.python_executor import PythonExecutor
+from executor.result_cache import ExecutionCache
+from executor.block_pool import BlockPool
+from executor.limits import ExecutionLimits
+from executor.dataflow import DataflowGraph, analyze
+from executor.output_capture import collect_spill, read_page
+from executor.result_cache import code_key
+from executor.profiling import report_table
+from document import outputs_store
 from document.element import PythonElement
 
 
@@ -9,43 +20,256 @@ class DocumentController:
     def __init__(self, html_renderer):
         self.parser = DocumentParser()
         self.html_renderer = html_renderer
-        self.executor = PythonExecutor()
+        # 記憶體 / CPU / wall time / 輸出量上限，kernel 與 block pool 共用
+        self.limits = ExecutionLimits()
+        self.executor = PythonExecutor(limits=self.limits)
+        self.exec_cache = ExecutionCache()   # ★ 預覽時沿用程式碼沒變的 block 輸出
+        # 一般模式下需要執行的 block 平行送進 process pool（False：依序交給 kernel）
+        self.parallel_blocks = True
+        self.block_pool = BlockPool(limits=self.limits)
+        collect_spill()    # 清掉之前留下的過長輸出檔
+        # 開檔時從 sidecar 讀回的 nocache block 輸出（code hash → output），第一次預覽時使用
+        self._restored = {}
         self.doc_model = None   # ★ 保存目前的文件模型
+        self.last_execution_ms = None   # 上次 render_with_execution 執行 block 花的時間
+
+        # 筆記本模式：block 共用 namespace，只重跑改變的 block 與其 downstream
+        self.notebook_mode = False
+        self._nb_outputs = {}      # code → 上次在共用 namespace 執行的輸出
+        self._nb_session = None    # 上次執行時的 executor.session
+        # 預覽（LivePreview worker）與 Run（WebBridge worker）都會讀寫上面兩項
+        self._nb_lock = threading.RLock()
 
     def parse_text(self, raw_text: str):
         self.doc_model = self.parser.parse(raw_text)
         return self.doc_model
 
-    def execute_block(self, elem_id: str) -> str:
-        """給 WebChannel 用，只執行一個 block"""
+    def render_text(self, raw_text: str):
+        """
+        parse + 執行 + render，回傳 (doc_model, html, base_url)。
+        不改動 self.doc_model 與 renderer 的狀態（可在 worker thread 呼叫；
+        結果採用時再由 GUI 呼叫 adopt）。parser 每次新建，不與 GUI thread 共用。
+        """
+        doc_model = DocumentParser().parse(raw_text)
+        html, base_url = self.render_with_execution(doc_model, activate=False)
+        return doc_model, html, base_url
+
+    def adopt(self, doc_model) -> None:
+        """render_text 的結果要顯示了：成為目前的文件模型（GUI thread 呼叫）"""
+        self.doc_model = doc_model
+        self.html_renderer.activate(doc_model)
+
+    def set_notebook_mode(self, enabled: bool) -> None:
+        """切換筆記本模式；共用 namespace 一律清空重來"""
+        with self._nb_lock:
+            self.notebook_mode = enabled
+            self.executor.reset()
+            self._nb_outputs = {}
+            self._nb_session = None
+
+    def execute_block(self, elem_id: str, on_output=None, on_dependent=None,
+                      on_start=None) -> str:
+        """
+        給 WebChannel 用，只執行一個 block；on_output(text) 會陸續收到執行中的輸出。
+        筆記本模式下接著重跑相依於它的 block，每跑完一個呼叫 on_dependent(elem_id, output)。
+        on_start() 在這個 block 真正開始執行時呼叫；每個 block 以 elem_id 當 tag 執行，
+        executor.interrupt(elem_id) 只會中斷這個 block。
+        """
+        if self.notebook_mode:
+            with self._nb_lock:
+                return self._execute_block_notebook(elem_id, on_output, on_dependent, on_start)
+
         for elem in self.doc_model.elements:
             if elem.id == elem_id and isinstance(elem, PythonElement):
-                out = self.executor.run(elem.code)
+                # 按 Run：一定重新執行，結果更新到 cache
+                out = self.executor.run(elem.code, on_output=on_output, profile=elem.profile,
+                                        tag=elem_id, on_start=on_start)
                 elem.output = out
+                elem.cached = False
+                if elem.cacheable:
+                    self.exec_cache.put(elem.code, out)
                 return out
         return ""
 
     # ----------------------------------------------------------
     # ★ 修改重點：先跑完所有 Block，填入 output，再一次 Render
     # ----------------------------------------------------------
-    def render_with_execution(self, doc_model):
+    def render_with_execution(self, doc_model, activate=True):
         """
         1. 遍歷 doc_model，遇到 PythonElement 就執行
         2. 將結果寫入 element.output
         3. 呼叫 render 產生最終 HTML (這時 HTML 就已經包含 output 了)
+        activate 見 HtmlRenderer.render（背景預覽傳 False）
         """
 
         # 1) 執行所有 python 區塊
-        #    注意：因為我們用同一個 executor，變數狀態會保留 (Jupyter-style)
-        for elem in doc_model.elements:
-            if isinstance(elem, PythonElement):
-                # 執行並獲取字串結果
-                result = self.executor.run(elem.code)
-                # ★ 存回 element
-                elem.output = result if result else "[無輸出]"
+        t0 = time.perf_counter()
+        blocks = [e for e in doc_model.elements if isinstance(e, PythonElement)]
+        if self.notebook_mode:
+            with self._nb_lock:
+                self._execute_notebook(blocks)
+        else:
+            self._execute_cached(blocks)
+        self.last_execution_ms = (time.perf_counter() - t0) * 1000
 
         # 2) 轉成 HTML (Render 時會讀取 element.output)
-        html, base_url = self.html_renderer.render(doc_model)
+        html, base_url = self.html_renderer.render(doc_model, activate=activate)
 
         # 3) 不需要再做 replace("</body>") 了，因為結果已經在 inline 裡面
-        return html, base_url
\ No newline at end of file
+        return html, base_url
+
+    def _execute_cached(self, blocks):
+        """
+        一般模式：程式碼沒變的 block 直接用 cache 的輸出；nocache 的每次都重跑。
+        需要執行的 block 彼此獨立，數量夠多時平行執行，結果仍依文件順序寫回。
+        """
+        results = {}
+        pending = []
+        self.exec_cache.ensure_capacity(len(blocks))
+        for elem in blocks:
+            if elem.cacheable:
+                result = self.exec_cache.get(elem.code)
+            else:
+                result = self._restored.pop(code_key(elem.code), None)
+            elem.cached = result is not None
+            if result is None:
+                pending.append(elem)
+            else:
+                results[elem.id] = result
+
+        if self.parallel_blocks and len(pending) >= self.block_pool.min_batch:
+            outputs = self.block_pool.run_all([e.code for e in pending],
+                                              [e.profile for e in pending])
+        else:
+            # 執行並獲取字串結果
+            outputs = [self.executor.run(e.code, profile=e.profile) for e in pending]
+
+        for elem, result in zip(pending, outputs):
+            if elem.cacheable:
+                self.exec_cache.put(elem.code, result)
+            else:
+                self.exec_cache.skipped += 1
+            results[elem.id] = result
+
+        for elem in blocks:
+            result = results[elem.id]
+            # ★ 存回 element
+            elem.output = result if result else "[無輸出]"
+
+    # ----------------------------------------------------------
+    # 筆記本模式：block 共用 namespace，只重跑改變的 block 與其 downstream
+    # ----------------------------------------------------------
+    def _execute_notebook(self, blocks):
+        """
+        blocks：文件順序的 PythonElement。
+        需要重跑的：新的或改過的 block、nocache 的 block、
+        使用到「已刪除 block 所定義名稱」的 block，以及它們所有的 downstream
+        （含之後重新定義同名變數的 block，見 DataflowGraph.downstream）。
+        呼叫端持有 _nb_lock。
+        """
+        graph = DataflowGraph([b.code for b in blocks])
+
+        self.executor.warm()     # kernel 先啟動，session 才是這次執行用的
+        prev = self._nb_outputs
+        session = self.executor.session
+        if session != self._nb_session:
+            prev = {}    # kernel 重啟過：之前的變數都不在了，全部重跑
+
+        dirty = {i for i, b in enumerate(blocks) if b.code not in prev or not b.cacheable}
+        removed = set(prev) - {b.code for b in blocks}
+        if removed:
+            names = set().union(*(analyze(code)[0] for code in removed))
+            dirty |= graph.users_of(names)
+
+        to_run = graph.downstream(dirty)
+        outputs = {}
+        for i, b in enumerate(blocks):
+            if i in to_run:
+                out = self.executor.run(b.code, shared=True, profile=b.profile)
+            else:
+                out = prev[b.code]
+            b.output = out
+            b.cached = i not in to_run
+            outputs[b.code] = out
+
+        self._nb_outputs = outputs
+        # 執行途中 kernel 重啟（逾時、當掉）：下次全部重跑
+        self._nb_session = session if self.executor.session == session else None
+
+    def _execute_block_notebook(self, elem_id, on_output, on_dependent, on_start=None):
+        blocks = [e for e in self.doc_model.elements if isinstance(e, PythonElement)]
+        index = next((i for i, b in enumerate(blocks) if b.id == elem_id), None)
+        if index is None:
+            return ""
+
+        graph = DataflowGraph([b.code for b in blocks])
+        self.executor.warm()
+        session = self.executor.session
+        output = ""
+        for i in sorted(graph.downstream({index})):
+            b = blocks[i]
+            b.cached = False
+            if i == index:
+                output = b.output = self.executor.run(b.code, on_output=on_output,
+                                                      shared=True, profile=b.profile,
+                                                      tag=b.id, on_start=on_start)
+            else:
+                b.output = self.executor.run(b.code, shared=True, profile=b.profile, tag=b.id)
+                if on_dependent is not None:
+                    on_dependent(b.id, b.output)
+            self._nb_outputs[b.code] = b.output
+
+        if self.executor.session != session:
+            self._nb_session = None
+        return output
+
+    # ----------------------------------------------------------
+    # sidecar：筆記旁邊保存的 block 輸出
+    # ----------------------------------------------------------
+    def restore_outputs(self, note_path: str) -> int:
+        """
+        開檔時呼叫：讀回 sidecar 的輸出，程式碼 hash 相同的 block 預覽時直接顯示。
+        回傳讀到的輸出數。
+        """
+        outputs = outputs_store.load_outputs(note_path)
+        self.exec_cache.ensure_capacity(len(outputs))
+        for key, output in outputs.items():
+            self.exec_cache.put_key(key, output)
+        self._restored = outputs
+        return len(outputs)
+
+    def save_outputs(self, note_path: str) -> None:
+        """存檔時呼叫：把目前預覽的 block 輸出寫到 sidecar"""
+        if self.doc_model is None:
+            return
+        blocks = [e for e in self.doc_model.elements if isinstance(e, PythonElement)]
+        try:
+            outputs_store.save_outputs(note_path, blocks)
+        except OSError:
+            pass    # sidecar 寫不進去不影響筆記本身
+
+    def output_page(self, elem_id: str, page: int):
+        """回傳 (完整輸出第 page 頁的文字, 總頁數)"""
+        for elem in self.doc_model.elements:
+            if elem.id == elem_id and isinstance(elem, PythonElement) and elem.output:
+                return read_page(elem.output, page)
+        raise KeyError(elem_id)
+
+    def execution_report(self) -> str:
+        """每個 block 的 wall / CPU 時間與記憶體峰值，依 wall time 排序的文字報表"""
+        if self.doc_model is None:
+            return report_table([])
+        rows = []
+        for elem in self.doc_model.elements:
+            if isinstance(elem, PythonElement):
+                first_line = elem.code.strip().splitlines()[0] if elem.code.strip() else ""
+                label = f"{elem.id}: {first_line[:50]}"
+                rows.append((label, elem.stats, elem.cached))
+        report = report_table(rows)
+        if self.last_execution_ms is not None:
+            report += f"\n\n上次預覽的執行階段共 {self.last_execution_ms:.0f} ms"
+        return report
+
+    def cache_stats(self) -> dict:
+        """執行結果 cache 的統計：entries / hits / misses / skipped"""
+        return self.exec_cache.stats()
\ No newline at end of file
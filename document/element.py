@@ -1,12 +1,15 @@
 # document/element.py
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, Set, Tuple
 
 
 @dataclass
 class BaseElement:
     id: str = None
     meta: Optional[Dict] = None
+    # 原始文字中的位置：[start, end) 字元範圍，以及 (第一行, 最後一行)，0-based
+    src_range: Optional[Tuple[int, int]] = None
+    src_lines: Optional[Tuple[int, int]] = None
 
 
 @dataclass
@@ -32,7 +35,25 @@ class ImageElement(BaseElement):
 
 
 class PythonElement(BaseElement):
-    def __init__(self, code: str, elem_id: str = None):
+    def __init__(self, code: str, elem_id: str = None, flags: Optional[Set[str]] = None):
         super().__init__(id=elem_id)
         self.code = code
-        self.output: Optional[str] = None
\ No newline at end of file
+        self.output: Optional[str] = None
+        # fence 上的選項：```python nocache / ```python profile
+        self.flags: Set[str] = set(flags or ())
+        # 這次預覽的輸出是否沿用 cache（沒有重新執行）
+        self.cached = False
+
+    @property
+    def profile(self) -> bool:
+        return "profile" in self.flags
+
+    @property
+    def cacheable(self) -> bool:
+        # profile 的目的是量測這次執行，每次都重跑
+        return "nocache" not in self.flags and not self.profile
+
+    @property
+    def stats(self) -> Optional[Dict]:
+        """執行量測（wall_ms / cpu_ms / rss_kb / peak_kb），見 executor.profiling"""
+        return getattr(self.output, "stats", None)
\ No newline at end of file
@@ -0,0 +1,77 @@
+# document/outputs_store.py
+"""
+python block 輸出的 sidecar 檔：筆記 foo.md 旁邊的 foo.md.outputs.json。
+
+存檔時寫入每個 block 的輸出與產生它的程式碼 hash；
+開檔時先讀回來，程式碼 hash 相同的 block 直接顯示上次的輸出，不必重新執行。
+
+格式：
+{
+  "version": 1,
+  "blocks": [{"hash": "<sha256(code)>", "output": "...",
+              "stats": {"wall_ms": ..., "cpu_ms": ..., "rss_kb": ..., "peak_kb": ...}}, ...]
+}
+過長輸出只存預覽用的開頭 + 結尾（完整內容的 spill 檔是暫存檔，不跟著筆記保存）。
+"""
+
+import json
+import os
+from typing import Dict, Iterable
+
+from document.element import PythonElement
+from executor.output_capture import ExecutionResult
+from executor.result_cache import code_key, is_transient
+
+FORMAT_VERSION = 1
+SUFFIX = ".outputs.json"
+
+
+def sidecar_path(note_path: str) -> str:
+    return note_path + SUFFIX
+
+
+def save_outputs(note_path: str, blocks: Iterable[PythonElement]) -> None:
+    """寫入 sidecar；沒有可保存的輸出時刪除舊的 sidecar"""
+    entries = []
+    for elem in blocks:
+        output = elem.output
+        if not output or is_transient(output):
+            continue
+        entries.append({
+            "hash": code_key(elem.code),
+            "output": str(output),
+            "stats": getattr(output, "stats", None),
+        })
+
+    path = sidecar_path(note_path)
+    if not entries:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "blocks": entries}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_outputs(note_path: str) -> Dict[str, str]:
+    """回傳 {code hash: output}；沒有 sidecar 或格式不符時回傳空 dict"""
+    try:
+        with open(sidecar_path(note_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+        return {}
+
+    outputs = {}
+    for entry in data.get("blocks", []):
+        try:
+            output = ExecutionResult(entry["output"])
+            key = entry["hash"]
+        except (KeyError, TypeError):
+            continue
+        output.stats = entry.get("stats")
+        outputs[key] = output
+    return outputs
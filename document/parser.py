@@ -1,7 +1,9 @@
 # document/parser.py
 
+import itertools
 import re
-from typing import List, Tuple
+from bisect import bisect_right
+from typing import Iterator, List, Tuple
 
 from document.document_model import DocumentModel
 from document.element import (
@@ -14,14 +16,61 @@ from document.element import (
 )
 from latex.latex_tokenizer import LatexTokenizer
 
-class DocumentParser:
+# element id 在整個 process 內不重複：預覽每次用新的 parser，
+# 舊頁面的 id（cache / DOM key）不會對到新文件的另一個 element
+_ELEMENT_IDS = itertools.count(1)
+
+# =========================================================
+# Plot 指令樣式：(regex, kind)，依序比對
+# =========================================================
+PLOT_PATTERNS: List[Tuple[str, str]] = [
+    # LaTeX 3D（plot3d$$ z = ... $$）
+    (r'plot3d\$\$(.*?)\$\$', "3d_latex"),
+
+    # LaTeX 2D（plot$$ y = ... $$）
+    (r'plot\$\$(.*?)\$\$', "2d_latex"),
+
+    # Data 3D：plot3d_data("file.txt")，也可用 .npy / .npz / .bin（memory-map）
+    # 散亂點 gridding：plot3d_data("scan.txt", 200) / ("scan.txt", 200x150, linear)
+    (r'plot3d_data\(\s*[\'"](.+?)[\'"]\s*(?:,\s*([^)]*?)\s*)?\)', "3d_data"),
+
+    # Data 2D：plot_data("file.txt")，也可用 .npy / .npz / .bin（memory-map）
+    # tail-follow：plot_data("run.log", live) 或 plot_data("run.log", live=5000)
+    (r'plot_data\(\s*[\'"](.+?)[\'"]\s*(?:,\s*(live(?:\s*=\s*\d+)?)\s*)?\)', "2d_data"),
+
+    # Python 3D：plot3d('sin(x)*cos(y)', -5,5,-5,5)
+    (
+        r'plot3d\(\s*[\'"](.+?)[\'"]\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*\)',
+        "3d_py",
+    ),
+
+    # Python 2D：plot('sin(x)', -5, 5)
+    (
+        r'plot\(\s*[\'"](.+?)[\'"]\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*\)',
+        "2d_py",
+    ),
+]
+
+# Python code block：```python ... ```（fence 同一行可加選項）
+PYTHON_FENCE_RE = re.compile(r"```python(.*?)```", flags=re.DOTALL)
+
+# block 之間以空白行分隔
+BLOCK_SEP_RE = re.compile(r"\n\s*\n")
+
+
+def _split_blocks(text: str) -> Iterator[Tuple[str, int]]:
+    """與 BLOCK_SEP_RE.split(text) 相同，另外附上每段的起始位置"""
+    start = 0
+    for m in BLOCK_SEP_RE.finditer(text):
+        yield text[start:m.start()], start
+        start = m.end()
+    yield text[start:], start
 
-    def __init__(self):
-        self._id_counter = 0
+
+class DocumentParser:
 
     def _next_id(self):
-        self._id_counter += 1
-        return f"e{self._id_counter}"
+        return f"e{next(_ELEMENT_IDS)}"
 
     """
     EQ-Note v2 文件解析器：
@@ -30,7 +79,7 @@ class DocumentParser:
     升級版特點：
       - 仍然以「空白行」切 block（穩定簡單）
       - 先偵測：
-          1. Python code block：```python ... ```
+          1. Python code block：```python ... ```（fence 可加選項：```python nocache）
           2. Plot 指令（plot_data, plot3d, plot$$, ...）
           3. 純 LaTeX display block：
                 a) $$ ... $$
@@ -40,33 +89,9 @@ class DocumentParser:
     """
 
     # =========================================================
-    # Plot 指令樣式
+    # Plot 指令樣式（模組層級的 PLOT_PATTERNS，編輯區上色也會用到）
     # =========================================================
-    _plot_patterns: List[Tuple[str, str]] = [
-        # LaTeX 3D（plot3d$$ z = ... $$）
-        (r'plot3d\$\$(.*?)\$\$', "3d_latex"),
-
-        # LaTeX 2D（plot$$ y = ... $$）
-        (r'plot\$\$(.*?)\$\$', "2d_latex"),
-
-        # Data 3D：plot3d_data("file.txt")
-        (r'plot3d_data\(\s*[\'"](.+?)[\'"]\s*\)', "3d_data"),
-
-        # Data 2D：plot_data("file.txt")
-        (r'plot_data\(\s*[\'"](.+?)[\'"]\s*\)', "2d_data"),
-
-        # Python 3D：plot3d('sin(x)*cos(y)', -5,5,-5,5)
-        (
-            r'plot3d\(\s*[\'"](.+?)[\'"]\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*\)',
-            "3d_py",
-        ),
-
-        # Python 2D：plot('sin(x)', -5, 5)
-        (
-            r'plot\(\s*[\'"](.+?)[\'"]\s*,\s*([-\d\.]+)\s*,\s*([-\d\.]+)\s*\)',
-            "2d_py",
-        ),
-    ]
+    _plot_patterns = PLOT_PATTERNS
 
     # 純 LaTeX display block（整個 block 就是數學，不含其他文字）
 
@@ -100,17 +125,32 @@ class DocumentParser:
         """
 
         elements: List[BaseElement] = []
+        source = raw_text
+
         # ★ 1) tokenizer
         tokenizer = LatexTokenizer()
         raw_text, token_map = tokenizer.protect(raw_text)
+        offsets = tokenizer.offset_map(raw_text)
+
+        # 原始文字每一行的起點（位置 → 行號用 bisect）
+        line_starts = [0] + [m.end() for m in re.finditer("\n", source)]
 
         # ★ 2) block 切分
-        blocks = re.split(r"\n\s*\n", raw_text)
-        for block in blocks:
-            block = block.strip()
+        for chunk, chunk_start in _split_blocks(raw_text):
+            block = chunk.strip()
             if not block:
                 continue
             elems = self._parse_block(block)
+
+            # 來源位置（給預覽與編輯區的捲動同步）
+            start = chunk_start + len(chunk) - len(chunk.lstrip())
+            src_start = offsets.to_source(start)
+            src_end = offsets.to_source(start + len(block))
+            first = bisect_right(line_starts, src_start) - 1
+            last = bisect_right(line_starts, max(src_start, src_end - 1)) - 1
+            for elem in elems:
+                elem.src_range = (src_start, src_end)
+                elem.src_lines = (first, last)
             elements.extend(elems)
 
         # ★ 3) 建立 model 並掛上 token_map
@@ -133,10 +173,18 @@ class DocumentParser:
         """
 
         # ----------- 0. Python Code Block ----------- #
-        py_match = re.match(r"```python(.*?)```", block, flags=re.DOTALL)
+        py_match = PYTHON_FENCE_RE.match(block)
         if py_match:
-            code = py_match.group(1).strip()
-            return [PythonElement(code=code, elem_id=self._next_id())]
+            # fence 同一行的文字是選項（```python nocache），程式碼從下一行開始；
+            # 單行的 ```python print(1)``` 沒有選項，整段都是程式碼
+            fence, newline, body = py_match.group(1).partition("\n")
+            if newline:
+                flags = set(re.findall(r"[\w-]+", fence))
+                code = body.strip()
+            else:
+                flags = set()
+                code = fence.strip()
+            return [PythonElement(code=code, elem_id=self._next_id(), flags=flags)]
 
         # ----------- 1. Plot 指令 ----------- #
         plot_results: List[BaseElement] = []
@@ -1,3 +1,4 @@
 # editor/__init__.py
 
 from .editor import Editor
+from .highlighter import NoteHighlighter
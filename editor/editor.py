@@ -1,16 +1,32 @@
 # editor/editor.py
 
-from typing import Tuple
+import time
+from typing import Callable, Iterable, List, NamedTuple, Tuple
 from PyQt5.QtWidgets import QTextEdit
 from PyQt5.QtGui import QTextCursor
 
 
+class TextChange(NamedTuple):
+    """
+    一次文件變動（QTextDocument.contentsChange）：
+    從 position 起刪掉 removed 個字元、插入 added 個字元（位置為變動前的座標）。
+    """
+    position: int
+    removed: int
+    added: int
+
+
+# (start, end, new_text)：把 [start, end) 換成 new_text
+Patch = Tuple[int, int, str]
+
+
 class Editor:
     """
     封裝文字編輯區，提供統一 API：
     - get_text / set_text
     - insert_text
-    - replace_range
+    - replace_range / apply_patches（以 QTextCursor 局部修改，可 undo）
+    - 文件變動通知（add_change_listener，給增量 parser 用）
     - cursor 位置取得與設定
     - 未來可掛 AST / DocumentModel / AI 操作
     """
@@ -21,6 +37,10 @@ class Editor:
         """
         self._text_widget = text_widget
 
+        # 文件變動的 listener：callback(TextChange)
+        self._change_listeners: List[Callable[[TextChange], None]] = []
+        text_widget.document().contentsChange.connect(self._on_contents_change)
+
         # 將來如果要加：
         # self._document_model = None
         # self._ast = None
@@ -46,24 +66,80 @@ class Editor:
         """清除所有內容。"""
         self._text_widget.clear()
 
+    def document_length(self) -> int:
+        """全文字元數（不必取出整份文字）。"""
+        # QTextDocument 結尾固定有一個段落分隔字元
+        return self._text_widget.document().characterCount() - 1
+
     # ---------- 範圍操作（未來 AI patch 用） ----------
+    #
+    # 位置都是「整份文件」的線性 index（QTextDocument position）。
+    # 修改透過 QTextCursor 只動到該範圍：不會重建整份文件、
+    # 只重新排版受影響的段落，也不會清掉 undo 紀錄。
+
+    def _clamp(self, start: int, end: int) -> Tuple[int, int]:
+        length = self.document_length()
+        start = max(0, min(start, length))
+        end = max(start, min(end, length))
+        return start, end
+
+    def _range_cursor(self, start: int, end: int) -> QTextCursor:
+        cursor = QTextCursor(self._text_widget.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        return cursor
 
     def replace_range(self, start: int, end: int, new_text: str) -> None:
         """
-        以字元 index [start, end) 取代成 new_text。
-        注意：這裡使用「整份文件」的線性 index。
+        以字元 index [start, end) 取代成 new_text（一個 undo 步驟）。
+        游標移到新插入文字的結尾。
+        """
+        start, end = self._clamp(start, end)
+        cursor = self._range_cursor(start, end)
+        cursor.insertText(new_text)
+        self._text_widget.setTextCursor(cursor)
+
+    def apply_patches(self, patches: Iterable[Patch]) -> None:
+        """
+        一次套用多個 (start, end, new_text)，整批是一個 undo 步驟。
+        所有位置都以「套用前」的文件為準；範圍不可重疊（ValueError）。
+        從文件後面往前套用，前面的位置不會被先前的修改移動。
+        """
+        ordered = sorted((self._clamp(start, end) + (text,) for start, end, text in patches),
+                         key=lambda p: (p[0], p[1]))
+        for prev, cur in zip(ordered, ordered[1:]):
+            if cur[0] < prev[1]:
+                raise ValueError(f"patch 範圍重疊：[{prev[0]}, {prev[1]}) 與 [{cur[0]}, {cur[1]})")
+        if not ordered:
+            return
+
+        cursor = QTextCursor(self._text_widget.document())
+        cursor.beginEditBlock()
+        try:
+            for start, end, text in reversed(ordered):
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.insertText(text)
+        finally:
+            cursor.endEditBlock()
+
+    # ---------- 文件變動通知 ----------
+
+    def add_change_listener(self, callback: Callable[[TextChange], None]) -> None:
+        """
+        文件每次變動時呼叫 callback(TextChange)：打字、replace_range、set_text 都會通知。
+        apply_patches 整批合併成一次（涵蓋所有 patch 的範圍）。
         """
-        doc_text = self.get_text()
-        start = max(0, min(start, len(doc_text)))
-        end = max(start, min(end, len(doc_text)))
+        self._change_listeners.append(callback)
 
-        updated = doc_text[:start] + new_text + doc_text[end:]
-        self.set_text(updated)
+    def remove_change_listener(self, callback: Callable[[TextChange], None]) -> None:
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
 
-        # 將游標移到新插入文字的結尾
-        cursor = self._text_widget.textCursor()
-        cursor.setPosition(start + len(new_text))
-        self._text_widget.setTextCursor(cursor)
+    def _on_contents_change(self, position: int, removed: int, added: int) -> None:
+        change = TextChange(position, removed, added)
+        for callback in list(self._change_listeners):
+            callback(change)
 
     # ---------- 游標相關 ----------
 
@@ -74,8 +150,7 @@ class Editor:
 
     def set_cursor_position(self, pos: int) -> None:
         """設定游標在全文中的字元位置。"""
-        text_length = len(self.get_text())
-        pos = max(0, min(pos, text_length))
+        pos = max(0, min(pos, self.document_length()))
 
         cursor = self._text_widget.textCursor()
         cursor.setPosition(pos)
@@ -86,19 +161,9 @@ class Editor:
         回傳 (line, column)，0-based。
         這在未來 AI 想說「請在第 10 行插入一段」會很有用。
         """
+        # 純文字的每一行就是一個 QTextBlock，不必取出整份文字
         cursor = self._text_widget.textCursor()
-        pos = cursor.position()
-
-        text = self.get_text()
-        line = text.count("\n", 0, pos)
-        # 找該行起點
-        last_newline_index = text.rfind("\n", 0, pos)
-        if last_newline_index == -1:
-            col = pos
-        else:
-            col = pos - last_newline_index - 1
-
-        return line, col
+        return cursor.blockNumber(), cursor.positionInBlock()
 
     # ---------- 將來預留的 hook ----------
 
@@ -113,3 +178,62 @@ class Editor:
     # def bind_document_model(self, model: DocumentModel): ...
     # def sync_to_model(self): ...
     # def sync_from_model(self): ...
+
+
+# =========================================================
+# 基準測試：python -m editor.editor
+# =========================================================
+def benchmark(size_mb: float = 5.0, n_patches: int = 1000, n_full: int = 10) -> None:
+    """
+    size_mb 的筆記上套用 n_patches 個小修改，比較：
+      全文取代   舊的 get_text + 切字串 + setPlainText（只跑 n_full 次再換算）
+      逐一       replace_range（QTextCursor）
+      整批       apply_patches（一個 edit block）
+    """
+    import os
+    import random
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    line = "The quick brown fox $x^2 + y^2 = z^2$ jumps over the lazy dog.\n"
+    text = line * int(size_mb * 1024 * 1024 / len(line))
+    rng = random.Random(0)
+    # 間隔至少 8 個字元，patch 不會重疊
+    starts = sorted(8 * k for k in rng.sample(range(len(text) // 8 - 1), n_patches))
+    patches = [(s, s + 3, "abcd") for s in starts]
+    print(f"{len(text) / 1024 / 1024:.1f} MB, {n_patches} patches")
+
+    widget = QTextEdit()
+    editor = Editor(widget)
+    changes = []
+    editor.add_change_listener(changes.append)
+
+    def run(label, fn, count):
+        editor.set_text(text)
+        changes.clear()
+        t0 = time.perf_counter()
+        fn()
+        app.processEvents()
+        elapsed = time.perf_counter() - t0
+        per = elapsed / count
+        print(f"{label:<10} {elapsed:8.3f} s for {count:>4}  ({per * 1000:8.3f} ms / patch, "
+              f"≈ {per * n_patches:7.2f} s / {n_patches}; {len(changes)} change events)")
+        return widget.toPlainText()
+
+    def full_replace():
+        for start, end, new in reversed(patches[-n_full:]):
+            doc = editor.get_text()
+            editor.set_text(doc[:start] + new + doc[end:])
+
+    run("全文取代", full_replace, n_full)
+    one = run("逐一", lambda: [editor.replace_range(*p) for p in reversed(patches)], n_patches)
+    batch = run("整批", lambda: editor.apply_patches(patches), n_patches)
+    assert one == batch
+    # 整批只佔一個 undo 步驟
+    widget.undo()
+    assert widget.toPlainText() == text
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,173 @@
+# editor/highlighter.py
+"""
+編輯區的語法上色（QSyntaxHighlighter）。
+
+上色的語法與 parser 相同（直接使用 latex_tokenizer / document.parser 的 regex）：
+  $...$            inline 數學（INLINE_LATEX_RE）
+  $$...$$          display 數學，可跨行
+  plot$$ / plot3d$$ 繪圖指令的 LaTeX，可跨行
+  plot_data(...) 等  單行的繪圖指令（PLOT_PATTERNS）
+  ```python ... ``` code block（fence 與程式碼）
+
+跨行的結構以 block state 記在每一行（QTextBlock）上：
+某一行的 state 只由「上一行結尾的 state + 這一行的文字」決定。
+編輯時 Qt 只重新上色被改到的行，並且只有在該行結尾的 state 改變時
+才繼續往下一行，因此長筆記打字時每次只處理少數幾行。
+"""
+
+import keyword
+import re
+
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
+
+from document.parser import PLOT_PATTERNS
+from latex.latex_tokenizer import INLINE_LATEX_RE
+
+# ---- block state（上一行結尾還在哪個結構裡）----
+NORMAL = -1         # QTextBlock 的預設 state
+IN_MATH = 1         # $$ 尚未關閉
+IN_PLOT_MATH = 2    # plot$$ / plot3d$$ 尚未關閉
+IN_PYTHON = 3       # ```python 尚未關閉
+
+# 單行的繪圖指令（LaTeX 形式的 plot$$ 另外以 state 處理）
+_PLOT_CALL_RES = [re.compile(p) for p, kind in PLOT_PATTERNS if not kind.endswith("_latex")]
+
+# $$ 的開頭，前面可帶 plot / plot3d
+_DISPLAY_OPEN_RE = re.compile(r"(plot3d|plot)?\$\$")
+
+_FENCE_OPEN_RE = re.compile(r"^\s*```python\b")
+_FENCE_CLOSE = "```"
+
+_PY_KEYWORD_RE = re.compile(r"\b(?:" + "|".join(keyword.kwlist) + r")\b")
+_PY_STRING_RE = re.compile(r"(?:'[^'\n]*'|\"[^\"\n]*\")")
+_PY_COMMENT_RE = re.compile(r"#.*$")
+
+# 主題配色：name → (dark, light)
+_PALETTE = {
+    "math": ("#7FD4FF", "#0055AA"),
+    "math_delim": ("#4FA3D1", "#3377AA"),
+    "plot": ("#FFB86C", "#B35C00"),
+    "fence": ("#888888", "#777777"),
+    "code": ("#D8D8D8", "#222222"),
+    "code_bg": ("#1C1C1C", "#F3F3F3"),
+    "keyword": ("#FF79C6", "#A0207A"),
+    "string": ("#A6E22E", "#2E7D32"),
+    "comment": ("#6A9955", "#6A8F4A"),
+}
+
+
+class NoteHighlighter(QSyntaxHighlighter):
+
+    def __init__(self, document, dark_mode: bool = True):
+        super().__init__(document)
+        self.dark_mode = dark_mode
+        self._formats = self._build_formats()
+
+    def set_dark_mode(self, dark_mode: bool) -> None:
+        """切換主題：換配色並重新上色整份文件"""
+        if dark_mode == self.dark_mode:
+            return
+        self.dark_mode = dark_mode
+        self._formats = self._build_formats()
+        self.rehighlight()
+
+    def _build_formats(self) -> dict:
+        idx = 0 if self.dark_mode else 1
+
+        def fmt(name, bold=False, italic=False, background=None):
+            f = QTextCharFormat()
+            f.setForeground(QColor(_PALETTE[name][idx]))
+            if bold:
+                f.setFontWeight(QFont.Bold)
+            if italic:
+                f.setFontItalic(True)
+            if background:
+                f.setBackground(QColor(_PALETTE[background][idx]))
+            return f
+
+        return {
+            "math": fmt("math"),
+            "math_delim": fmt("math_delim", bold=True),
+            "plot": fmt("plot", bold=True),
+            "fence": fmt("fence", bold=True, background="code_bg"),
+            "code": fmt("code", background="code_bg"),
+            "keyword": fmt("keyword", bold=True, background="code_bg"),
+            "string": fmt("string", background="code_bg"),
+            "comment": fmt("comment", italic=True, background="code_bg"),
+        }
+
+    # ---------- 上色（Qt 對每一行呼叫） ----------
+
+    def highlightBlock(self, text: str) -> None:
+        state = self.previousBlockState()
+        pos = 0
+
+        # 1) 接續上一行還沒結束的結構
+        if state == IN_PYTHON:
+            if text.lstrip().startswith(_FENCE_CLOSE):
+                self.setFormat(0, len(text), self._formats["fence"])
+                self.setCurrentBlockState(NORMAL)
+            else:
+                self._highlight_python(text)
+                self.setCurrentBlockState(IN_PYTHON)
+            return
+
+        if state in (IN_MATH, IN_PLOT_MATH):
+            close = text.find("$$")
+            if close < 0:
+                self.setFormat(0, len(text), self._formats["math"])
+                self.setCurrentBlockState(state)
+                return
+            self.setFormat(0, close, self._formats["math"])
+            self.setFormat(close, 2, self._formats["math_delim"])
+            pos = close + 2
+
+        # 2) ```python 開頭的行
+        if pos == 0 and _FENCE_OPEN_RE.match(text):
+            self.setFormat(0, len(text), self._formats["fence"])
+            # 同一行就關閉的 fence（```python ... ```）不進入 code 狀態
+            closed = text.find(_FENCE_CLOSE, text.index("```") + 3) >= 0
+            self.setCurrentBlockState(NORMAL if closed else IN_PYTHON)
+            return
+
+        # 3) 一般文字：$$ / plot$$ 之間的片段找 inline 數學與繪圖指令
+        self.setCurrentBlockState(self._highlight_normal(text, pos))
+
+    def _highlight_normal(self, text: str, pos: int) -> int:
+        """從 pos 開始上色，回傳這一行結尾的 state"""
+        while True:
+            m = _DISPLAY_OPEN_RE.search(text, pos)
+            self._highlight_inline(text, pos, m.start() if m else len(text))
+            if m is None:
+                return NORMAL
+
+            if m.group(1):
+                self.setFormat(m.start(), m.end(1) - m.start(), self._formats["plot"])
+            self.setFormat(m.end() - 2, 2, self._formats["math_delim"])
+
+            close = text.find("$$", m.end())
+            if close < 0:
+                self.setFormat(m.end(), len(text) - m.end(), self._formats["math"])
+                return IN_PLOT_MATH if m.group(1) else IN_MATH
+            self.setFormat(m.end(), close - m.end(), self._formats["math"])
+            self.setFormat(close, 2, self._formats["math_delim"])
+            pos = close + 2
+
+    def _highlight_inline(self, text: str, start: int, end: int) -> None:
+        for m in INLINE_LATEX_RE.finditer(text, start, end):
+            self.setFormat(m.start(), 1, self._formats["math_delim"])
+            self.setFormat(m.start(1), m.end(1) - m.start(1), self._formats["math"])
+            self.setFormat(m.end() - 1, 1, self._formats["math_delim"])
+        for pattern in _PLOT_CALL_RES:
+            for m in pattern.finditer(text, start, end):
+                self.setFormat(m.start(), m.end() - m.start(), self._formats["plot"])
+
+    def _highlight_python(self, text: str) -> None:
+        self.setFormat(0, len(text), self._formats["code"])
+        for m in _PY_KEYWORD_RE.finditer(text):
+            self.setFormat(m.start(), m.end() - m.start(), self._formats["keyword"])
+        for m in _PY_STRING_RE.finditer(text):
+            self.setFormat(m.start(), m.end() - m.start(), self._formats["string"])
+        m = _PY_COMMENT_RE.search(text)
+        if m and not any(s.start() < m.start() < s.end() for s in _PY_STRING_RE.finditer(text)):
+            self.setFormat(m.start(), m.end() - m.start(), self._formats["comment"])
@@ -0,0 +1,117 @@
+# executor/block_pool.py
+"""
+python block 的平行執行。
+
+一般模式下每個 block 都在全新的 namespace 執行、彼此獨立，
+因此預覽時所有需要執行的 block 一次送進 WarmProcessPool，
+結果依文件順序取回（寫回 PythonElement.output 的順序不變）。
+
+- worker 預先 import numpy，matplotlib 固定用 Agg
+- 每個 block 有獨立的時間上限（limits.wall_seconds，自開始執行起算）；
+  逾時的 worker 會被結束重建，其他 block 不受影響
+- worker 內同樣套用記憶體 / CPU / 輸出上限（executor.limits）
+- block 數少於 min_batch 時直接交給 kernel 依序執行
+
+基準測試：python -m executor.block_pool
+"""
+
+import os
+import time
+from functools import partial
+from typing import List, Sequence
+
+from executor.kernel import DEFAULT_PRELOAD, exec_capture
+from executor.limits import ExecutionLimits, apply_memory_limit
+from executor.worker_pool import WarmProcessPool
+
+
+def _setup_worker(limits: ExecutionLimits) -> None:
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    apply_memory_limit(limits)
+
+
+def _run_one(code: str, limits: ExecutionLimits, profile: bool = False) -> str:
+    """在 worker process 內執行"""
+    return exec_capture(code, limits=limits, limit_cpu=True, profile=profile)
+
+
+class BlockPool:
+
+    # block 數少於此值時不用 pool
+    min_batch = 2
+
+    def __init__(self, max_workers: int = None, limits: ExecutionLimits = None):
+        self.limits = limits or ExecutionLimits()
+        self._pool = WarmProcessPool(
+            max_workers=max_workers,
+            preload=DEFAULT_PRELOAD,
+            setup=partial(_setup_worker, self.limits),
+        )
+
+    @property
+    def timeout(self) -> float:
+        """單一 block 最長允許的時間（秒）"""
+        return self.limits.wall_seconds
+
+    @property
+    def max_workers(self) -> int:
+        return self._pool.max_workers
+
+    def warm(self) -> None:
+        self._pool.warm()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
+
+    def run_all(self, codes: Sequence[str], profile: Sequence[bool] = None) -> List[str]:
+        """
+        依輸入順序回傳每個 block 的輸出（格式與 PythonExecutor.run 相同）。
+        profile[i] 為 True 的 block 以 cProfile 量測。
+        """
+        profile = profile or [False] * len(codes)
+        results = self._pool.map_ordered(
+            _run_one, [(code, self.limits, p) for code, p in zip(codes, profile)],
+            timeout=self.timeout,
+        )
+
+        outputs = []
+        for ok, value in results:
+            if ok:
+                outputs.append(value)
+            elif isinstance(value, TimeoutError):
+                outputs.append(f"Error:\nTimeoutError: 執行超過 {self.timeout:g} 秒，已中斷。")
+            else:
+                outputs.append(f"Error:\nworker 意外結束：{type(value).__name__}: {value}")
+        return outputs
+
+
+# =========================================================
+# 基準測試
+# =========================================================
+_BENCH_BLOCK = """
+total = 0
+for i in range({n}):
+    total += i * i % 7
+print(total)
+"""
+
+
+def benchmark(n_blocks: int = 30, workers: Sequence[int] = (1, 8), n: int = 2_000_000) -> None:
+    """n_blocks 個純 CPU 的 block，分別以不同 worker 數執行，比較整份筆記的時間"""
+    codes = [_BENCH_BLOCK.format(n=n + k) for k in range(n_blocks)]
+    print(f"{n_blocks} blocks, os.cpu_count() = {os.cpu_count()}")
+
+    for w in workers:
+        pool = BlockPool(max_workers=w)
+        pool.run_all(["pass"] * w)   # 先讓 worker 啟動並完成 preload
+        t0 = time.perf_counter()
+        outputs = pool.run_all(codes)
+        elapsed = time.perf_counter() - t0
+        pool.shutdown()
+        errors = sum(o.startswith("Error:") for o in outputs)
+        print(f"{w:>2} worker(s): {elapsed:7.2f} s  ({elapsed / n_blocks * 1000:.0f} ms / block, "
+              f"{errors} errors)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,170 @@
+# executor/dataflow.py
+"""
+筆記本模式（共用 namespace）的相依分析。
+
+以 ast 靜態分析每個 block：
+  defs  在最外層被賦值 / import / def / class 的名稱
+  uses  使用到、但在同一個 block 裡「之前」沒有定義過的名稱
+          （函式、lambda、comprehension 內用到的外部名稱也算）
+
+block i 使用名稱 x 時，相依於它之前「最後一個」定義 x 的 block。
+某個 block 改變時，只需重跑它以及 downstream 的 block：
+直接或間接相依於它的 block，以及之後重新定義它所定義名稱的 block
+（重跑後 namespace 裡的值才會與依序執行整份筆記時相同）。
+會重跑的 block 若以舊值更新名稱（x += 1），先前定義 x 的 block 也一起重跑，
+否則每跑一次 x 就再加 1。
+
+分析是保守的近似：exec / globals() / 動態屬性等無法靜態得知的用法不追蹤。
+"""
+
+import ast
+import builtins
+from typing import Dict, List, Sequence, Set, Tuple
+
+_BUILTINS = frozenset(dir(builtins))
+
+
+class _Names(ast.NodeVisitor):
+    """收集一個節點內讀取（Load）與寫入（Store / import / def）的名稱"""
+
+    def __init__(self):
+        self.loads: Set[str] = set()
+        self.stores: Set[str] = set()
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loads.add(node.id)
+        else:
+            self.stores.add(node.id)
+
+    def visit_AugAssign(self, node):
+        # x += 1 同時讀取與寫入 x
+        if isinstance(node.target, ast.Name):
+            self.loads.add(node.target.id)
+        self.generic_visit(node)
+
+    def _visit_def(self, node):
+        self.stores.add(node.name)
+        # 函式內部的區域變數不算外部的 defs；只記錄它讀到的外部名稱
+        inner = _Names()
+        for child in ast.iter_child_nodes(node):
+            inner.visit(child)
+        params = set()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            a = node.args
+            for arg in a.posonlyargs + a.args + a.kwonlyargs + [a.vararg, a.kwarg]:
+                if arg is not None:
+                    params.add(arg.arg)
+        self.loads |= inner.loads - inner.stores - params
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_def
+
+    def visit_Lambda(self, node):
+        inner = _Names()
+        inner.visit(node.body)
+        a = node.args
+        params = {arg.arg for arg in a.posonlyargs + a.args + a.kwonlyargs}
+        params |= {arg.arg for arg in (a.vararg, a.kwarg) if arg is not None}
+        self.loads |= inner.loads - params
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.stores.add((alias.asname or alias.name).split(".")[0])
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name != "*":
+                self.stores.add(alias.asname or alias.name)
+
+    def _visit_comprehension(self, node):
+        # comprehension 的迴圈變數是區域變數
+        inner = _Names()
+        for child in ast.iter_child_nodes(node):
+            inner.visit(child)
+        self.loads |= inner.loads - inner.stores
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+
+def analyze(code: str) -> Tuple[Set[str], Set[str]]:
+    """回傳 (defs, uses)。語法錯誤時回傳 (set(), set())"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set(), set()
+
+    defs: Set[str] = set()
+    uses: Set[str] = set()
+    # 依序走訪最外層的 statement：之前已定義的名稱不算外部相依
+    for stmt in tree.body:
+        names = _Names()
+        names.visit(stmt)
+        uses |= names.loads - defs - _BUILTINS
+        defs |= names.stores
+    return defs, uses
+
+
+class DataflowGraph:
+    """
+    blocks 依文件順序排列的程式碼。
+    deps[i]      block i 直接相依的 block（index）
+    dependents[i] 直接相依於 block i 的 block
+    updates[i]   block i 以舊值更新的名稱（同時讀取與定義）→ 之前定義它的 block
+    """
+
+    def __init__(self, blocks: Sequence[str]):
+        self.defs: List[Set[str]] = []
+        self.uses: List[Set[str]] = []
+        for code in blocks:
+            d, u = analyze(code)
+            self.defs.append(d)
+            self.uses.append(u)
+
+        n = len(blocks)
+        self.deps: List[Set[int]] = [set() for _ in range(n)]
+        self.dependents: List[Set[int]] = [set() for _ in range(n)]
+        self.updates: List[Dict[str, int]] = [{} for _ in range(n)]
+
+        # name → 定義它的 block（遞增）
+        self.definers: Dict[str, List[int]] = {}
+        for i, names in enumerate(self.defs):
+            for name in names:
+                self.definers.setdefault(name, []).append(i)
+
+        last_def: Dict[str, int] = {}
+        for i in range(n):
+            for name in self.uses[i]:
+                j = last_def.get(name)
+                if j is not None:
+                    self.deps[i].add(j)
+                    self.dependents[j].add(i)
+                    if name in self.defs[i]:
+                        self.updates[i][name] = j
+            for name in self.defs[i]:
+                last_def[name] = i
+
+    def redefiners(self, i: int) -> Set[int]:
+        """block i 之後、重新定義 block i 所定義名稱的 block"""
+        return {j for name in self.defs[i] for j in self.definers[name] if j > i}
+
+    def downstream(self, roots) -> Set[int]:
+        """
+        roots 以及所有需要跟著重跑的 block：直接或間接相依於它們的，
+        以及之後重新定義它們所定義名稱的（否則共用 namespace 會留著重跑後的值）。
+        其中以舊值更新名稱的 block，之前定義該名稱的 block 也加入（並連同它的 downstream），
+        重跑的結果才與依序執行整份筆記相同。
+        """
+        seen = set(roots)
+        stack = list(roots)
+        while stack:
+            i = stack.pop()
+            nxt = self.dependents[i] | self.redefiners(i) | set(self.updates[i].values())
+            for j in nxt:
+                if j not in seen:
+                    seen.add(j)
+                    stack.append(j)
+        return seen
+
+    def users_of(self, names: Set[str]) -> Set[int]:
+        """使用到 names 中任一名稱的 block"""
+        return {i for i, u in enumerate(self.uses) if u & names}
@@ -0,0 +1,316 @@
+# executor/kernel.py
+"""
+獨立 process 的 Python kernel：```python 區塊不再於 GUI process 內 exec。
+
+- kernel 以 multiprocessing（spawn）啟動，透過 Pipe 收發訊息
+    ("exec", run_id, code, shared, profile)  →  ("started", run_id, None) … ("result", run_id, output)
+  shared=True 時在 kernel 的共用 namespace 執行（筆記本模式），("reset",) 清空它
+- 啟動時先 import preload 裡的模組，之後每次執行都不必再付 import 的代價
+- KernelClient.execute：
+    逾時 → 送 SIGINT（kernel 內變成 KeyboardInterrupt）；
+    在 INTERRUPT_GRACE 秒內仍未回應就重啟 kernel
+    kernel 意外結束 → 自動重啟，回傳錯誤訊息
+- 執行中的輸出每 output_capture.STREAM_INTERVAL 秒以 ("chunk", run_id, text) 送回，
+  execute(on_output=...) 可即時顯示
+- start / restart / shutdown 與 execute 共用 _lock，不會在執行途中換掉 kernel；
+  interrupt() 不取 lock（執行中 lock 一直被佔住），只看 _running，可由其他 thread 呼叫（例如 Stop 按鈕）；
+  execute(tag=...) 標記這次執行是誰的，interrupt(tag) 只在 kernel 正在執行同一個 tag 時才中斷
+- execute(on_start=...)：kernel 回報 started 時呼叫（排隊等 lock 的期間不算執行中）；
+  在 started 之前收到的 interrupt 先記著，started 時才送 SIGINT（kernel 閒置時會忽略 SIGINT）
+- Windows 無法對子 process 送 SIGINT：interrupt 改為直接重啟
+- 資源上限（executor.limits）：記憶體在 kernel 啟動時設定，CPU 時間與輸出量每次執行設定，
+  wall time 即 execute 的 timeout
+"""
+
+import atexit
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from typing import Sequence
+
+from executor.limits import ExecutionLimits, apply_memory_limit, cpu_limit, describe_limit_error
+from executor.output_capture import ExecutionResult, capture, with_note
+from executor.profiling import measure
+
+# kernel 啟動時預先 import
+DEFAULT_PRELOAD = ("math", "numpy")
+# 送出 SIGINT 後等待 kernel 回應的時間（秒），超過就重啟
+INTERRUPT_GRACE = 2.0
+
+
+def exec_capture(code: str, env: dict = None, on_output=None,
+                 limits: ExecutionLimits = None, limit_cpu: bool = False,
+                 profile: bool = False) -> ExecutionResult:
+    """
+    執行 code，回傳 stdout + stderr + exception 結果。
+    env 為 None 時每次都是全新的 namespace；否則以 env 當 globals（block 之間共用狀態）。
+    on_output(text) 會在執行中陸續收到新的輸出。
+    limit_cpu=True 時套用 limits.cpu_seconds（只能在子 process 內使用）。
+    profile=True 時以 cProfile 量測，報表附在輸出後面。
+    輸出以 output_capture 擷取（依 context 分流），多個 thread 同時執行也不會混在一起。
+    回傳值的 .stats 為 wall / CPU 時間與記憶體峰值（見 executor.profiling）。
+    kernel、block pool 與 in-process 後端共用。
+    """
+    limits = limits or ExecutionLimits()
+    stats = {}
+    with capture(on_chunk=on_output, max_chars=limits.output_chars) as buf:
+        try:
+            with cpu_limit(limits.cpu_seconds if limit_cpu else 0):
+                with measure(profile) as stats:
+                    if env is None:
+                        exec(code, {}, {})   # ★ 乾淨 sandbox
+                    else:
+                        exec(code, env)
+            error = None
+        except BaseException as e:
+            # 包含 KeyboardInterrupt（中斷）與 SystemExit（使用者呼叫 exit()）
+            error = e
+            tb = traceback.format_exc()
+
+    out = buf.getvalue()
+    if error is None:
+        text = out if out.strip() else "(no output)"
+    else:
+        reason = describe_limit_error(error, limits)
+        if reason is None:
+            text = f"Error:\n{tb}"
+        else:
+            # 超過資源上限：附上到目前為止的輸出，方便找出是哪裡用太多
+            text = f"Error:\n{reason}\n\n{tb}" + (f"\n--- 停止前的輸出 ---\n{out}" if out else "")
+
+    if "profile" in stats:
+        text = f"{text.rstrip()}\n\n{stats.pop('profile')}"
+    result = ExecutionResult(text)
+    if out.omitted:
+        # 出錯或逾時的 block 也保留完整輸出（「顯示更多」），這時最需要看前面印了什麼
+        result.spill_path, result.total_chars = out.spill_path, out.total_chars
+    result.stats = stats
+    return result
+
+
+# =========================================================
+# kernel process
+# =========================================================
+def _kernel_main(conn, preload: Sequence[str], limits: ExecutionLimits) -> None:
+    # kernel 內不開 GUI 視窗
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    apply_memory_limit(limits)
+
+    for name in preload:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+    shared_env = {"__name__": "__main__"}
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except KeyboardInterrupt:
+            continue   # 閒置時收到的中斷：忽略
+        except EOFError:
+            break      # app 已關閉
+
+        kind = msg[0]
+        if kind == "exec":
+            _, run_id, code, shared, profile = msg
+
+            def send_chunk(text, run_id=run_id):
+                conn.send(("chunk", run_id, text))
+
+            try:
+                conn.send(("started", run_id, None))
+                output = exec_capture(code, shared_env if shared else None, send_chunk,
+                                      limits, limit_cpu=True, profile=profile)
+            except KeyboardInterrupt:
+                # 中斷剛好落在 exec 之外（結束擷取時）
+                output = "Error:\nKeyboardInterrupt"
+            conn.send(("result", run_id, output))
+        elif kind == "reset":
+            shared_env = {"__name__": "__main__"}
+        elif kind == "shutdown":
+            break
+
+    conn.close()
+
+
+# =========================================================
+# app 端
+# =========================================================
+class KernelClient:
+
+    def __init__(self, preload: Sequence[str] = DEFAULT_PRELOAD,
+                 limits: ExecutionLimits = None):
+        self.preload = tuple(preload)
+        self.limits = limits or ExecutionLimits()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._proc = None
+        self._conn = None
+        self._ready = False
+        self._run_id = 0
+        self._lock = threading.Lock()      # 同一時間只執行一段 code；kernel 的啟動 / 結束也在 lock 內
+        self._running = threading.Event()  # 有 code 正在 kernel 內執行（interrupt 用，不取 lock）
+        self._current = None               # 正在執行的 execute(tag=...)
+        # kernel 是否已回報 started；之前收到的 interrupt 記在 _pending_interrupt
+        self._sig_lock = threading.Lock()
+        self._started = False
+        self._pending_interrupt = False
+        # 每次（重新）啟動 +1：共用 namespace 隨之消失，呼叫端可據此判斷狀態是否還在
+        self.generation = 0
+        atexit.register(self._shutdown)    # 結束時不等執行中的 code
+
+    # ---------- 生命週期 ----------
+
+    def start(self) -> None:
+        """啟動 kernel（不等待 preload 完成）"""
+        if self.is_alive():
+            return
+        with self._lock:
+            self._start()
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._shutdown()
+
+    def restart(self) -> None:
+        """重啟 kernel；有 code 在執行時等它結束（要立刻停止請先 interrupt）"""
+        with self._lock:
+            self._restart()
+
+    def interrupt(self, tag=None) -> None:
+        """
+        中斷目前正在執行的程式（可由任何 thread 呼叫）。
+        指定 tag 時只在正在執行的是同一個 tag 時中斷（例如只停 Stop 按下的那個 block）。
+        """
+        proc = self._proc
+        if proc is None or not self._running.is_set():
+            return
+        if tag is not None and tag != self._current:
+            return
+        with self._sig_lock:
+            if not self._started:
+                self._pending_interrupt = True    # kernel 還沒開始執行：started 時再送
+                return
+        self._signal(proc)
+
+    @staticmethod
+    def _signal(proc) -> None:
+        if os.name == "nt":
+            proc.kill()      # Windows：無 SIGINT，直接結束，execute 會自動重啟
+        else:
+            os.kill(proc.pid, signal.SIGINT)
+
+    def reset(self) -> None:
+        """清空共用 namespace"""
+        with self._lock:
+            if self.is_alive():
+                self._conn.send(("reset",))
+
+    # 以下 _start / _shutdown / _restart 由已持有 _lock 的呼叫端使用
+
+    def _start(self) -> None:
+        if self.is_alive():
+            return
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_kernel_main, args=(child, self.preload, self.limits),
+            name="eqnote-kernel", daemon=True,
+        )
+        proc.start()
+        child.close()
+        self._proc, self._conn, self._ready = proc, parent, False
+        self.generation += 1
+
+    def _shutdown(self) -> None:
+        proc, conn = self._proc, self._conn
+        self._proc = self._conn = None
+        if conn is not None:
+            try:
+                conn.send(("shutdown",))
+            except (OSError, ValueError):
+                pass
+            conn.close()
+        if proc is not None:
+            proc.join(0.5)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+
+    def _restart(self) -> None:
+        self._shutdown()
+        self._start()
+
+    # ---------- 執行 ----------
+
+    def _wait_ready(self) -> None:
+        while not self._ready:
+            kind, _ = self._conn.recv()
+            self._ready = kind == "ready"
+
+    def _recv_result(self, run_id: int, timeout: float, on_output=None, on_start=None):
+        """
+        等待 run_id 的結果，途中的輸出交給 on_output；逾時回傳 None（舊的訊息直接丟棄）。
+        收到 started 時送出先前擱著的 interrupt，並呼叫 on_start()。
+        """
+        deadline = time.monotonic() + timeout
+        while self._conn.poll(max(0.0, deadline - time.monotonic())):
+            kind, rid, payload = self._conn.recv()
+            if rid != run_id:
+                continue
+            if kind == "result":
+                return payload
+            if kind == "started":
+                with self._sig_lock:
+                    self._started = True
+                    pending, self._pending_interrupt = self._pending_interrupt, False
+                if pending:
+                    self._signal(self._proc)
+                if on_start is not None:
+                    on_start()
+            if kind == "chunk" and on_output is not None:
+                on_output(payload)
+        return None
+
+    def execute(self, code: str, timeout: float = None, on_output=None,
+                shared: bool = False, profile: bool = False,
+                tag=None, on_start=None) -> str:
+        timeout = self.limits.wall_seconds if timeout is None else timeout
+        with self._lock:
+            if not self.is_alive():
+                self._start()
+            try:
+                self._wait_ready()
+                self._run_id += 1
+                run_id = self._run_id
+                self._current = tag
+                self._started = self._pending_interrupt = False
+                self._running.set()
+                self._conn.send(("exec", run_id, code, shared, profile))
+
+                output = self._recv_result(run_id, timeout, on_output, on_start)
+                if output is None:
+                    # 逾時：先中斷，給一點時間收尾
+                    self.interrupt()
+                    output = self._recv_result(run_id, INTERRUPT_GRACE, on_output)
+                    if output is None:
+                        self._restart()
+                        return (f"Error:\nTimeoutError: 執行超過 {timeout:g} 秒，"
+                                f"kernel 已重新啟動。")
+                    return with_note(output, f"\n(執行超過 {timeout:g} 秒，已中斷)")
+                return output
+            except (EOFError, OSError):
+                # kernel 意外結束（segfault、被 kill、使用者呼叫 os._exit…）
+                self._restart()
+                return "Error:\nkernel 意外結束，已重新啟動。"
+            finally:
+                self._running.clear()
+                self._current = None
@@ -0,0 +1,96 @@
+# executor/limits.py
+"""
+python block 的資源上限。
+
+  memory_mb     位址空間（RLIMIT_AS），kernel / worker 啟動時設定一次
+  cpu_seconds   每次執行的 CPU 時間（RLIMIT_CPU，軟上限 = 目前用量 + cpu_seconds，
+                超過時 SIGXCPU → CPUTimeLimitExceeded）
+  wall_seconds  每次執行的實際時間（由 KernelClient / BlockPool 的 timeout 執行）
+  output_chars  每次執行的輸出字元數（由 OutputBuffer 檢查 → OutputLimitExceeded）
+
+記憶體與 CPU 上限只在子 process（kernel、block pool worker）內設定，不會影響 GUI。
+Windows 沒有 resource 模組：這兩項略過，wall time 與輸出上限仍然有效。
+"""
+
+import signal
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:      # Windows
+    resource = None
+
+from executor.output_capture import MAX_SPILL_CHARS, OutputLimitExceeded
+
+
+@dataclass
+class ExecutionLimits:
+    memory_mb: int = 4096
+    cpu_seconds: int = 60
+    wall_seconds: float = 30.0
+    output_chars: int = MAX_SPILL_CHARS
+
+
+class CPUTimeLimitExceeded(BaseException):
+    """繼承 BaseException：使用者程式的 except Exception 攔不住"""
+
+
+def apply_memory_limit(limits: ExecutionLimits) -> bool:
+    """在子 process 內呼叫；回傳是否成功設定"""
+    if resource is None or not limits.memory_mb:
+        return False
+    soft = limits.memory_mb * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    except (ValueError, OSError):
+        return False
+    return True
+
+
+def _raise_cpu_limit(signum, frame):
+    raise CPUTimeLimitExceeded()
+
+
+@contextmanager
+def cpu_limit(seconds: int):
+    """
+    with 區塊內最多使用 seconds 秒 CPU 時間。
+    只在子 process 的 main thread 有效（signal handler 的限制），其他情況不做事。
+    """
+    if (resource is None or not seconds
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+
+    old_handler = signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        signal.signal(signal.SIGXCPU, old_handler)
+
+
+def describe_limit_error(exc: BaseException, limits: ExecutionLimits):
+    """超過上限造成的例外 → 給使用者看的說明；其他例外回傳 None"""
+    if limits is None:
+        limits = ExecutionLimits()
+    if isinstance(exc, MemoryError):
+        return f"MemoryLimitExceeded: 記憶體使用超過上限（{limits.memory_mb} MB），已停止執行。"
+    if isinstance(exc, CPUTimeLimitExceeded):
+        return f"CPUTimeLimitExceeded: CPU 時間超過上限（{limits.cpu_seconds} 秒），已停止執行。"
+    if isinstance(exc, OutputLimitExceeded):
+        return f"OutputLimitExceeded: 輸出超過上限（{limits.output_chars:,} 字元），已停止執行。"
+    return None
@@ -0,0 +1,293 @@
+# executor/output_capture.py
+"""
+以 contextvars 實作的輸出擷取，取代「暫時換掉 sys.stdout / sys.stderr」。
+
+- install() 把 sys.stdout / sys.stderr 換成 _DispatchingStream（只做一次）：
+  write 時查目前 context 的 OutputBuffer，有就寫進去，沒有就寫到原本的 stream
+- capture() 為每一次執行建立自己的 OutputBuffer 並設定到 context，
+  不同 thread（或 asyncio task）同時執行也不會互相混到輸出；
+  其他 thread 的輸出照常出現在終端機
+- OutputBuffer（記憶體用量有上限）：
+    只保留開頭 head_chars 與結尾 tail_chars 字元；
+    超過時完整輸出改寫到 spill 檔（SPILL_DIR）
+    總輸出超過 max_chars（預設 MAX_SPILL_CHARS）時丟出 OutputLimitExceeded，中止執行
+    on_chunk(text) 每 interval 秒收到一次新的輸出，最多 head_chars 字元（預覽即時顯示用）
+- getvalue() 回傳 ExecutionResult：開頭 + 省略標記 + 結尾，
+  完整內容以 read_page() 從 spill 檔分頁讀取（預覽的「顯示更多」）
+
+注意：使用者程式自己開的 threading.Thread 不會繼承 context，
+那些 thread 的輸出會回到原本的 stdout。
+"""
+
+import contextvars
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# 預覽保留的開頭 / 結尾字元數
+HEAD_CHARS = 20_000
+TAIL_CHARS = 5_000
+# 單次執行最多的輸出字元數（也是 spill 檔的大小上限）
+MAX_SPILL_CHARS = 50_000_000
+# 「顯示更多」每頁的字元數
+PAGE_CHARS = 100_000
+# 執行中輸出回傳的最短間隔（秒）
+STREAM_INTERVAL = 0.1
+
+SPILL_DIR = os.path.join(tempfile.gettempdir(), "eqnote-output")
+# spill 檔保留天數
+SPILL_MAX_AGE_DAYS = 1
+
+_current = contextvars.ContextVar("eqnote_output", default=None)
+_install_lock = threading.Lock()
+
+
+class OutputLimitExceeded(BaseException):
+    """輸出超過上限。繼承 BaseException：使用者程式的 except Exception 攔不住"""
+
+
+class ExecutionResult(str):
+    """
+    block 的輸出（預覽用的文字本身就是 str，其他程式碼照常當字串使用）。
+    輸出過長時另外帶著：
+      spill_path   完整輸出所在的檔案
+      total_chars  完整輸出的字元數
+    stats 為執行量測（wall_ms / cpu_ms / rss_kb / peak_kb，見 executor.profiling），沒有量測時為 None。
+    """
+
+    spill_path = None
+    total_chars = 0
+    stats = None
+
+    @property
+    def omitted(self) -> bool:
+        return self.spill_path is not None
+
+
+def with_note(result: str, note: str) -> ExecutionResult:
+    """result 後面加上一段說明文字；spill_path / total_chars / stats 照舊保留"""
+    out = ExecutionResult(str(result) + note)
+    out.spill_path = getattr(result, "spill_path", None)
+    out.total_chars = getattr(result, "total_chars", 0)
+    out.stats = getattr(result, "stats", None)
+    return out
+
+
+def read_page(result: str, page: int, page_chars: int = PAGE_CHARS):
+    """回傳 (第 page 頁的文字, 總頁數)；spill 檔已不存在時丟 OSError"""
+    path = getattr(result, "spill_path", None)
+    if path is None:
+        text = str(result)
+        pages = max(1, -(-len(text) // page_chars))
+        return text[page * page_chars:(page + 1) * page_chars], pages
+
+    pages = max(1, -(-result.total_chars // page_chars))
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        # 檔案以 UTF-8 寫入，字元位置無法直接 seek：逐頁讀過去
+        for _ in range(page):
+            if not f.read(page_chars):
+                break
+        return f.read(page_chars), pages
+
+
+def collect_spill(max_age_days: float = SPILL_MAX_AGE_DAYS) -> int:
+    """刪除超過 max_age_days 的 spill 檔，回傳刪除的檔案數"""
+    if not os.path.isdir(SPILL_DIR):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for name in os.listdir(SPILL_DIR):
+        path = os.path.join(SPILL_DIR, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class OutputBuffer:
+
+    def __init__(self, on_chunk=None, interval: float = STREAM_INTERVAL,
+                 head_chars: int = HEAD_CHARS, tail_chars: int = TAIL_CHARS,
+                 max_chars: int = MAX_SPILL_CHARS):
+        self.on_chunk = on_chunk
+        self.max_chars = max_chars
+        self.interval = interval
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+
+        self._head = []
+        self._head_size = 0
+        self._tail = deque()
+        self._tail_size = 0
+        self._size = 0
+        self._spill = None
+        self._spill_path = None
+
+        self._pending = []
+        self._streamed = 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    # ---------- 寫入 ----------
+
+    def _open_spill(self) -> None:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        self._spill_path = os.path.join(SPILL_DIR, f"{uuid.uuid4().hex}.txt")
+        self._spill = open(self._spill_path, "w", encoding="utf-8")
+        # 到目前為止的輸出還全部在記憶體裡（head + tail），先寫進檔案
+        for part in self._head:
+            self._spill.write(part)
+        for part in self._tail:
+            self._spill.write(part)
+
+    def _keep(self, s: str) -> None:
+        """s 先填滿 head，其餘放進 tail（tail 只留最後 tail_chars 字元）"""
+        room = self.head_chars - self._head_size
+        if room > 0:
+            self._head.append(s[:room])
+            self._head_size += len(s[:room])
+            s = s[room:]
+        if not s:
+            return
+        self._tail.append(s)
+        self._tail_size += len(s)
+        while self._tail_size - len(self._tail[0]) >= self.tail_chars:
+            self._tail_size -= len(self._tail.popleft())
+
+    def write(self, s: str) -> int:
+        if not s:
+            return 0
+        due = False
+        with self._lock:
+            room = self.max_chars - self._size
+            if room <= 0:
+                raise OutputLimitExceeded()
+            over = len(s) > room
+            s = s[:room]
+
+            self._size += len(s)
+            if self._spill is None and self._size > self.head_chars + self.tail_chars:
+                self._open_spill()
+            if self._spill is not None:
+                self._spill.write(s)
+            self._keep(s)
+
+            if self.on_chunk is not None and self._streamed < self.head_chars:
+                part = s[:self.head_chars - self._streamed]
+                self._pending.append(part)
+                self._streamed += len(part)
+                due = time.monotonic() - self._last >= self.interval
+        if due:
+            self.flush()
+        if over:
+            raise OutputLimitExceeded()
+        return len(s)
+
+    def flush(self) -> None:
+        """把尚未送出的輸出交給 on_chunk"""
+        with self._lock:
+            if not self._pending:
+                return
+            text = "".join(self._pending)
+            self._pending = []
+            self._last = time.monotonic()
+        self.on_chunk(text)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+
+    # ---------- 結果 ----------
+
+    def getvalue(self) -> ExecutionResult:
+        with self._lock:
+            head = "".join(self._head)
+            if self._spill is None:
+                return ExecutionResult(head + "".join(self._tail))
+
+            tail = "".join(self._tail)[-self.tail_chars:]
+            omitted = self._size - len(head) - len(tail)
+            result = ExecutionResult(
+                f"{head}\n\n…（省略 {omitted:,} 字元，共 {self._size:,} 字元）…\n\n{tail}"
+            )
+            result.spill_path = self._spill_path
+            result.total_chars = self._size
+            return result
+
+
+# 原本的 stream 是 None（pythonw、打包成無 console 的 app）時，屬性的預設值
+_NO_STREAM_ATTRS = {"encoding": "utf-8", "errors": "strict", "newlines": None,
+                    "closed": False, "name": "<eqnote-output>"}
+
+
+class _DispatchingStream:
+    """取代 sys.stdout / sys.stderr：依目前 context 決定寫到哪裡"""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+
+    def write(self, s):
+        buf = _current.get()
+        if buf is None:
+            return self._fallback.write(s) if self._fallback is not None else len(s)
+        return buf.write(s)
+
+    def flush(self):
+        if _current.get() is None and self._fallback is not None:
+            self._fallback.flush()
+
+    def isatty(self):
+        if _current.get() is not None or self._fallback is None:
+            return False
+        return self._fallback.isatty()
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        if self._fallback is None:
+            raise io.UnsupportedOperation("fileno")
+        return self._fallback.fileno()
+
+    def __getattr__(self, name):
+        # encoding、errors… 交給原本的 stream；沒有原本的 stream 時用預設值
+        fallback = self.__dict__.get("_fallback")
+        if fallback is None:
+            if name in _NO_STREAM_ATTRS:
+                return _NO_STREAM_ATTRS[name]
+            raise AttributeError(name)
+        return getattr(fallback, name)
+
+
+def install() -> None:
+    """把 sys.stdout / sys.stderr 換成 dispatching proxy（重複呼叫無作用）"""
+    with _install_lock:
+        if not isinstance(sys.stdout, _DispatchingStream):
+            sys.stdout = _DispatchingStream(sys.stdout)
+        if not isinstance(sys.stderr, _DispatchingStream):
+            sys.stderr = _DispatchingStream(sys.stderr)
+
+
+@contextmanager
+def capture(on_chunk=None, max_chars: int = MAX_SPILL_CHARS):
+    """with 區塊內（同一個 context）的 stdout / stderr 都寫進新的 OutputBuffer"""
+    install()
+    buf = OutputBuffer(on_chunk=on_chunk, max_chars=max_chars)
+    token = _current.set(buf)
+    try:
+        yield buf
+    finally:
+        _current.reset(token)
+        buf.close()
+        if on_chunk is not None:
+            buf.flush()
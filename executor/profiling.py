@@ -0,0 +1,131 @@
+# executor/profiling.py
+"""
+python block 的執行量測。
+
+measure() 在執行 block 的 process 內包住 exec，記錄：
+  wall_ms   實際經過時間
+  cpu_ms    CPU 時間（time.process_time；in-process 後端會含 GUI 其他 thread）
+  rss_kb    執行後 process 的最大 RSS（resource.getrusage；整個 process 的歷史峰值，
+            kernel 與 worker 會重複使用，因此是「到目前為止」的峰值；Windows 為 None）
+  peak_kb   只在 profile=True 時量測：tracemalloc 追蹤到的這個 block 的記憶體峰值
+            （Python 物件與 NumPy 陣列資料；同一 process 已在 tracing 時為 None）
+profile=True（fence 加上 ```python profile）時另以 cProfile 量測，
+cumulative 時間最多的 PROFILE_TOP 個函式附在輸出後面。
+tracemalloc 會讓大量配置記憶體的程式慢上數倍，所以平常不開。
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+# cProfile 報表列出的函式數
+PROFILE_TOP = 15
+
+
+def _max_rss_kb():
+    """process 的最大 RSS（KB）；macOS 的 ru_maxrss 單位是 bytes"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else float(rss)
+
+
+@contextmanager
+def measure(profile: bool = False):
+    """yield 一個 dict，with 結束後填入 wall_ms / cpu_ms / rss_kb / peak_kb（profile 時再加 profile 文字）"""
+    stats = {}
+    traced = profile and not tracemalloc.is_tracing()
+    if traced:
+        tracemalloc.start()
+    prof = cProfile.Profile() if profile else None
+
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    if prof is not None:
+        prof.enable()
+    try:
+        yield stats
+    finally:
+        if prof is not None:
+            prof.disable()
+        stats["wall_ms"] = (time.perf_counter() - wall0) * 1000
+        stats["cpu_ms"] = (time.process_time() - cpu0) * 1000
+        stats["rss_kb"] = _max_rss_kb()
+        stats["peak_kb"] = None
+        if traced:
+            stats["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        if prof is not None:
+            stats["profile"] = format_profile(prof)
+
+
+def format_profile(prof: cProfile.Profile, top: int = PROFILE_TOP) -> str:
+    out = io.StringIO()
+    ps = pstats.Stats(prof, stream=out)
+    ps.strip_dirs().sort_stats("cumulative").print_stats(top)
+    text = out.getvalue().strip("\n")
+    return f"--- cProfile（cumulative 前 {top} 名）---\n{text}\n"
+
+
+def _fmt_ms(ms: float) -> str:
+    return f"{ms / 1000:.2f} s" if ms >= 1000 else f"{ms:.0f} ms"
+
+
+def _fmt_kb(kb: float) -> str:
+    return f"{kb / 1024:.1f} MB" if kb >= 1024 else f"{kb:.0f} KB"
+
+
+def _fmt_memory(stats: dict) -> str:
+    """有 tracemalloc 峰值（profile）就用它，否則用 process 的最大 RSS；都沒有時回傳 """""
+    if stats.get("peak_kb") is not None:
+        return _fmt_kb(stats["peak_kb"])
+    if stats.get("rss_kb") is not None:
+        return f"RSS {_fmt_kb(stats['rss_kb'])}"
+    return ""
+
+
+def format_stats(stats: dict, cached: bool = False) -> str:
+    """Run 按鈕旁的一行摘要，例如「⏱ 120 ms · CPU 110 ms · RSS 80.2 MB」"""
+    if not stats:
+        return ""
+    parts = [f"⏱ {_fmt_ms(stats['wall_ms'])}", f"CPU {_fmt_ms(stats['cpu_ms'])}"]
+    memory = _fmt_memory(stats)
+    if memory:
+        parts.append(memory)
+    text = " · ".join(parts)
+    return f"{text}（cache）" if cached else text
+
+
+def report_table(rows) -> str:
+    """
+    rows：[(label, stats, cached), ...]（文件順序）
+    回傳依 wall time 由大到小排序的文字報表
+    """
+    measured = [(label, st, cached) for label, st, cached in rows if st]
+    if not measured:
+        return "這份筆記沒有執行過的 python block。"
+
+    fresh = [st for _, st, cached in measured if not cached]
+    total_wall = sum(st["wall_ms"] for st in fresh)
+    total_cpu = sum(st["cpu_ms"] for st in fresh)
+
+    lines = [
+        f"python block：{len(rows)} 個（本次執行 {len(fresh)} 個，其餘沿用 cache）",
+        f"本次執行合計：wall {_fmt_ms(total_wall)}，CPU {_fmt_ms(total_cpu)}",
+        "",
+        f"{'wall':>9} {'CPU':>9} {'memory':>13}  block",
+    ]
+    for label, st, cached in sorted(measured, key=lambda r: -r[1]["wall_ms"]):
+        memory = _fmt_memory(st) or "-"
+        mark = " (cache)" if cached else ""
+        lines.append(f"{_fmt_ms(st['wall_ms']):>9} {_fmt_ms(st['cpu_ms']):>9} {memory:>13}  {label}{mark}")
+    return "\n".join(lines)
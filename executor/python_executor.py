@@ -1,47 +1,82 @@
 # executor/python_executor.py
 
-import sys
-import traceback
-from io import StringIO
+import time
+
+from executor.kernel import KernelClient, exec_capture
+from executor.limits import ExecutionLimits
 
 
 class PythonExecutor:
-    def __init__(self):
-        self.env = {}   # ★ 共享 namespace
+    """
+    執行 ```python 區塊。
 
-    #def run(self, code: str) -> str:
-    #    local_env = self.env
+    backend:
+      "kernel"     （預設）在獨立的 kernel process 執行，
+                   無窮迴圈或大量運算不會卡住編輯器，可逾時 / 中斷 / 重啟
+      "inprocess"  舊行為：直接在 GUI process 內 exec
 
+    shared=True 時在共用 namespace 執行（筆記本模式，block 之間保留變數）。
+    limits：資源上限（inprocess 只有輸出上限有效）。
+    """
 
-    @staticmethod
-    def run(code: str) -> str:
+    def __init__(self, backend: str = "kernel", limits: ExecutionLimits = None):
+        self.env = {"__name__": "__main__"}   # ★ 共享 namespace（inprocess 用）
+        self.backend = backend
+        self.limits = limits or ExecutionLimits()
+        self.kernel = KernelClient(limits=self.limits) if backend == "kernel" else None
+
+    def run(self, code: str, timeout: float = None, on_output=None,
+            shared: bool = False, profile: bool = False,
+            tag=None, on_start=None) -> str:
         """
-        在獨立乾淨的 namespace 執行 Python code。
-        回傳 stdout + stderr + exception 結果。
+        執行 Python code：預設在獨立乾淨的 namespace，shared=True 時在共用 namespace。
+        回傳 stdout + stderr + exception 結果；on_output(text) 會陸續收到執行中的輸出。
+        回傳值的 .stats 為執行量測（見 executor.profiling），另加上 roundtrip_ms
+        （本端看到的時間，含 kernel 通訊與排隊）。profile=True 時附上 cProfile 報表。
+        tag：interrupt(tag) 用來辨認這次執行；on_start() 在真正開始執行時呼叫（見 KernelClient.execute）。
         """
+        t0 = time.perf_counter()
+        if self.kernel is None:
+            if on_start is not None:
+                on_start()
+            result = self._run_inprocess(code, self.env if shared else None, self.limits, profile)
+        else:
+            result = self.kernel.execute(code, timeout, on_output, shared, profile,
+                                         tag=tag, on_start=on_start)
+        if getattr(result, "stats", None) is not None:
+            result.stats["roundtrip_ms"] = (time.perf_counter() - t0) * 1000
+        return result
+
+    @staticmethod
+    def _run_inprocess(code: str, env: dict = None, limits: ExecutionLimits = None,
+                       profile: bool = False) -> str:
+        # env 為 None：乾淨的環境（每段 code block 都是不相關的）
+        # GUI process 內不能設定記憶體 / CPU 上限
+        return exec_capture(code, env, limits=limits, profile=profile)
 
-        # 乾淨的環境（每段 code block 都是不相關的）
-        local_env = {}
+    @property
+    def session(self) -> int:
+        """共用 namespace 的世代；kernel 重啟後改變（之前的變數都不在了）"""
+        return self.kernel.generation if self.kernel is not None else 0
 
-        # 捕捉 stdout / stderr
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = StringIO()
-        sys.stderr = StringIO()
+    def reset(self) -> None:
+        """清空共用 namespace"""
+        self.env = {"__name__": "__main__"}
+        if self.kernel is not None:
+            self.kernel.reset()
 
-        try:
-            exec(code, {}, local_env)   # ★ 乾淨 sandbox：global={}, local=local_env
-        except Exception:
-            err = traceback.format_exc()
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
-            return f"Error:\n{err}"
+    # ---------- kernel 控制 ----------
 
-        # 聚合輸出
-        out = sys.stdout.getvalue() + sys.stderr.getvalue()
+    def warm(self) -> None:
+        """先啟動 kernel（不等 preload 完成）；main.py 在視窗顯示後由背景的 warm-up 呼叫"""
+        if self.kernel is not None:
+            self.kernel.start()
 
-        # 還原
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
+    def interrupt(self, tag=None) -> None:
+        """中斷 kernel 正在執行的 code；指定 tag 時只中斷 run(tag=tag) 的那一次"""
+        if self.kernel is not None:
+            self.kernel.interrupt(tag)
 
-        return out if out.strip() else "(no output)"
+    def restart(self) -> None:
+        if self.kernel is not None:
+            self.kernel.restart()
@@ -0,0 +1,78 @@
+# executor/result_cache.py
+"""
+python block 執行結果的 cache。
+
+每個 block 都在全新的 namespace 執行，結果只取決於程式碼本身，
+因此以 hash(code) 當 key：預覽更新（打字、切換主題、插入符號…）時
+程式碼沒變的 block 直接沿用上次的輸出，不再重跑。
+
+- 逾時 / 中斷 / kernel 當掉的結果不存（下次預覽會再試一次）
+- 超過 max_entries 時淘汰最久沒用到的；max_entries 至少是目前文件的 block 數
+  （ensure_capacity），否則大筆記每次預覽都會把自己的結果擠出去
+- 不適合 cache 的 block（亂數、時間、讀外部檔案）可在 fence 加上 nocache：
+    ```python nocache
+"""
+
+import hashlib
+from collections import OrderedDict
+
+# 這些輸出代表執行沒有正常結束，不放進 cache
+_TRANSIENT_MARKERS = ("KeyboardInterrupt", "TimeoutError: 執行超過",
+                      "kernel 意外結束", "worker 意外結束")
+
+
+def code_key(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def is_transient(output: str) -> bool:
+    """逾時 / 中斷 / kernel 當掉：下次應該重新執行的結果"""
+    return any(m in output for m in _TRANSIENT_MARKERS)
+
+
+class ExecutionCache:
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()     # key → output
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0                  # nocache block 的執行次數
+
+    def get(self, code: str):
+        key = code_key(code)
+        output = self._entries.get(key)
+        if output is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return output
+
+    def ensure_capacity(self, n: int) -> None:
+        """至少能放下 n 筆（目前文件的 block 數、從 sidecar 讀回的輸出數）"""
+        self.max_entries = max(self.max_entries, n)
+
+    def put(self, code: str, output: str) -> None:
+        self.put_key(code_key(code), output)
+
+    def put_key(self, key: str, output: str) -> None:
+        """以 code_key(code) 直接存入（例如從筆記的 sidecar 讀回的輸出）"""
+        if is_transient(output):
+            return
+        self._entries[key] = output
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = self.skipped = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+        }
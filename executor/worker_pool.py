@@ -0,0 +1,180 @@
+# executor/worker_pool.py
+"""
+預先啟動（warm）的 process pool，供繪圖與程式區塊平行執行共用。
+
+- worker 以 spawn 啟動（與 kernel 相同），不 fork GUI process
+- 每個 worker 啟動時先 import preload 裡的模組（numpy、matplotlib…），
+  之後每個工作都不必再付 import 的代價
+- map_ordered：一次送出所有工作，結果依輸入順序回傳
+- 單一工作逾時：整個 pool 的 process 直接結束並重建，其餘未完成的工作重新送出，
+  逾時的那一項回傳 TimeoutError，不會拖住其他工作
+- worker 異常結束（BrokenProcessPool）：重建 pool，尚未開始的工作重新送出，
+  當時正在執行的工作最後逐一單獨重跑，找出真正讓 worker 當掉的那一項
+- 同一個 pool 可由多個 thread 使用（即時預覽、虛擬化預覽、啟動時的 warm）：
+  map_ordered / warm / shutdown 以 _lock 序列化，重建 pool 時只會影響
+  同一次 map_ordered 的工作（其餘的重新送出），不會讓別的呼叫端收到 BrokenProcessPool
+"""
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Sequence, Tuple
+
+
+def _warm_up(preload: Sequence[str], setup: Callable = None) -> None:
+    """worker 的 initializer：先跑 setup，再 import 常用模組"""
+    if setup is not None:
+        setup()
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _noop() -> int:
+    return os.getpid()
+
+
+class WarmProcessPool:
+
+    # 逾時檢查的輪詢間隔（秒）
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, max_workers: int = None,
+                 preload: Sequence[str] = (),
+                 setup: Callable = None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.preload = tuple(preload)
+        self.setup = setup
+        self._pool = None
+        self._lock = threading.RLock()
+        atexit.register(self._shutdown)    # 結束時不等執行中的 map_ordered
+
+    # ---------- 生命週期 ----------
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn：fork 會複製整個 GUI process（含 Qt 的 thread），不安全
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+                initargs=(self.preload, self.setup),
+            )
+        return self._pool
+
+    def warm(self) -> None:
+        """讓每個 worker 都先啟動並完成 preload（不等待結果）"""
+        with self._lock:
+            pool = self._ensure_pool()
+            for _ in range(self.max_workers):
+                pool.submit(_noop)
+
+    def shutdown(self) -> None:
+        """結束所有 worker（包含卡住的）；其他 thread 的 map_ordered 執行中時等它做完"""
+        with self._lock:
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        """結束所有 worker，不等待未完成的工作（呼叫端持有 _lock，或 process 正在結束）"""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        for proc in list(getattr(pool, "_processes", {}).values()):
+            if proc.is_alive():
+                proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- 執行 ----------
+
+    def map_ordered(self, fn: Callable, items: Sequence[tuple],
+                    timeout: float = None) -> List[Tuple[bool, object]]:
+        """
+        對每個 items[i]（參數 tuple）執行 fn(*items[i])。
+        回傳依輸入順序的 [(ok, 結果或例外), ...]。
+        timeout 以「該工作開始執行」起算。
+        多個 thread 同時呼叫時依序執行（見 _lock）。
+        """
+        with self._lock:
+            return self._map_ordered(fn, items, timeout)
+
+    def _map_ordered(self, fn: Callable, items: Sequence[tuple],
+                     timeout: float = None) -> List[Tuple[bool, object]]:
+        results: List[Tuple[bool, object]] = [None] * len(items)
+        suspects = []      # pool 壞掉時正在執行的工作：之後逐一單獨重跑
+        retries = {}
+
+        # 同時送出的工作不超過 worker 數：ProcessPoolExecutor 會把排在 call queue
+        # 裡的工作也標成 running，全部一次送出的話，排隊時間也會被算進 timeout
+        queued = list(range(len(items)))
+        queued.reverse()
+        pending = {}
+        pool = self._ensure_pool()
+        started = {}
+
+        while pending or queued:
+            while queued and len(pending) < self.max_workers:
+                i = queued.pop()
+                pending[i] = pool.submit(fn, *items[i])
+
+            wait(list(pending.values()), timeout=self.POLL_INTERVAL,
+                 return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            restart = False
+
+            for i, fut in list(pending.items()):
+                if fut.done():
+                    del pending[i]
+                    try:
+                        results[i] = (True, fut.result())
+                    except BrokenProcessPool as e:
+                        restart = True
+                        retries[i] = retries.get(i, 0) + 1
+                        if i in started:
+                            suspects.append(i)
+                        elif retries[i] > 2:
+                            results[i] = (False, e)
+                        else:
+                            queued.append(i)       # 還沒開始跑：重建 pool 後再送
+                    except Exception as e:
+                        results[i] = (False, e)
+                    continue
+
+                if fut.running():
+                    started.setdefault(i, now)
+                if timeout is not None and i in started and now - started[i] > timeout:
+                    del pending[i]
+                    results[i] = (False, TimeoutError(f"超過 {timeout:g} 秒未完成"))
+                    restart = True
+
+            if restart:
+                # 卡住或壞掉的 worker 無法個別中止：整個 pool 重建，未完成的重新送出
+                # （持有 _lock，pool 裡只有這次呼叫的工作）
+                self._shutdown()
+                pool = self._ensure_pool()
+                queued.extend(sorted(pending, reverse=True))
+                pending.clear()
+                started.clear()
+
+        # 可能讓 worker 當掉的工作單獨重跑一次，再壞就確定是它
+        for i in suspects:
+            fut = self._ensure_pool().submit(fn, *items[i])
+            try:
+                results[i] = (True, fut.result(timeout=timeout))
+            except BrokenProcessPool as e:
+                results[i] = (False, e)
+                self._shutdown()
+            except FutureTimeoutError:
+                results[i] = (False, TimeoutError(f"超過 {timeout:g} 秒未完成"))
+                self._shutdown()
+            except Exception as e:
+                results[i] = (False, e)
+
+        return results
@@ -1,9 +1,9 @@
 # latex/core_latex.py
-import os
 import re
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime
+
+from plot import plot_cache
+from plot.figure_pool import FIGURE_POOL
 
 
 class LatexPlotEngine:
@@ -96,6 +96,13 @@ class LatexPlotEngine:
 
         latex_str = latex_str.strip().strip('$')
 
+        # 同樣的公式 + 範圍 + 主題 → 同一個檔名；命中就不跑 matplotlib
+        filename = plot_cache.cache_path(
+            "latex_plot", latex_str, float(x_min), float(x_max), color, bool(dark_mode)
+        )
+        if plot_cache.lookup(filename):
+            return filename
+
         # 取等號右側（允許多個式子）
         if '=' in latex_str:
             expr_part = latex_str.split('=')[-1]
@@ -124,27 +131,21 @@ class LatexPlotEngine:
         bg = "black" if dark_mode else "white"
         fg = "white" if dark_mode else "black"
 
-        # 繪圖
-        plt.figure(facecolor=bg)
-        for i, expr_py in enumerate(expr_py_list):
-            try:
-                y = eval(expr_py, {"np": np, "x": x})
-                plt.plot(x, y, color=colors[i % len(colors)], linewidth=2, label=expr_list[i])
-            except Exception as e:
-                print(f"⚠️ 無法繪製 {expr_list[i]}: {e}")
-
-        plt.grid(True, color="gray", alpha=0.3)
-        plt.legend(facecolor=bg, edgecolor="gray", labelcolor=fg)
-        plt.title(latex_str, color=fg)
-        plt.xlabel("x", color=fg)
-        plt.ylabel("y", color=fg)
-        plt.gca().tick_params(colors=fg)
-
-        # === 在這裡建立 filename（之前的版本少了這行，導致 NameError）===
-        os.makedirs("plots", exist_ok=True)
-        filename = f"plots/latex_plot_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.png"
-
-        # 儲存與關閉
-        plt.savefig(filename, dpi=150, bbox_inches="tight", facecolor=bg)
-        plt.close()
-        return filename
+        # 繪圖（重複使用 pool 裡的 Figure/Agg canvas，直接輸出 PNG bytes）
+        def draw(fig, ax):
+            for i, expr_py in enumerate(expr_py_list):
+                try:
+                    y = eval(expr_py, {"np": np, "x": x})
+                    ax.plot(x, y, color=colors[i % len(colors)], linewidth=2, label=expr_list[i])
+                except Exception as e:
+                    print(f"⚠️ 無法繪製 {expr_list[i]}: {e}")
+
+            ax.grid(True, color="gray", alpha=0.3)
+            ax.legend(facecolor=bg, edgecolor="gray", labelcolor=fg)
+            ax.set_title(latex_str, color=fg)
+            ax.set_xlabel("x", color=fg)
+            ax.set_ylabel("y", color=fg)
+            ax.tick_params(colors=fg)
+
+        png = FIGURE_POOL.render_png(draw, facecolor=bg, dpi=150)
+        return plot_cache.store(filename, png)
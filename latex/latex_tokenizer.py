@@ -5,11 +5,24 @@
 - 不做 Markdown、不做 HTML、不做 escape
 """
 
+from bisect import bisect_right
 from dataclasses import dataclass
 from typing import Dict, Tuple
 import re
 
 
+# Block LaTeX：$$ ... $$（可跨行）
+BLOCK_LATEX_RE = re.compile(r"\$\$(.*?)\$\$", flags=re.DOTALL)
+
+# Inline LaTeX：$ ... $（同一行內，不與 $$ 相鄰）
+INLINE_LATEX_RE = re.compile(r"(?<!\$)\$(?!\$)([^$\n]+?)\$(?!\$)")
+
+# 以上文法也給編輯區的語法上色使用（editor.highlighter）
+
+# protect() 產生的 token
+TOKEN_RE = re.compile(r"⟦LATEX_\d+⟧")
+
+
 @dataclass
 class LatexToken:
     kind: str          # "inline" | "block"
@@ -17,6 +30,39 @@ class LatexToken:
     raw: str           # 含 delimiters 的原始字串
 
 
+class OffsetMap:
+    """
+    protect() 之後文字的位置 → 原始文字的位置。
+    token 比原本的 LaTeX 短（也不含換行），之後的位置都要加上累積的長度差；
+    以 token 結束位置的排序陣列 + bisect 查詢，O(log n)。
+    """
+
+    def __init__(self, protected: str, token_map: Dict[str, LatexToken]):
+        self._ends = []      # token 在 protected 中的結束位置（遞增）
+        self._deltas = []    # 到這個 token 為止累積的長度差（原始 - protected）
+        delta = 0
+        for m in TOKEN_RE.finditer(protected):
+            token = token_map.get(m.group(0))
+            if token is None:
+                continue
+            delta += len(expand_tokens(token.raw, token_map)) - len(m.group(0))
+            self._ends.append(m.end())
+            self._deltas.append(delta)
+
+    def to_source(self, pos: int) -> int:
+        i = bisect_right(self._ends, pos)
+        return pos + (self._deltas[i - 1] if i else 0)
+
+
+def expand_tokens(text: str, token_map: Dict[str, LatexToken]) -> str:
+    """還原 text 裡的 token（inline 的 raw 可能含有先前 block 的 token）"""
+    def repl(m):
+        token = token_map.get(m.group(0))
+        return expand_tokens(token.raw, token_map) if token else m.group(0)
+
+    return TOKEN_RE.sub(repl, text)
+
+
 class LatexTokenizer:
 
     def __init__(self):
@@ -46,12 +92,14 @@ class LatexTokenizer:
 
         return text, dict(self._token_map)
 
+    def offset_map(self, protected: str) -> OffsetMap:
+        """最近一次 protect() 的結果 → 原始文字位置的對照"""
+        return OffsetMap(protected, self._token_map)
+
     # =========================================================
     # Block LaTeX：$$ ... $$
     # =========================================================
     def _protect_block(self, text: str) -> str:
-        pattern = re.compile(r"\$\$(.*?)\$\$", flags=re.DOTALL)
-
         def repl(match):
             raw = match.group(0)          # $$ ... $$
             content = match.group(1)      # 內部
@@ -61,16 +109,12 @@ class LatexTokenizer:
                 content=content
             )
 
-        return pattern.sub(repl, text)
+        return BLOCK_LATEX_RE.sub(repl, text)
 
     # =========================================================
     # Inline LaTeX：$ ... $（同一行內）
     # =========================================================
     def _protect_inline(self, text: str) -> str:
-        pattern = re.compile(
-            r"(?<!\$)\$(?!\$)([^$\n]+?)\$(?!\$)"
-        )
-
         def repl(match):
             raw = match.group(0)
             content = match.group(1)
@@ -80,5 +124,5 @@ class LatexTokenizer:
                 content=content
             )
 
-        return pattern.sub(repl, text)
+        return INLINE_LATEX_RE.sub(repl, text)
 
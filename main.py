@@ -1,12 +1,32 @@
 # main.py
 import sys
-from PyQt5.QtWidgets import QApplication
+import multiprocessing
 
-from ui.ui_mainwindow import SmartMathNote
-from editor import Editor
+# ★ 最先 import：以此為啟動時間的 0 點
+from ui.startup import STARTUP_TIMER
+
+if __name__ == "__main__" and "--startup-report" in sys.argv:
+    # 只量測啟動 import，不開視窗：python main.py --startup-report
+    from ui.startup import import_time_report
+    print(import_time_report())
+    sys.exit(0)
 
 
 if __name__ == "__main__":
+    # PyInstaller 打包後 worker / kernel process 需要這行才不會重跑整個 app
+    multiprocessing.freeze_support()
+
+    # GUI 模組放在 __main__ 區塊內：python kernel（spawn）會重新 import 本檔，
+    # 不必跟著載入 PyQt 與整個 UI
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+
+    from ui.ui_mainwindow import SmartMathNote
+    from ui.startup import warm_up_in_background
+    from editor import Editor
+
+    STARTUP_TIMER.mark("imports_done")
+
     app = QApplication(sys.argv)
 
     # 建立主視窗
@@ -17,4 +37,18 @@ if __name__ == "__main__":
     win.editor = Editor(win.text_input)
 
     win.show()
+
+    # 以下在 event loop 開始後才執行（視窗已經出現）
+    QTimer.singleShot(0, lambda: STARTUP_TIMER.mark("window_shown"))
+
+    # 背景載入 numpy / matplotlib / plot 引擎，並預先啟動 kernel、block 與繪圖 worker
+    def warm_workers():
+        controller = win.document_controller
+        controller.executor.warm()
+        if controller.parallel_blocks:
+            controller.block_pool.warm()
+        win.html_renderer.plot_pool.warm()
+
+    QTimer.singleShot(0, lambda: warm_up_in_background(on_done=warm_workers))
+
     sys.exit(app.exec_())
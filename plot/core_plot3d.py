@@ -1,9 +1,12 @@
 # core_plot3d.py
 import numpy as np
 import json
-from datetime import datetime
+from uuid import uuid4
 import os
 
+from plot.data_loader import load_columns, open_grid
+from plot.gridding import grid_xyz
+
 class Plot3DEngine:
     """
     產生可由 Plotly 渲染的 3D 曲面 HTML 片段。
@@ -16,13 +19,20 @@ class Plot3DEngine:
          0 0 1.0
          0 1 1.2
          ...
+       也可用二進位格式：.npy / .npz / .bin（見 plot.data_loader），
+       2D 格網陣列會直接從 memory-map 間隔取樣，不會整個載入
     """
 
+    # 格網資料每個方向最多送進 Plotly 的點數
+    max_grid = 200
+    # 散亂點 gridding 的預設解析度（每個方向）
+    default_grid_res = 100
+
     # --------- 共用：把 X,Y,Z 轉成 Plotly 3D HTML ---------
     @staticmethod
     def _surface_html_from_grid(X, Y, Z, dark_mode=True, label=None, div_id=None):
         if div_id is None:
-            div_id = "plot3d_" + datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            div_id = "plot3d_" + uuid4().hex
         if label is None:
             label = "3D surface"
 
@@ -115,9 +125,14 @@ class Plot3DEngine:
     @staticmethod
     def make_surface_from_xyz_file(filepath: str,
                                    dark_mode: bool = True,
-                                   label: str = None) -> str:
+                                   label: str = None,
+                                   grid_res=None,
+                                   fill: str = "nearest") -> str:
         """
         讀取 3 欄 (x, y, z) 資料檔，重建規則網格並畫 3D 曲面。
+        點數無法組成規則網格（散亂量測點）時，以 plot.gridding 分箱平均到
+        grid_res = (nx, ny) 的網格（未指定時為 default_grid_res），
+        空格依 fill（"none" / "nearest" / "linear"）補值。
         檔案可有 header，也可無：
 
         x y z
@@ -132,41 +147,40 @@ class Plot3DEngine:
         ...
         """
 
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"找不到資料檔：{filepath}")
-
-        # 判斷是否有 header
-        with open(filepath, "r", encoding="utf-8") as f:
-            first_line = f.readline().strip()
-        tokens = first_line.split()
-        has_header = False
-        if len(tokens) >= 3:
-            try:
-                float(tokens[0]); float(tokens[1]); float(tokens[2])
-            except:
-                has_header = True
-
-        if has_header:
-            data = np.loadtxt(filepath, skiprows=1)
-        else:
-            data = np.loadtxt(filepath)
-
-        if data.ndim == 1 or data.shape[1] < 3:
+        # 二進位格網（.npy / .npz / .bin）：直接從 memmap 間隔取樣
+        grid = open_grid(filepath)
+        if grid is not None:
+            x, y, Z = grid
+            sy = max(1, -(-Z.shape[0] // Plot3DEngine.max_grid))
+            sx = max(1, -(-Z.shape[1] // Plot3DEngine.max_grid))
+            x = np.asarray(x[::sx], dtype=np.float64)
+            y = np.asarray(y[::sy], dtype=np.float64)
+            Z = np.asarray(Z[::sy, ::sx], dtype=np.float64)
+            X, Y = np.meshgrid(x, y)
+            if label is None:
+                label = os.path.basename(filepath)
+            return Plot3DEngine._surface_html_from_grid(X, Y, Z, dark_mode=dark_mode, label=label)
+
+        # 解析與快取交給 plot.data_loader；cache 以欄連續存放，只會讀到前三欄
+        columns, _ = load_columns(filepath)
+        if columns.shape[0] < 3:
             raise ValueError("3D 資料檔需至少三欄 (x, y, z)。")
 
-        xs = data[:, 0]
-        ys = data[:, 1]
-        zs = data[:, 2]
+        xs, ys, zs = (np.asarray(columns[i]) for i in range(3))
+
+        if label is None:
+            label = os.path.basename(filepath)
 
         x_unique = np.unique(xs)
         y_unique = np.unique(ys)
         nx = len(x_unique)
         ny = len(y_unique)
 
-        if nx * ny != len(xs):
-            raise ValueError(
-                f"資料點數 {len(xs)} 無法重組為規則網格 nx*ny = {nx}*{ny}。"
-            )
+        # 指定解析度，或點數無法組成規則網格（散亂量測點）→ 向量化 gridding
+        if grid_res is not None or nx * ny != len(xs):
+            gx, gy = grid_res or (Plot3DEngine.default_grid_res,) * 2
+            X, Y, Z = grid_xyz(xs, ys, zs, nx=gx, ny=gy, fill=fill)
+            return Plot3DEngine._surface_html_from_grid(X, Y, Z, dark_mode=dark_mode, label=label)
 
         # 建立網格索引：假設資料是任意順序，我們按 (y, x) 排序後 reshape
         # 先依 y, 再依 x 排序
@@ -179,9 +193,6 @@ class Plot3DEngine:
         Y = ys_sorted.reshape(ny, nx)
         Z = zs_sorted.reshape(ny, nx)
 
-        if label is None:
-            label = os.path.basename(filepath)
-
         return Plot3DEngine._surface_html_from_grid(X, Y, Z, dark_mode=dark_mode, label=label)
 
     @staticmethod
@@ -1,7 +1,12 @@
 # core_plot_data.py
 import numpy as np
 import json
-from datetime import datetime
+import os
+from uuid import uuid4
+
+from plot.data_loader import load_columns
+from plot.downsample import downsample_xy, slice_x_range, x_is_sorted
+from plot.live_data import read_tail
 
 class PlotDataEngine:
     """
@@ -11,6 +16,18 @@ class PlotDataEngine:
        有或沒有 header 都可
     """
 
+    # 每條線最多送進 Plotly 的點數（超過就降採樣）
+    point_budget = 4000
+    # 原始點數超過此值改用 WebGL（scattergl）
+    webgl_threshold = 20000
+    # "lttb" 或 "minmax"
+    downsample_method = "lttb"
+    # live 模式預設保留的最近列數（rolling window）
+    live_window = 2000
+
+    # (絕對路徑, mtime, size) → x 是否遞增；每次 zoom 不必再整條掃過 x
+    _sorted_cache = {}
+
     @staticmethod
     def load_xy_multi(filepath: str):
         """
@@ -18,54 +35,90 @@ class PlotDataEngine:
             x: 一維 ndarray
             ys: 多條線的 list，每條都是 ndarray
             labels: ["x", "y1", "y2", ...]
-        """
 
-        # 讀第一行看是否為 header
-        with open(filepath, "r", encoding="utf-8") as f:
-            first_line = f.readline().strip()
-
-        cols = first_line.split()
-        has_header = False
-
-        if len(cols) >= 2:
-            try:
-                float(cols[0]); float(cols[1])
-            except:
-                has_header = True
-
-        if has_header:
-            # 跳過 header
-            data = np.loadtxt(filepath, skiprows=1)
-            labels = cols  # header 名稱
-        else:
-            data = np.loadtxt(filepath)
-            ncol = data.shape[1]
-            labels = ["x"] + [f"y{i}" for i in range(1, ncol)]
+        解析與快取交給 plot.data_loader（第二次之後直接 memory-map .npy）。
+        """
+        columns, labels = load_columns(filepath)
 
-        if data.ndim == 1 or data.shape[1] < 2:
+        if columns.shape[0] < 2:
             raise ValueError("資料至少需要兩欄（x 與至少一條 y）。")
 
-        x = data[:, 0]
-        ys = [data[:, i] for i in range(1, data.shape[1])]
+        if labels is None:
+            labels = ["x"] + [f"y{i}" for i in range(1, columns.shape[0])]
+
+        x = columns[0]
+        ys = [columns[i] for i in range(1, columns.shape[0])]
 
         return x, ys, labels
 
     @staticmethod
-    def make_xy_plot(filepath: str, dark_mode=True):
+    def _downsample_traces(x, ys, budget: int, method: str):
+        """對每條 y 降採樣，回傳 [(x_ds, y_ds), ...]"""
+        return [downsample_xy(x, y, budget, method=method) for y in ys]
+
+    @staticmethod
+    def _x_sorted(filepath: str, x) -> bool:
+        """x 是否遞增：同一版本的檔案只檢查一次"""
+        st = os.stat(filepath)
+        key = (os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+        cache = PlotDataEngine._sorted_cache
+        if key not in cache:
+            if len(cache) >= 64:
+                cache.clear()
+            cache[key] = x_is_sorted(x)
+        return cache[key]
+
+    @staticmethod
+    def range_json(filepath: str, x0: float, x1: float,
+                   budget: int = None, method: str = None) -> str:
+        """
+        給 WebBridge 用：使用者 zoom 後，回傳 [x0, x1] 範圍內的資料（JSON）。
+        範圍內點數不超過 budget 時就是完整細節。
+        """
+        budget = budget or PlotDataEngine.point_budget
+        method = method or PlotDataEngine.downsample_method
+
+        x, ys, _ = PlotDataEngine.load_xy_multi(filepath)
+        sel = slice_x_range(x, x0, x1, PlotDataEngine._x_sorted(filepath, x))
+        xs = x[sel]
+        traces = PlotDataEngine._downsample_traces(
+            xs, [y[sel] for y in ys], budget, method
+        )
+        return json.dumps({
+            "traces": [{"x": tx.tolist(), "y": ty.tolist()} for tx, ty in traces]
+        })
+
+    @staticmethod
+    def make_xy_plot(filepath: str, dark_mode=True,
+                     point_budget: int = None, method: str = None):
         """
         回傳可嵌入 HTML 的 <div> + <script>，自動畫多條線。
+
+        大檔案：
+          - 每條線最多送 point_budget 個點（LTTB 或 min/max 降採樣）
+          - 原始點數超過 webgl_threshold 時改用 scattergl
+          - 先畫降採樣的總覽；使用者 zoom 時透過 bridge.fetchPlotRange
+            取回該範圍的細節，雙擊（autorange）回到總覽
         """
+        point_budget = point_budget or PlotDataEngine.point_budget
+        method = method or PlotDataEngine.downsample_method
 
         x, ys, labels = PlotDataEngine.load_xy_multi(filepath)
+        n_points = len(x)
 
         # labels[0] 是 x label，其餘是 y labels
         x_label = labels[0]
         y_labels = labels[1:]
 
-        div_id = "plotdata_" + datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        downsampled = n_points > point_budget
+        use_webgl = n_points > PlotDataEngine.webgl_threshold
+        traces = PlotDataEngine._downsample_traces(x, ys, point_budget, method)
+
+        div_id = "plotdata_" + uuid4().hex
 
         js_div = json.dumps(div_id)
-        js_x = json.dumps(x.tolist())
+        js_type = json.dumps("scattergl" if use_webgl else "scatter")
+        js_mode = json.dumps("lines" if downsampled else "lines+markers")
 
         bg = "#000000" if dark_mode else "#ffffff"
         fg = "#ffffff" if dark_mode else "#000000"
@@ -74,16 +127,18 @@ class PlotDataEngine:
         js_data_lines = []
         palette = ["#ff5733", "#33c1ff", "#9dff33", "#ff33ed", "#febf00", "#62ffda"]
 
-        for i, y in enumerate(ys):
-            js_y = json.dumps(y.tolist())
+        for i, (tx, ty) in enumerate(traces):
+            js_x = json.dumps(tx.tolist())
+            js_y = json.dumps(ty.tolist())
             color = json.dumps(palette[i % len(palette)])
             name = json.dumps(y_labels[i])
 
             js_data_lines.append(f"""
             {{
+                type: {js_type},
                 x: {js_x},
                 y: {js_y},
-                mode: 'lines+markers',
+                mode: {js_mode},
                 name: {name},
                 line: {{color: {color}, width: 2}}
             }}
@@ -91,6 +146,34 @@ class PlotDataEngine:
 
         js_data = ",\n".join(js_data_lines)
 
+        # 有降採樣時才需要 zoom → 取細節
+        js_zoom = ""
+        if downsampled:
+            js_zoom = f"""
+  var div = document.getElementById({js_div});
+  var overview = data.map(function(t) {{ return {{x: t.x, y: t.y}}; }});
+  var idxs = data.map(function(_, i) {{ return i; }});
+
+  div.on('plotly_relayout', function(ev) {{
+    if (ev['xaxis.autorange']) {{
+      Plotly.restyle(div, {{
+        x: overview.map(function(t) {{ return t.x; }}),
+        y: overview.map(function(t) {{ return t.y; }})
+      }}, idxs);
+      return;
+    }}
+    var x0 = ev['xaxis.range[0]'], x1 = ev['xaxis.range[1]'];
+    if (x0 === undefined || x1 === undefined || !window.bridge) return;
+    bridge.fetchPlotRange({json.dumps(filepath)}, x0, x1, {point_budget}, function(res) {{
+      var r = JSON.parse(res);
+      Plotly.restyle(div, {{
+        x: r.traces.map(function(t) {{ return t.x; }}),
+        y: r.traces.map(function(t) {{ return t.y; }})
+      }}, idxs);
+    }});
+  }});
+"""
+
         html = f"""
 <div id="{div_id}" style="width:100%; height:400px;"></div>
 <script>
@@ -114,6 +197,80 @@ class PlotDataEngine:
   }};
 
   Plotly.newPlot({js_div}, data, layout);
+{js_zoom}}})();
+</script>
+"""
+        return html
+
+    @staticmethod
+    def make_live_plot(filepath: str, dark_mode=True, window: int = None):
+        """
+        plot_data("run.log", live)：tail-follow 模式。
+
+        先畫出檔案最後 window 列；之後由 ui.live_follower 監看檔案，
+        只讀新增的 bytes，透過 bridge.liveRows → Plotly.extendTraces 推進來，
+        圖上最多保留 window 個點。
+        檔案還沒有資料（也沒有 header）時先畫空圖，線在第一批資料到達時才加上。
+        """
+        window = window or PlotDataEngine.live_window
+
+        labels, rows, offset = read_tail(filepath, window)
+        ncol = rows.shape[1]
+        if ncol == 1:
+            raise ValueError("資料至少需要兩欄（x 與至少一條 y）。")
+        if labels is None:
+            labels = ["x"] + [f"y{i}" for i in range(1, ncol)]
+
+        div_id = "plotlive_" + uuid4().hex
+        js_div = json.dumps(div_id)
+        js_type = json.dumps(
+            "scattergl" if window > PlotDataEngine.webgl_threshold else "scatter"
+        )
+
+        bg = "#000000" if dark_mode else "#ffffff"
+        fg = "#ffffff" if dark_mode else "#000000"
+        palette = ["#ff5733", "#33c1ff", "#9dff33", "#ff33ed", "#febf00", "#62ffda"]
+
+        js_x = json.dumps(rows[:, 0].tolist() if ncol else [])
+        js_data_lines = []
+        for i in range(1, ncol):
+            js_data_lines.append(f"""
+            {{
+                type: {js_type},
+                x: {js_x},
+                y: {json.dumps(rows[:, i].tolist())},
+                mode: 'lines',
+                name: {json.dumps(labels[i] if i < len(labels) else f"y{i}")},
+                line: {{color: {json.dumps(palette[(i - 1) % len(palette)])}, width: 2}}
+            }}
+            """)
+        js_data = ",\n".join(js_data_lines)
+
+        html = f"""
+<div id="{div_id}" style="width:100%; height:400px;"></div>
+<script>
+(function() {{
+  var data = [
+    {js_data}
+  ];
+
+  var layout = {{
+      margin: {{l: 50, r: 10, t: 30, b: 50}},
+      paper_bgcolor: {json.dumps(bg)},
+      plot_bgcolor: {json.dumps(bg)},
+      font: {{color: {json.dumps(fg)}}},
+      title: {json.dumps(filepath + " (live)")},
+      xaxis: {{title: {json.dumps(labels[0])}, color: {json.dumps(fg)}}},
+      yaxis: {{title: 'value', color: {json.dumps(fg)}}},
+      legend: {{
+        x: 1.02,
+        y: 1,
+        bgcolor: {json.dumps(bg)}
+      }}
+  }};
+
+  Plotly.newPlot({js_div}, data, layout);
+  followFile({js_div}, {json.dumps(filepath)}, {offset}, {ncol}, {window});
 }})();
 </script>
 """
@@ -2,7 +2,7 @@
 import numpy as np
 import json
 import re
-from datetime import datetime
+from uuid import uuid4
 
 class PlotFunc2DEngine:
     """
@@ -170,7 +170,7 @@ class PlotFunc2DEngine:
             styles.append(PlotFunc2DEngine._parse_style(style_spec, idx))
 
         # 準備 Plotly HTML
-        div_id = "plot2d_" + datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        div_id = "plot2d_" + uuid4().hex
         js_div = json.dumps(div_id)
         js_x = json.dumps(x.tolist())
 
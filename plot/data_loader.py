@@ -0,0 +1,377 @@
+# plot/data_loader.py
+"""
+plot_data / plot3d_data 共用的資料讀取層。
+
+流程：
+  1) 以 (絕對路徑, mtime, size) 算出 cache key
+  2) cache 命中 → np.load(mmap_mode="r") 直接 memory-map，不再解析文字
+  3) cache 未命中 → 整塊讀入，用 np.fromstring 一次 tokenize，
+     寫入 .eqnote_cache/ 下的 .npy（欄優先 column-major）；
+     先寫到 mkstemp 的暫存檔再 os.replace，多個 process 同時寫也不會互相覆蓋
+
+檔案格式（與舊版相同）：
+   x y1 y2 ...      ← 可有可無的 header
+   0 1.0 2.0
+   ...
+
+二進位格式（直接 memory-map，不經過 cache）：
+   .npy            2D 陣列 (nrow, ncol)，或 1D 陣列（單欄）
+   .npz            一個 2D 陣列，或多個等長 1D 陣列（key 當作欄名）；
+                   未壓縮（np.savez）的成員會直接 memory-map，
+                   壓縮（np.savez_compressed）的只能整個讀入
+   .bin / .raw     little-endian 原始資料，旁邊放描述檔 <檔名>.json：
+                     {"dtype": "<f8", "columns": 3,
+                      "labels": ["t", "a", "b"], "offset": 0}
+                   格網資料則寫 {"dtype": "<f4", "shape": [ny, nx]}
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import tempfile
+import warnings
+import zipfile
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+CACHE_DIR_NAME = ".eqnote_cache"
+
+# 直接 memory-map 的二進位格式
+BINARY_EXTS = (".npy", ".npz", ".bin", ".raw")
+
+
+def is_binary(filepath: str) -> bool:
+    return os.path.splitext(filepath)[1].lower() in BINARY_EXTS
+
+
+# =========================================================
+# header 偵測
+# =========================================================
+def _is_float(token: str) -> bool:
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def sniff_header(filepath: str) -> Optional[List[str]]:
+    """第一行只要有非數字 token 就視為 header，回傳 header tokens；否則回傳 None。"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        first_line = f.readline().strip()
+    tokens = first_line.split()
+    if tokens and not all(_is_float(t) for t in tokens):
+        return tokens
+    return None
+
+
+# =========================================================
+# 文字解析
+# =========================================================
+def _uniform_fields(body: str, ncol: int) -> bool:
+    """每個非空白行都剛好有 ncol 個欄位（以 numpy 向量化計算，不逐行 split）"""
+    buf = np.frombuffer(body.encode("utf-8"), dtype=np.uint8)
+    newline = buf == 10
+    blank = newline | (buf == 32) | (buf == 9) | (buf == 13) | (buf == 11) | (buf == 12)
+    # 欄位起點：非空白字元，且前一個字元是空白（或是開頭）
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    counts = np.bincount(np.cumsum(newline)[starts])
+    counts = counts[counts > 0]
+    return bool((counts == ncol).all())
+
+
+def parse_rows(body: str, ncol: int = None) -> np.ndarray:
+    """
+    把一段文字資料解析成 2D ndarray (nrow, ncol)。
+    快速路徑：np.fromstring 一次 tokenize（總數可整除不代表每行欄數一致，
+    另外檢查每行的欄位數）；有註解、欄數不一致等情況時退回 np.loadtxt。
+    """
+    if not body.strip():
+        return np.empty((0, ncol or 0))
+
+    if ncol is None:
+        first_data_line = next((ln for ln in body.splitlines() if ln.strip()), "")
+        ncol = len(first_data_line.split())
+
+    if ncol and "#" not in body:
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                # 解析不到結尾：舊版 numpy 只發 DeprecationWarning，新版丟 ValueError
+                warnings.simplefilter("always", DeprecationWarning)
+                flat = np.fromstring(body, sep=" ")
+        except ValueError:
+            flat, caught = None, True
+        if not caught and flat.size % ncol == 0 and _uniform_fields(body, ncol):
+            return flat.reshape(-1, ncol)
+
+    return np.loadtxt(io.StringIO(body), ndmin=2)
+
+
+def _parse_text(filepath: str, skip_header: bool) -> np.ndarray:
+    """整檔讀入後交給 parse_rows，回傳 2D ndarray (nrow, ncol)。"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        if skip_header:
+            f.readline()
+        body = f.read()
+    return parse_rows(body)
+
+
+# =========================================================
+# cache
+# =========================================================
+def _cache_paths(filepath: str) -> Tuple[str, str, str]:
+    """回傳 (cache 目錄, 同一來源檔的 cache 前綴, 本版本 cache 的 .npy 路徑)"""
+    abspath = os.path.abspath(filepath)
+    st = os.stat(abspath)
+    key_src = f"{abspath}|{st.st_mtime_ns}|{st.st_size}"
+    key = hashlib.sha1(key_src.encode("utf-8")).hexdigest()[:16]
+
+    cache_dir = os.path.join(os.path.dirname(abspath), CACHE_DIR_NAME)
+    prefix = os.path.basename(abspath) + "-"
+    return cache_dir, prefix, os.path.join(cache_dir, prefix + key + ".npy")
+
+
+def _write_cache(cache_dir: str, prefix: str, npy_path: str,
+                 columns: np.ndarray, labels: Optional[List[str]]) -> None:
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 同一來源檔的舊版本 cache 一併清掉，避免目錄無限成長
+        # （只比對 <檔名>-<key>.npy/.json：a.txt 不可刪到 a.txt-b.txt 的 cache）
+        own = re.compile(re.escape(prefix) + r"[0-9a-f]{16}\.(?:npy|json)$")
+        for name in os.listdir(cache_dir):
+            if own.match(name):
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                except FileNotFoundError:
+                    pass            # 另一個 process 剛好先刪了
+
+        # labels 先寫：讀取端看到 .npy 時對應的 .json 一定已經在
+        with _atomic_open(cache_dir, npy_path[:-4] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"labels": labels}, f)
+        with _atomic_open(cache_dir, npy_path, "wb") as f:
+            np.save(f, columns)
+    except OSError:
+        # 唯讀目錄等情況：不快取，照常回傳資料
+        pass
+
+
+@contextmanager
+def _atomic_open(cache_dir: str, path: str, mode: str, **kwargs):
+    """寫到同目錄下 mkstemp 的唯一暫存檔，寫完才 os.replace 成 path；失敗時刪掉暫存檔"""
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=os.path.basename(path) + ".",
+                               suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# =========================================================
+# 二進位格式（memory-map）
+# =========================================================
+def _npz_member(path: str, name: str):
+    """
+    回傳 npz 內的某個陣列。
+    未壓縮的成員直接以 np.memmap 對應到 zip 內的位置；壓縮的只能 np.load 讀入。
+    """
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name + ".npy")
+
+    if info.compress_type == zipfile.ZIP_STORED:
+        with open(path, "rb") as f:
+            # local file header：固定 30 bytes，之後是檔名與 extra field
+            f.seek(info.header_offset)
+            local = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", local[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+
+        if not dtype.hasobject:
+            return np.memmap(path, dtype=dtype, mode="r", offset=offset,
+                             shape=shape, order="F" if fortran else "C")
+
+    with np.load(path) as npz:
+        return npz[name]
+
+
+def _raw_descriptor(filepath: str) -> dict:
+    desc_path = filepath + ".json"
+    if not os.path.exists(desc_path):
+        raise FileNotFoundError(
+            f"原始二進位檔需要描述檔：{desc_path}（例如 {{\"dtype\": \"<f8\", \"columns\": 3}}）"
+        )
+    with open(desc_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_binary(filepath: str):
+    """
+    以 memory-map 開啟二進位資料，回傳 (array, labels)。
+    array 為原始形狀：點資料是 (nrow, ncol) 或 1D，格網是 (ny, nx)；
+    npz 多個 1D 陣列時回傳 (ncol, nrow)，labels 為 key 名稱。
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"找不到資料檔：{filepath}")
+
+    ext = os.path.splitext(filepath)[1].lower()
+
+    if ext == ".npy":
+        return np.load(filepath, mmap_mode="r"), None
+
+    if ext == ".npz":
+        with np.load(filepath) as npz:
+            names = list(npz.files)
+        arrays = [_npz_member(filepath, n) for n in names]
+
+        if len(arrays) == 1:
+            return arrays[0], None
+        if all(a.ndim == 1 and len(a) == len(arrays[0]) for a in arrays):
+            return _ColumnStack(arrays), names
+        raise ValueError("npz 需為單一陣列，或多個等長的一維陣列。")
+
+    # .bin / .raw
+    desc = _raw_descriptor(filepath)
+    dtype = np.dtype(desc.get("dtype", "<f8"))
+    if dtype.byteorder == ">":
+        raise ValueError("原始二進位檔只支援 little-endian。")
+    offset = int(desc.get("offset", 0))
+
+    if "shape" in desc:
+        shape = tuple(int(v) for v in desc["shape"])
+    else:
+        ncol = int(desc.get("columns", 1))
+        nbytes = os.path.getsize(filepath) - offset
+        shape = (nbytes // (dtype.itemsize * ncol), ncol)
+
+    arr = np.memmap(filepath, dtype=dtype, mode="r", offset=offset, shape=shape)
+    return arr, desc.get("labels")
+
+
+class _ColumnStack:
+    """把多個等長 1D memmap 當成 (ncol, nrow) 陣列使用，不做 np.stack（避免複製）"""
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+        self.shape = (len(arrays), len(arrays[0]))
+        self.ndim = 2
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self._arrays[key]
+        if isinstance(key, slice):
+            return _ColumnStack(self._arrays[key])
+        return _ColumnStack([self._arrays[i] for i in key])
+
+    def __len__(self):
+        return self.shape[0]
+
+
+def open_grid(filepath: str):
+    """
+    二進位格網資料 → (x, y, Z)，Z 為 (ny, nx) memmap；不是格網時回傳 None。
+    格網的判斷：
+      .npy        2D 且欄數不是 3（(N, 3) 視為 x, y, z 點資料）
+      .npz        含 2D 的 "z"，可另附 1D 的 "x"（長度 nx）、"y"（長度 ny）
+      .bin / .raw 描述檔有 "shape"
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in BINARY_EXTS:
+        return None
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"找不到資料檔：{filepath}")
+
+    x = y = None
+    if ext == ".npz":
+        with np.load(filepath) as npz:
+            names = set(npz.files)
+        if "z" not in names:
+            return None
+        Z = _npz_member(filepath, "z")
+        if Z.ndim != 2:
+            return None
+        x = _npz_member(filepath, "x") if "x" in names else None
+        y = _npz_member(filepath, "y") if "y" in names else None
+    elif ext == ".npy":
+        Z = np.load(filepath, mmap_mode="r")
+        if Z.ndim != 2 or Z.shape[1] == 3:
+            return None
+    else:
+        if "shape" not in _raw_descriptor(filepath):
+            return None
+        Z, _ = open_binary(filepath)
+
+    ny, nx = Z.shape
+    x = np.arange(nx, dtype=np.float64) if x is None else x
+    y = np.arange(ny, dtype=np.float64) if y is None else y
+    return x, y, Z
+
+
+def _binary_columns(filepath: str):
+    """二進位點資料 → (columns (ncol, nrow), labels)；轉置只是 view，不複製"""
+    arr, labels = open_binary(filepath)
+    if isinstance(arr, _ColumnStack):
+        return arr, labels
+    if arr.ndim == 1:
+        return arr[np.newaxis, :], labels
+    if arr.ndim != 2:
+        raise ValueError(f"資料需為 1D 或 2D 陣列，目前是 {arr.ndim}D。")
+    return arr.T, labels
+
+
+def load_columns(filepath: str, use_cache: bool = True):
+    """
+    讀取資料檔，回傳 (columns, labels)：
+        columns: shape (ncol, nrow)，每一列是一欄資料（可能是唯讀 memmap）
+        labels:  header tokens，無 header 時為 None
+
+    二進位格式（.npy / .npz / .bin）直接 memory-map，不經過 cache。
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"找不到資料檔：{filepath}")
+
+    columns = None
+    labels = None
+
+    if is_binary(filepath):
+        columns, labels = _binary_columns(filepath)
+    else:
+        cache_dir, prefix, npy_path = _cache_paths(filepath)
+
+    if columns is None and use_cache and os.path.exists(npy_path):
+        try:
+            columns = np.load(npy_path, mmap_mode="r")
+            with open(npy_path[:-4] + ".json", "r", encoding="utf-8") as f:
+                labels = json.load(f)["labels"]
+        except (OSError, ValueError, KeyError):
+            columns = None
+
+    if columns is None:
+        labels = sniff_header(filepath)
+        data = _parse_text(filepath, skip_header=labels is not None)
+        if data.ndim != 2 or data.size == 0:
+            raise ValueError(f"資料檔沒有可用的數值：{filepath}")
+
+        columns = np.ascontiguousarray(data.T)
+        if use_cache:
+            _write_cache(cache_dir, prefix, npy_path, columns, labels)
+
+    return columns, labels
@@ -0,0 +1,156 @@
+# plot/downsample.py
+"""
+視覺化降採樣（只影響「畫出來的點」，不改原始資料）。
+
+提供兩種方法：
+  - lttb   : Largest-Triangle-Three-Buckets，保留曲線形狀，適合一般折線
+  - minmax : 每個 bucket 保留最小值與最大值（per-pixel min/max），
+             適合雜訊多、尖峰重要的儀器訊號
+
+所有函數都回傳「索引陣列」，呼叫端自行用索引取 x / y，
+這樣多欄資料或 memory-map 的陣列都能共用同一套邏輯。
+"""
+
+import numpy as np
+
+# 超過此點數就走分段（chunked）路徑，避免把 memory-map 整條讀進記憶體
+CHUNKED_THRESHOLD = 2_000_000
+# 分段處理時每段大約的點數
+CHUNK_POINTS = 1_000_000
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets。
+    回傳 n_out 個索引（含第一點與最後一點），已排序。
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # 中間 n_out - 2 個 bucket 平均切分 [1, n-1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0  # 上一個被選中的點
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+
+        # 下一個 bucket 的平均點（最後一個 bucket 的下一個就是最後一點）
+        nlo = edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        # 三角形面積（省略 1/2）
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+
+    return idx
+
+
+def _minmax_in_buckets(seg: np.ndarray, size: int) -> np.ndarray:
+    """seg 以固定 size 切 bucket，回傳每個 bucket 最小/最大值的索引（未排序）"""
+    n = len(seg)
+    n_buckets = -(-n // size)
+
+    # 補 NaN 讓最後一個 bucket 也能 reshape
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = seg
+    grid = padded.reshape(n_buckets, size)
+
+    base = np.arange(n_buckets) * size
+    nan = np.isnan(grid)
+    i_min = base + np.argmin(np.where(nan, np.inf, grid), axis=1)
+    i_max = base + np.argmax(np.where(nan, -np.inf, grid), axis=1)
+    return np.concatenate((i_min, i_max))
+
+
+def minmax_indices(y, n_out: int, chunk: int = None) -> np.ndarray:
+    """
+    Per-bucket min/max：每個 bucket 保留最小與最大值的位置。
+    全部以 reshape 向量化完成，回傳已排序、不重複的索引。
+
+    y 可以是 memory-map：每次只讀 chunk 個點左右（以整數個 bucket 為單位），
+    不會把整條資料載入記憶體。
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    chunk = chunk or CHUNK_POINTS
+    size = -(-n // (n_out // 2))       # 每個 bucket 的點數
+    buckets_per_chunk = max(1, chunk // size)
+    step = buckets_per_chunk * size
+
+    parts = [np.array([0, n - 1])]
+    for lo in range(0, n, step):
+        seg = np.asarray(y[lo:lo + step], dtype=np.float64)
+        parts.append(lo + _minmax_in_buckets(seg, size))
+
+    idx = np.concatenate(parts)
+    idx = idx[idx < n]
+    return np.unique(idx)
+
+
+def downsample_xy(x, y, n_out: int, method: str = "lttb"):
+    """
+    依 method 對單條線降採樣，回傳 (x_ds, y_ds)。
+    點數不超過 n_out 時原樣回傳。
+
+    點數超過 CHUNKED_THRESHOLD（通常是 memory-map 的大檔）時，
+    先以分段 min/max 縮到 n_out 的數倍，再對這些點做 LTTB；
+    全程只以索引讀取，不會把整條 x / y 載入記憶體。
+    """
+    if len(y) <= n_out:
+        return np.asarray(x), np.asarray(y)
+
+    if method == "minmax":
+        idx = minmax_indices(y, n_out)
+    elif method == "lttb":
+        if len(y) > CHUNKED_THRESHOLD:
+            pre = minmax_indices(y, n_out * 4)
+            idx = pre[lttb_indices(np.asarray(x[pre]), np.asarray(y[pre]), n_out)]
+        else:
+            idx = lttb_indices(x, y, n_out)
+    else:
+        raise ValueError(f"未知的降採樣方法：{method}")
+
+    return np.asarray(x[idx]), np.asarray(y[idx])
+
+
+def x_is_sorted(x, chunk: int = None) -> bool:
+    """分段檢查 x 是否遞增（memory-map 也只會逐段讀取）"""
+    chunk = chunk or CHUNK_POINTS
+    n = len(x)
+    for lo in range(0, n - 1, chunk):
+        seg = np.asarray(x[lo:lo + chunk + 1])
+        if np.any(seg[1:] < seg[:-1]):
+            return False
+    return True
+
+
+def slice_x_range(x, x0: float, x1: float, is_sorted: bool = None):
+    """
+    回傳 x 落在 [x0, x1] 的 slice（x 遞增時用 searchsorted，O(log n)），
+    否則回傳布林遮罩。x 可以是 memory-map，slice 不會複製資料。
+    is_sorted：呼叫端已知 x 是否遞增時傳入，省去每次 O(n) 的檢查。
+    """
+    if is_sorted is None:
+        is_sorted = x_is_sorted(x)
+    if is_sorted:
+        lo = int(np.searchsorted(x, x0, side="left"))
+        hi = int(np.searchsorted(x, x1, side="right"))
+        # 左右各多留一點，讓線段延伸到視窗邊緣
+        return slice(max(0, lo - 1), min(len(x), hi + 1))
+    return (np.asarray(x) >= x0) & (np.asarray(x) <= x1)
@@ -0,0 +1,136 @@
+# plot/figure_pool.py
+"""
+可重複使用的 matplotlib Figure / FigureCanvasAgg。
+
+舊做法每張圖都 plt.figure() → 畫 → savefig → plt.close()，
+每次都要經過 pyplot 的全域狀態並重建整個 Figure。
+這裡直接用 Agg backend 的物件導向 API：
+  - pool 裡保存數組 (Figure, Axes)，用完 fig.clf() 並重建 Axes 後放回
+  - 輸出到記憶體（BytesIO），由呼叫端決定要不要寫檔
+  - 以 Queue 分配 Figure，同一個 Figure 同時只會被一個 thread 使用；
+    真正 rasterize 的 savefig 以 _render_lock 序列化（matplotlib 的字型快取非 thread-safe）
+
+基準測試：python -m plot.figure_pool
+"""
+
+import io
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# 所有 pool 共用：同一時間只有一個 thread 在 rasterize
+_render_lock = threading.Lock()
+
+
+class FigurePool:
+
+    def __init__(self, size: int = 4, figsize=(6.4, 4.8)):
+        self.figsize = figsize
+        self._free = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._size = size
+        self._lock = threading.Lock()
+
+    def _new_figure(self):
+        fig = Figure(figsize=self.figsize)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        return fig, ax
+
+    def _acquire(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                return self._new_figure()
+        # pool 已滿：等別的 thread 用完
+        return self._free.get()
+
+    def _release(self, item) -> None:
+        fig, _ = item
+        # ax.clear() / tick_params(reset=True) 都無法完整還原 Axes（tick 位置、
+        # 邊框、版面）：清空 Figure 重建 Axes，下一張圖與全新的 Figure 畫出來完全相同。
+        # Figure 與 Agg canvas 仍然重複使用。
+        fig.clf()
+        fig.set_size_inches(self.figsize)
+        self._free.put((fig, fig.add_subplot(111)))
+
+    @contextmanager
+    def axes(self, facecolor: str = "white"):
+        """取得一組乾淨的 (fig, ax)，離開 with 後自動清空並放回 pool"""
+        item = self._acquire()
+        fig, ax = item
+        try:
+            fig.set_facecolor(facecolor)
+            ax.set_facecolor(facecolor)
+            yield fig, ax
+        finally:
+            self._release(item)
+
+    def render_png(self, draw, facecolor: str = "white", dpi: int = 150) -> bytes:
+        """
+        draw(fig, ax) 負責畫圖；回傳 PNG bytes。
+        """
+        with self.axes(facecolor) as (fig, ax):
+            draw(fig, ax)
+            buf = io.BytesIO()
+            with _render_lock:
+                fig.savefig(buf, format="png", dpi=dpi,
+                            bbox_inches="tight", facecolor=facecolor)
+            return buf.getvalue()
+
+
+# 繪圖引擎共用的 pool
+FIGURE_POOL = FigurePool()
+
+
+# =========================================================
+# 基準測試
+# =========================================================
+def benchmark(n: int = 50) -> None:
+    """比較 pyplot（每張圖重建 Figure）與 FigurePool 的單張圖延遲"""
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    x = np.linspace(-10, 10, 500)
+    y = np.sin(x)
+
+    def pyplot_once():
+        plt.figure(facecolor="black")
+        plt.plot(x, y, color="cyan", linewidth=2, label="sin(x)")
+        plt.grid(True, color="gray", alpha=0.3)
+        plt.legend(facecolor="black", edgecolor="gray", labelcolor="white")
+        plt.title("sin(x)", color="white")
+        buf = io.BytesIO()
+        plt.savefig(buf, format="png", dpi=150, bbox_inches="tight", facecolor="black")
+        plt.close()
+
+    def draw(fig, ax):
+        ax.plot(x, y, color="cyan", linewidth=2, label="sin(x)")
+        ax.grid(True, color="gray", alpha=0.3)
+        ax.legend(facecolor="black", edgecolor="gray", labelcolor="white")
+        ax.set_title("sin(x)", color="white")
+
+    def pool_once():
+        FIGURE_POOL.render_png(draw, facecolor="black")
+
+    for name, fn in (("pyplot", pyplot_once), ("FigurePool", pool_once)):
+        fn()  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        ms = (time.perf_counter() - t0) * 1000 / n
+        print(f"{name:<12} {ms:8.2f} ms / plot  (n={n})")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,120 @@
+# plot/gridding.py
+"""
+把散亂的 (x, y, z) 點雲整理成規則網格，供 Plotly surface 使用。
+
+步驟（全部以 NumPy 向量化完成）：
+  1) 每個點依 x, y 落到 nx × ny 個格子（bin）
+  2) np.bincount 一次算出每格的 z 總和與點數 → 平均值
+  3) 沒有點的格子依 fill 補值：
+       "none"    保留 NaN（Plotly 會留空）
+       "nearest" 由相鄰已知格子逐層向外擴散
+       "linear"  先沿 x、再沿 y 做一維線性內插，剩下的再用 nearest 補
+"""
+
+import numpy as np
+
+FILL_MODES = ("none", "nearest", "linear")
+
+
+def bin_average(xs, ys, zs, nx: int, ny: int):
+    """
+    回傳 (x_centers, y_centers, Z)，Z 形狀為 (ny, nx)，沒有點的格子為 NaN。
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    zs = np.asarray(zs, dtype=np.float64)
+
+    ok = np.isfinite(xs) & np.isfinite(ys) & np.isfinite(zs)
+    if not ok.all():
+        xs, ys, zs = xs[ok], ys[ok], zs[ok]
+    if xs.size == 0:
+        raise ValueError("沒有可用的 (x, y, z) 資料點。")
+
+    x_min, x_max = xs.min(), xs.max()
+    y_min, y_max = ys.min(), ys.max()
+    # 範圍為 0 時給一個寬度，避免除以 0
+    x_span = (x_max - x_min) or 1.0
+    y_span = (y_max - y_min) or 1.0
+
+    ix = ((xs - x_min) * (nx / x_span)).astype(np.int64)
+    iy = ((ys - y_min) * (ny / y_span)).astype(np.int64)
+    np.clip(ix, 0, nx - 1, out=ix)
+    np.clip(iy, 0, ny - 1, out=iy)
+
+    flat = iy * nx + ix
+    sums = np.bincount(flat, weights=zs, minlength=nx * ny)
+    counts = np.bincount(flat, minlength=nx * ny)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        Z = (sums / counts).reshape(ny, nx)
+
+    x_centers = x_min + (np.arange(nx) + 0.5) * (x_span / nx)
+    y_centers = y_min + (np.arange(ny) + 0.5) * (y_span / ny)
+    return x_centers, y_centers, Z
+
+
+def fill_nearest(Z: np.ndarray) -> np.ndarray:
+    """
+    NaN 格子以相鄰（上下左右）已知格子的平均值補上，逐層向外擴散，
+    每一層都是整張陣列的向量化運算。
+    """
+    Z = Z.copy()
+    missing = np.isnan(Z)
+    if missing.all():
+        return Z
+
+    while missing.any():
+        padded = np.pad(Z, 1, constant_values=np.nan)
+        neighbours = np.stack([
+            padded[:-2, 1:-1], padded[2:, 1:-1],
+            padded[1:-1, :-2], padded[1:-1, 2:],
+        ])
+        valid = ~np.isnan(neighbours)
+        n_valid = valid.sum(axis=0)
+        total = np.where(valid, neighbours, 0.0).sum(axis=0)
+
+        fillable = missing & (n_valid > 0)
+        Z[fillable] = total[fillable] / n_valid[fillable]
+        missing &= ~fillable
+
+    return Z
+
+
+def _interp_rows(Z: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """對每一列做一維線性內插（只補已知點之間的空格，不外插）"""
+    out = Z.copy()
+    for row in out:
+        known = ~np.isnan(row)
+        if known.sum() < 2 or known.all():
+            continue
+        kc = coords[known]
+        gaps = ~known & (coords > kc[0]) & (coords < kc[-1])
+        row[gaps] = np.interp(coords[gaps], kc, row[known])
+    return out
+
+
+def fill_linear(Z: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    Z = _interp_rows(Z, x)
+    Z = _interp_rows(Z.T, y).T
+    return fill_nearest(Z)
+
+
+def grid_xyz(xs, ys, zs, nx: int = 100, ny: int = None, fill: str = "nearest"):
+    """
+    散亂點 → 規則網格，回傳 (X, Y, Z)（meshgrid 形式，形狀皆為 (ny, nx)）。
+    """
+    ny = ny or nx
+    if nx < 2 or ny < 2:
+        raise ValueError("網格解析度至少需要 2 × 2。")
+    if fill not in FILL_MODES:
+        raise ValueError(f"未知的補值方式：{fill}（可用：{', '.join(FILL_MODES)}）")
+
+    x, y, Z = bin_average(xs, ys, zs, nx, ny)
+
+    if fill == "nearest":
+        Z = fill_nearest(Z)
+    elif fill == "linear":
+        Z = fill_linear(Z, x, y)
+
+    X, Y = np.meshgrid(x, y)
+    return X, Y, Z
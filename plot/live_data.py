@@ -0,0 +1,126 @@
+# plot/live_data.py
+"""
+plot_data(..., live) 的 tail-follow 讀取。
+
+只處理「檔案 → 數值」：
+  - read_tail     ：第一次渲染，從檔尾往回分段讀，只讀到湊滿最後 window 行為止，
+                    回傳這些列與 byte offset（大的 log 檔不必整個讀入）；
+                    空檔案（或還沒寫完第一行）回傳 0 列，之後照常跟隨
+  - read_appended ：之後從上次的 offset 只讀新增的 bytes（只取完整行）；
+                    格式錯誤的行略過（offset 照常前進，不會卡在同一行）
+  ncol 為 0 表示欄數還不知道（沒有 header 的空檔案），由第一筆資料決定
+
+監看檔案、節流、推送到網頁由 ui.live_follower 負責。
+"""
+
+import os
+
+import numpy as np
+
+from plot.data_loader import parse_rows, sniff_header
+
+# read_tail 從檔尾往回讀時每次讀的 bytes
+TAIL_CHUNK = 64 * 1024
+
+
+def _complete_lines(chunk: bytes) -> bytes:
+    """只保留到最後一個換行為止（實驗程式可能正寫到一半）"""
+    cut = chunk.rfind(b"\n")
+    return chunk[:cut + 1] if cut >= 0 else b""
+
+
+def _first_ncol(body: str) -> int:
+    """第一個資料行的欄數（沒有資料行時為 0）"""
+    for line in body.splitlines():
+        if line.strip() and not line.lstrip().startswith("#"):
+            return len(line.split())
+    return 0
+
+
+def _parse(body: str, ncol: int):
+    """parse_rows；格式不一致時逐行解析，回傳 (rows, 略過的行數)。ncol 為 0 時由第一行決定"""
+    ncol = ncol or _first_ncol(body)
+    if not ncol:
+        return np.empty((0, 0)), 0
+    try:
+        return parse_rows(body, ncol=ncol), 0
+    except ValueError:
+        return _parse_lenient(body, ncol)
+
+
+def _parse_lenient(body: str, ncol: int):
+    """逐行解析，略過欄數不對或不是數字的行；回傳 (rows, 略過的行數)"""
+    good, skipped = [], 0
+    for line in body.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        try:
+            values = [float(t) for t in line.split()]
+        except ValueError:
+            values = None
+        if values is None or len(values) != ncol:
+            skipped += 1
+            continue
+        good.append(values)
+    rows = np.array(good, dtype=float).reshape(-1, ncol)
+    return rows, skipped
+
+
+def read_tail(filepath: str, window: int):
+    """
+    回傳 (labels, rows, offset)：
+        labels: header tokens 或 None
+        rows:   最後 window 列，shape (k, ncol)；還沒有資料時 k = 0（沒有 header 時 ncol 也是 0）
+        offset: 已讀取到的 byte 位置（之後從這裡接著讀）
+    格式錯誤的行略過。
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"找不到資料檔：{filepath}")
+
+    labels = sniff_header(filepath)
+    with open(filepath, "rb") as f:
+        if labels is not None:
+            f.readline()
+        start = f.tell()
+        lo = f.seek(0, os.SEEK_END)
+        body = b""
+        # 多讀一行：往回讀到的第一行可能只有後半段
+        while lo > start and body.count(b"\n") <= window:
+            step = min(TAIL_CHUNK, lo - start)
+            lo -= step
+            f.seek(lo)
+            body = f.read(step) + body
+
+    body = _complete_lines(body)
+    offset = lo + len(body)
+    if lo > start:
+        body = body[body.index(b"\n") + 1:]
+
+    rows, _ = _parse(body.decode("utf-8", errors="replace"), len(labels) if labels else 0)
+    if labels and not len(rows):
+        rows = np.empty((0, len(labels)))
+    return labels, rows[-window:], offset
+
+
+def read_appended(filepath: str, offset: int, ncol: int):
+    """
+    從 offset 讀取新增的完整行，回傳 (rows, new_offset, reset, skipped)。
+    檔案變短（被截斷或重寫）時 reset=True，呼叫端應重新 read_tail。
+    skipped：格式錯誤而略過的行數（這些行不會再被讀到）。
+    ncol 為 0 時欄數由第一個資料行決定。
+    """
+    size = os.path.getsize(filepath)
+    if size < offset:
+        return np.empty((0, ncol)), 0, True, 0
+    if size == offset:
+        return np.empty((0, ncol)), offset, False, 0
+
+    with open(filepath, "rb") as f:
+        f.seek(offset)
+        body = _complete_lines(f.read(size - offset))
+
+    if not body:
+        return np.empty((0, ncol)), offset, False, 0
+
+    rows, skipped = _parse(body.decode("utf-8", errors="replace"), ncol)
+    return rows, offset + len(body), False, skipped
@@ -0,0 +1,118 @@
+# plot/plot_cache.py
+"""
+matplotlib 圖檔（plots/*.png）的 content-addressed cache。
+
+- 檔名 = hash(繪圖種類, 參數, 主題, RENDERER_VERSION)
+  同樣的 plot('sin(x)', -5, 5) 每次都對應同一個檔案，命中時完全不跑 matplotlib
+- 命中時更新 mtime，讓 garbage collector 以「最近使用時間」判斷
+- collect_garbage：依總大小與存放天數清理；只處理本模組產生的檔名，
+  筆記裡手動引用的舊圖（時間戳記檔名）不會被刪
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+PLOT_DIR = "plots"
+
+# 繪圖外觀（顏色、dpi、版面）有改動時遞增，舊 cache 自然失效
+RENDERER_VERSION = "1"
+
+# garbage collector 預設上限
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+MAX_CACHE_AGE_DAYS = 30
+# 兩次 GC 之間至少間隔（秒）
+GC_INTERVAL = 60
+
+_cache_name_re = re.compile(r"^[a-z0-9_]+_[0-9a-f]{20}\.png$")
+_last_gc = 0.0
+
+
+def cache_path(prefix: str, *parts) -> str:
+    """回傳此組參數對應的 plots/<prefix>_<hash>.png（相對路徑）"""
+    payload = json.dumps([RENDERER_VERSION, prefix, parts], sort_keys=True, default=str)
+    key = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+    return f"{PLOT_DIR}/{prefix}_{key}.png"
+
+
+def lookup(path: str) -> bool:
+    """檔案已存在就視為命中，並更新 mtime（最近使用時間）"""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def store(path: str, png_bytes: bytes) -> str:
+    """原子寫入（先寫 mkstemp 暫存檔再 rename），多個 process / thread 同時寫同一張圖也安全"""
+    plot_dir = os.path.dirname(path)
+    os.makedirs(plot_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=plot_dir, prefix=os.path.basename(path) + ".",
+                               suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(png_bytes)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    maybe_collect()
+    return path
+
+
+def collect_garbage(plot_dir: str = PLOT_DIR,
+                    max_bytes: int = MAX_CACHE_BYTES,
+                    max_age_days: float = MAX_CACHE_AGE_DAYS) -> int:
+    """
+    清理 cache 圖檔：
+      1) 超過 max_age_days 沒被用到的刪除
+      2) 剩下的總大小超過 max_bytes 時，從最久沒用的開始刪
+    回傳刪除的檔案數。
+    """
+    if not os.path.isdir(plot_dir):
+        return 0
+
+    entries = []
+    for name in os.listdir(plot_dir):
+        if not _cache_name_re.match(name):
+            continue
+        path = os.path.join(plot_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    entries.sort()   # 最久沒用的在前
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size, _ in entries)
+
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    return removed
+
+
+def maybe_collect() -> None:
+    """寫入新圖時呼叫；GC_INTERVAL 秒內最多跑一次"""
+    global _last_gc
+    now = time.monotonic()
+    if now - _last_gc < GC_INTERVAL:
+        return
+    _last_gc = now
+    collect_garbage()
@@ -1,5 +1,4 @@
 # renderer/element_renderer.py
-import markdown2
 import html  # ★ 新增：為了 escape 輸出內容
 
 from document.element import (
@@ -13,11 +12,28 @@ from document.element import (
 
 import re
 from latex.constants import MATH_TOKEN_L, MATH_TOKEN_R
+from executor.profiling import format_stats
 
 
 _math_inline_re = re.compile(r"\$(.+?)\$", re.DOTALL)
 
 
+def render_output(elem_id: str, output: str) -> str:
+    """
+    python block 的輸出 HTML（預覽與 WebBridge.executionFinished 共用）。
+    輸出過長時 output 只有開頭與結尾（見 executor.output_capture），
+    另附「顯示更多」按鈕，由 bridge.fetchOutputPage 分頁取回完整內容。
+    """
+    body = f"<pre>{html.escape(output)}</pre>"
+    if getattr(output, "spill_path", None) is None:
+        return body
+    return (
+        f'{body}<div class="output-more">'
+        f'<button onclick="showOutputPage(\'{elem_id}\', 0)">'
+        f'顯示完整輸出（{output.total_chars:,} 字元）</button></div>'
+    )
+
+
 def protect_math(text: str):
     math_map = {}
     idx = 0
@@ -39,9 +55,13 @@ class ElementRenderer:
         self.plot_renderer = plot_renderer
         self.python_renderer = python_renderer
 
-    def render_element(self, elem: BaseElement) -> str:
+    def render_element(self, elem: BaseElement, token_map=None) -> str:
+        """
+        token_map：elem 所屬文件的 latex_token_map（由呼叫端傳入；
+        render 與虛擬化預覽的 render_blocks 可能在不同 thread 同時呼叫）
+        """
         if isinstance(elem, TextElement):
-            return self._render_text(elem)
+            return self._render_text(elem, token_map or {})
         elif isinstance(elem, LatexElement):
             return self._render_latex(elem)
         elif isinstance(elem, PlotElement):
@@ -52,7 +72,7 @@ class ElementRenderer:
             return self._render_python(elem)
         return ""
 
-    def _render_text(self, elem: TextElement) -> str:
+    def _render_text(self, elem: TextElement, token_map) -> str:
         """
         【渲染順序（不可改）】
         1. 還原 LaTeX token
@@ -64,7 +84,6 @@ class ElementRenderer:
         text = elem.text
 
         # 1) 還原 LaTeX token
-        token_map = getattr(self.doc_model, "latex_token_map", {})
         for token in sorted(token_map.keys(), key=len, reverse=True):
             text = text.replace(token, token_map[token].raw)
 
@@ -72,6 +91,8 @@ class ElementRenderer:
         text, math_map = protect_math(text)
 
         # 3) Markdown（必須啟用 mathjax）
+        #    markdown2 延遲到第一次渲染文字才 import（加快啟動）
+        import markdown2
         html = markdown2.markdown(
             text,
             extras=[
@@ -113,16 +134,15 @@ class ElementRenderer:
         code_html = html.escape(elem.code)
 
         # output HTML，如果沒有輸出保持空白
-        output_html = (
-            f"<pre>{html.escape(elem.output)}</pre>" if elem.output else ""
-        )
+        output_html = render_output(elem_id, elem.output) if elem.output else ""
 
         return f"""
     <div class="py-block" id="block-{elem_id}"
          style="border:1px solid #444; padding:6px; margin:10px 0;">
 
         <div style="text-align:right;">
-            <button onclick="runBlock('{elem_id}')"
+            <span class="block-stats" id="stats-{elem_id}">{html.escape(format_stats(elem.stats, elem.cached))}</span>
+            <button id="run-{elem_id}" onclick="runBlock('{elem_id}')"
                     style="font-size:12px; padding:2px 6px;">Run</button>
         </div>
 
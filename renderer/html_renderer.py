@@ -3,7 +3,13 @@
 import os
 from PyQt5.QtCore import QUrl
 
+from document.document_model import DocumentModel
+from document.element import (
+    ImageElement, LatexElement, PlotElement, PythonElement, TextElement,
+)
+from latex.latex_tokenizer import expand_tokens
 from renderer.plot_renderer import PlotRenderer
+from renderer.plot_pool import PlotPool
 from .element_renderer import ElementRenderer
 import re
 
@@ -17,18 +23,217 @@ HTML_TEMPLATE = r"""
 
 <script>
 var bridge = null;
+var pendingFollows = [];   // bridge 就緒前註冊的 live plot
 
 new QWebChannel(qt.webChannelTransport, function(channel) {
     bridge = channel.objects.bridge;
 
+    bridge.executionStarted.connect(function(id, state) {
+        let btn = document.getElementById("run-" + id);
+        if (btn) {
+            btn.dataset.state = state;
+            btn.textContent = {queued: "Queued ✕", running: "Stop"}[state] || "Run";
+        }
+        if (state === "running") {
+            let out = document.getElementById("output-" + id);
+            if (out) out.innerHTML = '<pre class="running"></pre>';
+        }
+    });
+
+    bridge.executionProgress.connect(function(id, text) {
+        let out = document.getElementById("output-" + id);
+        let pre = out && out.querySelector("pre.running");
+        if (pre) pre.textContent += text;
+    });
+
     bridge.executionFinished.connect(function(id, html_output) {
+        delete blockCache[id];      // 離開畫面時留下的 HTML 已過期
         let out = document.getElementById("output-" + id);
         if (out) out.innerHTML = html_output;
     });
+
+    bridge.executionStats.connect(function(id, text) {
+        let span = document.getElementById("stats-" + id);
+        if (span) span.textContent = text;
+    });
+
+    bridge.liveRows.connect(function(id, payload) {
+        let div = document.getElementById(id);
+        if (!div) return;
+        let p = JSON.parse(payload);
+        // 原本是空檔案的圖：第一批資料到達時補上線
+        let missing = p.idx.filter(function(i) { return i >= div.data.length; });
+        if (missing.length) {
+            Plotly.addTraces(div, missing.map(function(i) {
+                return {type: 'scatter', mode: 'lines', x: [], y: [], name: 'y' + (i + 1)};
+            }));
+        }
+        if (p.reset) {
+            Plotly.restyle(div, {x: p.x, y: p.y}, p.idx);
+        } else {
+            Plotly.extendTraces(div, {x: p.x, y: p.y}, p.idx, p.window);
+        }
+    });
+
+    bridge.scrollPreview.connect(scrollToBlock);
+    bridge.blocksReady.connect(onBlocksReady);
+    flushBlockRequests();
+
+    pendingFollows.forEach(function(args) { bridge.followFile.apply(bridge, args); });
+    pendingFollows = [];
+    restoreScroll();
+});
+
+// ---------- 與編輯區的捲動同步 ----------
+var SCROLL_THROTTLE_MS = 50;
+var srcBlocks = null;        // .src-block，文件順序（位置遞增）
+var scrollIgnoreUntil = 0;   // 程式造成的捲動不回傳給編輯區
+var scrollPending = false;
+
+function sourceBlocks() {
+    if (!srcBlocks) srcBlocks = Array.from(document.querySelectorAll(".src-block"));
+    return srcBlocks;
+}
+
+function blockTop(el) {
+    return el.getBoundingClientRect().top + window.scrollY;
+}
+
+function scrollToBlock(id, fraction) {
+    let el = document.getElementById("src-" + id);
+    if (!el) return;
+    scrollIgnoreUntil = Date.now() + 2 * SCROLL_THROTTLE_MS;
+    window.scrollTo(0, blockTop(el) + fraction * el.offsetHeight);
+}
+
+function restoreScroll() {
+    if (!bridge) return;
+    bridge.scrollTarget(function(json) {
+        let t = JSON.parse(json);
+        if (t.id) scrollToBlock(t.id, t.fraction);
+    });
+}
+
+// 畫面頂端所在的 block：二分搜尋
+function blockAtTop() {
+    let blocks = sourceBlocks();
+    let y = window.scrollY;
+    let lo = 0, hi = blocks.length - 1, found = -1;
+    while (lo <= hi) {
+        let mid = (lo + hi) >> 1;
+        if (blockTop(blocks[mid]) <= y) { found = mid; lo = mid + 1; }
+        else hi = mid - 1;
+    }
+    if (found < 0) return blocks.length ? [blocks[0], 0] : null;
+    let el = blocks[found];
+    let h = el.offsetHeight || 1;
+    return [el, Math.min(Math.max((y - blockTop(el)) / h, 0), 1)];
+}
+
+// ---------- 虛擬化預覽（block 很多時） ----------
+// 頁面只有估計高度的空 placeholder；接近畫面時才向 bridge 要 HTML、排版，
+// 離開畫面後保留排版好的 HTML（blockCache）並換回固定高度的 placeholder
+var VIRTUAL = %%VIRTUAL%%;
+var VIRTUAL_MARGIN = "1500px 0px";   // 畫面上下多少距離內先載入
+var blockCache = {};        // elem_id → 已排版的 HTML
+var blockRequested = {};    // 已送出要求、還沒收到的 elem_id
+var blockQueue = [];
+
+function setupVirtual() {
+    let observer = new IntersectionObserver(onBlocksIntersect, {rootMargin: VIRTUAL_MARGIN});
+    sourceBlocks().forEach(function(el) { observer.observe(el); });
+}
+
+function onBlocksIntersect(entries) {
+    entries.forEach(function(e) {
+        let el = e.target, id = el.id.slice(4);
+        if (e.isIntersecting) {
+            if (el.dataset.state === "live") return;
+            if (id in blockCache) showBlock(el, blockCache[id], false);
+            else if (!blockRequested[id]) { blockRequested[id] = true; blockQueue.push(id); }
+        } else if (el.dataset.state === "live" && !el.querySelector("script, pre.running")) {
+            // 含 script（Plotly）或執行中的 block 一直留著
+            blockCache[id] = el.innerHTML;
+            el.style.minHeight = el.offsetHeight + "px";
+            el.innerHTML = "";
+            el.dataset.state = "";
+        }
+    });
+    flushBlockRequests();
+}
+
+function flushBlockRequests() {
+    if (!bridge || !blockQueue.length) return;
+    bridge.requestBlocks(JSON.stringify(blockQueue));
+    blockQueue = [];
+}
+
+function showBlock(el, html, fresh) {
+    el.innerHTML = html;
+    el.style.minHeight = "";
+    el.dataset.state = "live";
+    if (!fresh) return;
+    // innerHTML 不會執行 <script>：換成新的 script 元素
+    el.querySelectorAll("script").forEach(function(old) {
+        let s = document.createElement("script");
+        s.text = old.text;
+        old.replaceWith(s);
+    });
+}
+
+function onBlocksReady(json) {
+    let blocks = JSON.parse(json), els = [];
+    for (let id in blocks) {
+        delete blockRequested[id];
+        let el = document.getElementById("src-" + id);
+        if (el) { showBlock(el, blocks[id], true); els.push(el); }
+    }
+    if (els.length) MathJax.typesetPromise(els);
+}
+
+window.addEventListener("scroll", function() {
+    if (!bridge || scrollPending || Date.now() < scrollIgnoreUntil) return;
+    scrollPending = true;
+    setTimeout(function() {
+        scrollPending = false;
+        if (Date.now() < scrollIgnoreUntil) return;
+        let hit = blockAtTop();
+        if (hit) bridge.previewScrolled(hit[0].id.slice(4), hit[1]);
+    }, SCROLL_THROTTLE_MS);
 });
 
 function runBlock(id) {
-    if (bridge) bridge.runBlock(id);
+    if (!bridge) return;
+    let btn = document.getElementById("run-" + id);
+    let state = btn ? btn.dataset.state : "";
+    if (state === "queued" || state === "running") bridge.cancelBlock(id);
+    else bridge.runBlock(id);
+}
+
+function showOutputPage(id, page) {
+    if (!bridge) return;
+    bridge.fetchOutputPage(id, page, function(json) {
+        let out = document.getElementById("output-" + id);
+        if (!out) return;
+        let p = JSON.parse(json);
+        if (p.error) { out.querySelector(".output-more").textContent = p.error; return; }
+
+        let pre = document.createElement("pre");
+        pre.textContent = p.text;
+        let nav = document.createElement("div");
+        nav.className = "output-more";
+        if (p.page > 0) nav.innerHTML += `<button onclick="showOutputPage('${id}', ${p.page - 1})">◀</button> `;
+        nav.innerHTML += `第 ${p.page + 1} / ${p.pages} 頁`;
+        if (p.page + 1 < p.pages) nav.innerHTML += ` <button onclick="showOutputPage('${id}', ${p.page + 1})">▶</button>`;
+
+        // 一次只放一頁在 DOM 裡
+        out.replaceChildren(pre, nav);
+    });
+}
+
+function followFile(id, path, offset, ncol, window) {
+    if (bridge) bridge.followFile(id, path, offset, ncol, window);
+    else pendingFollows.push([id, path, offset, ncol, window]);
 }
 </script>
 
@@ -78,7 +283,17 @@ img {
 <div id="content">%%CONTENT%%</div>
 <script>
   document.addEventListener("DOMContentLoaded", () => {
-    MathJax.typesetPromise();
+    if (VIRTUAL) {
+      // 只有畫面附近的 block 會載入、排版
+      setupVirtual();
+      window.typesetDone = true;
+      return;
+    }
+    // 排版完高度才確定，再對齊一次編輯區的位置
+    MathJax.typesetPromise().then(() => {
+      window.typesetDone = true;
+      restoreScroll();
+    });
   });
 </script>
 </body>
@@ -86,14 +301,49 @@ img {
 """
 
 
+# 虛擬化預覽的 placeholder 估計高度（px）
+LINE_HEIGHT_PX = 24
+BLOCK_MARGIN_PX = 16
+PLOT_HEIGHT_PX = 460
+IMAGE_HEIGHT_PX = 320
+# 估計 python 輸出高度時最多算幾行（過長輸出只顯示開頭與結尾）
+OUTPUT_LINES_CAP = 40
+
+
+def estimate_height(elem) -> int:
+    """還沒載入的 block 大約多高；實際內容載入後由瀏覽器重新排版"""
+    if isinstance(elem, PlotElement):
+        return PLOT_HEIGHT_PX
+    if isinstance(elem, ImageElement):
+        return int(elem.width * 0.75) if elem.width else IMAGE_HEIGHT_PX
+    if isinstance(elem, PythonElement):
+        output_lines = elem.output.count("\n") + 1 if elem.output else 0
+        lines = elem.code.count("\n") + 1 + min(output_lines, OUTPUT_LINES_CAP)
+        return lines * LINE_HEIGHT_PX + 80
+    if isinstance(elem, LatexElement):
+        return 3 * LINE_HEIGHT_PX
+    if isinstance(elem, TextElement):
+        # 長行會折行：每 80 字元約一行
+        lines = sum(len(line) // 80 + 1 for line in elem.text.split("\n"))
+        return lines * LINE_HEIGHT_PX + BLOCK_MARGIN_PX
+    return LINE_HEIGHT_PX + BLOCK_MARGIN_PX
+
+
 class HtmlRenderer:
     """
     HtmlRenderer（新版）
     ★ 接受 DocumentModel
     ★ 呼叫 ElementRenderer 渲染 Element
     ★ 套入 HTML_TEMPLATE
+
+    element 數 >= virtual_threshold 時改為虛擬化預覽：
+    頁面只放 placeholder，block 的 HTML 由網頁在接近畫面時透過
+    bridge.requestBlocks → render_blocks() 取得。
     """
 
+    # 虛擬化預覽的門檻（element 數）；None 表示一律完整渲染
+    virtual_threshold = 300
+
     def __init__(self, dark_mode=True):
         self.dark_mode = dark_mode
 
@@ -103,19 +353,59 @@ class HtmlRenderer:
         # ElementRenderer 用於每個 Element → HTML
         self.element_renderer = ElementRenderer(self.plot_renderer)
 
+        # 多張圖時平行渲染（worker 於第一次使用時啟動）；
+        # render 與 render_blocks（不同 thread）共用，批次之間由 pool 序列化
+        self.plot_pool = PlotPool()
+
+        # 最近一次虛擬化渲染的 ({elem_id: element}, LaTeX token_map)
+        self._virtual = ({}, {})
+
+    def render_shell(self):
+        """
+        空白頁（含主題樣式、QWebChannel、MathJax、Plotly）。
+        啟動時先載入，讓 web engine 在第一次預覽前就把這些資源準備好。
+        """
+        return self.render(DocumentModel([]))
+
     # ----------------------------------------------------------------------
     # ★ 新版 render：吃 DocumentModel，不吃 raw_text
     # ----------------------------------------------------------------------
-    def render(self, doc_model):
+    def render(self, doc_model, virtual=None, activate=True):
         """
         doc_model: DocumentModel
+        virtual：True / False 強制指定；None 依 virtual_threshold 決定
+        activate：虛擬化時，之後 render_blocks 改以這份文件回應；
+                  背景預覽傳 False，等結果真的顯示時再呼叫 activate()
         回傳 (html, base_url)
         """
+        if virtual is None:
+            virtual = self.is_virtual(doc_model)
+        if virtual:
+            if activate:
+                self.activate(doc_model)
+            return self._page(self._render_placeholders(doc_model), virtual=True)
+
         # 1) 把所有 Element 轉成 HTML block
-        self.element_renderer.doc_model = doc_model  # ★ 加這行
+        token_map = getattr(doc_model, "latex_token_map", {})
+
+        # 1.1) PlotElement 彼此獨立 → 先一起丟進 process pool 平行渲染
+        plot_elems = [e for e in doc_model.elements if isinstance(e, PlotElement)]
+        plot_html = dict(zip(
+            (id(e) for e in plot_elems),
+            self.plot_pool.render_all(plot_elems, self.dark_mode),
+        ))
+
         html_blocks = []
         for elem in doc_model.elements:
-            block_html = self.element_renderer.render_element(elem)
+            if id(elem) in plot_html:
+                block_html = plot_html[id(elem)]
+            else:
+                block_html = self.element_renderer.render_element(elem, token_map)
+            # 標上來源行號（與編輯區的捲動同步）
+            if elem.src_lines is not None:
+                first, last = elem.src_lines
+                block_html = (f'<div class="src-block" id="src-{elem.id}" data-src="{first}-{last}">'
+                              f'{block_html}</div>')
             html_blocks.append(block_html)
 
         # 2) 合併
@@ -124,12 +414,54 @@ class HtmlRenderer:
         # -----------------------------
         # 2.2) 還原 LaTeX token
         # -----------------------------
-        token_map = getattr(doc_model, "latex_token_map", {})
         # ★ 關鍵：依 token 長度由長到短替換
         for token in sorted(token_map.keys(), key=len, reverse=True):
             html_body = html_body.replace(token, token_map[token].raw)
 
+        return self._page(html_body, virtual=False)
 
+    # ----------------------------------------------------------------------
+    # 虛擬化預覽
+    # ----------------------------------------------------------------------
+    def is_virtual(self, doc_model) -> bool:
+        """這份文件預設是否以虛擬化預覽顯示"""
+        return (self.virtual_threshold is not None
+                and len(doc_model.elements) >= self.virtual_threshold)
+
+    def activate(self, doc_model) -> None:
+        """預覽顯示的是 doc_model：render_blocks 之後以它的 element 回應"""
+        # 整組替換：render_blocks 可能同時在另一個 thread 讀取
+        self._virtual = ({elem.id: elem for elem in doc_model.elements},
+                         getattr(doc_model, "latex_token_map", {}))
+
+    def _render_placeholders(self, doc_model) -> str:
+        """每個 element 一個估計高度的空 div（與完整渲染的 src-block 外框相同）"""
+        parts = []
+        for elem in doc_model.elements:
+            src = ""
+            if elem.src_lines is not None:
+                src = f' data-src="{elem.src_lines[0]}-{elem.src_lines[1]}"'
+            parts.append(f'<div class="src-block" id="src-{elem.id}"{src} '
+                         f'style="min-height:{estimate_height(elem)}px"></div>')
+        return "\n".join(parts)
+
+    def render_blocks(self, elem_ids) -> dict:
+        """
+        虛擬化預覽：回傳 {elem_id: HTML}（只含最近一次 render 的 element；
+        舊頁面要求的 id 直接略過）。圖一起送進 plot_pool 平行渲染。
+        """
+        elems, token_map = self._virtual
+        wanted = [elems[i] for i in elem_ids if i in elems]
+
+        plots = [e for e in wanted if isinstance(e, PlotElement)]
+        rendered = dict(zip((e.id for e in plots), self.plot_pool.render_all(plots, self.dark_mode)))
+        for elem in wanted:
+            if elem.id not in rendered:
+                rendered[elem.id] = self.element_renderer.render_element(elem, token_map)
+        return {i: expand_tokens(h, token_map) for i, h in rendered.items()}
+
+    def _page(self, html_body: str, virtual: bool):
+        """html_body 套上主題樣式與 HTML_TEMPLATE，回傳 (html, base_url)"""
         # --------------------
         # 3) 主題處理 (dark/light)
         # （保留原本的背景、字色、code 配色）
@@ -246,6 +578,18 @@ class HtmlRenderer:
             border-radius: 0;
         }}
 
+        .block-stats {{
+            font-size: 11px;
+            margin-right: 8px;
+            color: {"#999" if self.dark_mode else "#666"};
+        }}
+
+        .output-more {{
+            padding: 4px 10px;
+            font-size: 0.9em;
+            color: {"#aaa" if self.dark_mode else "#555"};
+        }}
+
         .python-output pre {{
             background-color: {"#222" if self.dark_mode else "#fff"};
             color: {"#ddd" if self.dark_mode else "#333"};
@@ -261,7 +605,9 @@ class HtmlRenderer:
         # --------------------
         # 4) 套入 template
         # --------------------
-        full_html = HTML_TEMPLATE.replace("%%CONTENT%%", html_style + html_body)
+        full_html = (HTML_TEMPLATE
+                     .replace("%%VIRTUAL%%", "true" if virtual else "false")
+                     .replace("%%CONTENT%%", html_style + html_body))
 
         # ★ Debug：匯出渲染後的 HTML （為了找 Crash 的根源）
         with open("debug_output.html", "w", encoding="utf-8") as f:
@@ -0,0 +1,79 @@
+# renderer/plot_pool.py
+"""
+PlotElement 的平行渲染。
+
+每個 PlotElement 彼此獨立（輸入只有 kind/code 與主題），
+因此整份筆記的圖一次送進 WarmProcessPool，依文件順序取回 HTML。
+worker 預先 import numpy / matplotlib（Agg FigurePool），
+失敗或逾時的圖換成錯誤訊息，不影響其他圖。
+即時預覽（render）與虛擬化預覽（render_blocks）在不同 thread 共用同一個 PlotPool：
+WarmProcessPool 以 lock 讓兩邊的批次依序執行，一邊逾時重建 pool 不會波及另一邊。
+"""
+
+from typing import List
+
+from document.element import PlotElement
+from executor.worker_pool import WarmProcessPool
+
+
+def _use_agg_backend() -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_one(elem: PlotElement, dark_mode: bool) -> str:
+    """在 worker process 內執行"""
+    from renderer.plot_renderer import PlotRenderer
+    return PlotRenderer(dark_mode=dark_mode).render_plot_element(elem)
+
+
+class PlotPool:
+
+    PRELOAD = (
+        "numpy",
+        "plot.figure_pool",
+        "plot.core_plot",
+        "plot.core_plot3d",
+        "plot.core_plot_data",
+        "plot.core_plot_func",
+        "latex.core_latex",
+    )
+
+    # 單張圖最長允許的時間（秒）
+    timeout = 30.0
+    # 圖數少於此值時直接在本 process 畫，省下傳輸成本
+    min_batch = 2
+
+    def __init__(self, max_workers: int = None):
+        self._pool = WarmProcessPool(
+            max_workers=max_workers,
+            preload=self.PRELOAD,
+            setup=_use_agg_backend,
+        )
+
+    def warm(self) -> None:
+        self._pool.warm()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
+
+    def render_all(self, elems: List[PlotElement], dark_mode: bool) -> List[str]:
+        """依輸入順序回傳每個 PlotElement 的 HTML"""
+        if len(elems) < self.min_batch:
+            return [_render_one(e, dark_mode) for e in elems]
+
+        results = self._pool.map_ordered(
+            _render_one,
+            [(e, dark_mode) for e in elems],
+            timeout=self.timeout,
+        )
+
+        html_list = []
+        for ok, value in results:
+            if ok:
+                html_list.append(value)
+            else:
+                html_list.append(
+                    f'<pre style="color:red;">Plot 錯誤：{type(value).__name__}: {value}</pre>'
+                )
+        return html_list
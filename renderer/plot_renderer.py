@@ -2,13 +2,11 @@
 
 from typing import Tuple, Union
 
-from plot.core_plot import PlotEngine
-from plot.core_plot3d import Plot3DEngine
-from plot.core_plot_data import PlotDataEngine
-from plot.core_plot_func import PlotFunc2DEngine
-
 from document.element import PlotElement
 
+# ★ 各 plot 引擎會帶入 numpy / matplotlib，啟動時很重：
+#   一律在 handler 內才 import（第一次畫圖或背景 warm-up 時才載入）
+
 
 class PlotRenderer:
     """
@@ -50,27 +48,62 @@ class PlotRenderer:
 
     # ---------- 1) XY data file ----------
     def _render_2d_data(self, code: Union[str, Tuple]) -> str:
+        from plot.core_plot_data import PlotDataEngine
+
         filepath = code[0] if isinstance(code, tuple) else code
+        live = code[1] if isinstance(code, tuple) and len(code) > 1 else None
+
+        if live:
+            # live 或 live=5000（rolling window 列數）
+            window = int(live.split("=", 1)[1]) if "=" in live else None
+            return PlotDataEngine.make_live_plot(
+                filepath, dark_mode=self.dark_mode, window=window
+            )
+
         div_html = PlotDataEngine.make_xy_plot(filepath, dark_mode=self.dark_mode)
         return div_html
 
     # ---------- 2) XYZ file ----------
     def _render_3d_data(self, code: Union[str, Tuple]) -> str:
+        from plot.core_plot3d import Plot3DEngine
+
         filepath = code[0] if isinstance(code, tuple) else code
+        options = code[1] if isinstance(code, tuple) and len(code) > 1 else None
+
+        # 選項：解析度（200 或 200x150）與補值方式（none / nearest / linear）
+        grid_res, fill = None, "nearest"
+        for opt in (options or "").split(","):
+            opt = opt.strip().lower()
+            if not opt:
+                continue
+            if opt in ("none", "nearest", "linear"):
+                fill = opt
+            elif "x" in opt:
+                nx, ny = opt.split("x", 1)
+                grid_res = (int(nx), int(ny))
+            else:
+                grid_res = (int(opt), int(opt))
+
         div_html = Plot3DEngine.make_surface_from_xyz_file(
             filepath,
-            dark_mode=self.dark_mode
+            dark_mode=self.dark_mode,
+            grid_res=grid_res,
+            fill=fill
         )
         return div_html
 
     # ---------- 3) plot$$ y = ... $$ ----------
     def _render_2d_latex(self, code: str) -> str:
+        from plot.core_plot_func import PlotFunc2DEngine
+
         body = code.strip()
         div_html = PlotFunc2DEngine.make_from_latex(body, dark_mode=self.dark_mode)
         return div_html
 
     # ---------- 4) plot3d$$ z = ... $$ ----------
     def _render_3d_latex(self, code: str) -> str:
+        from plot.core_plot3d import Plot3DEngine
+
         body = code.strip()
         div_html = Plot3DEngine.make_surface_from_latex(
             body,
@@ -80,6 +113,8 @@ class PlotRenderer:
 
     # ---------- 5) 2D python expr ----------
     def _render_2d_py(self, code: Tuple) -> str:
+        from plot.core_plot import PlotEngine
+
         if not isinstance(code, tuple) or len(code) != 3:
             return self._error_html(f"2d_py 參數錯誤：{code}")
 
@@ -105,6 +140,7 @@ class PlotRenderer:
 
         # LaTeX 轉 Python
         from latex.core_latex import LatexPlotEngine
+        from plot.core_plot3d import Plot3DEngine
         expr_py = LatexPlotEngine._latex_to_python(expr)
 
         # 使用通用 3D API
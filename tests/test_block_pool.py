@@ -0,0 +1,36 @@
+# tests/test_block_pool.py
+
+import pytest
+
+from executor.block_pool import BlockPool
+from executor.limits import ExecutionLimits
+
+
+@pytest.fixture
+def pool():
+    p = BlockPool(max_workers=2, limits=ExecutionLimits(wall_seconds=1.0))
+    p.warm()
+    yield p
+    p.shutdown()
+
+
+def test_run_all_in_document_order(pool):
+    outputs = pool.run_all([f"print({k} * {k})" for k in range(5)])
+    assert [o.strip() for o in outputs] == [str(k * k) for k in range(5)]
+
+
+def test_blocks_are_isolated(pool):
+    outputs = pool.run_all(["x = 1\nprint(x)", "print('x' in globals())"])
+    assert [o.strip() for o in outputs] == ["1", "False"]
+
+
+def test_timeout_affects_only_that_block(pool):
+    outputs = pool.run_all(["while True: pass", "print('ok')"])
+    assert outputs[0].startswith("Error:")
+    assert outputs[1].strip() == "ok"
+
+
+def test_profile_flag(pool):
+    outputs = pool.run_all(["sum(range(10))", "sum(range(10))"], profile=[True, False])
+    assert "cProfile" in outputs[0] and "cProfile" not in outputs[1]
+    assert outputs[0].stats["peak_kb"] is not None and outputs[1].stats["peak_kb"] is None
@@ -0,0 +1,146 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from plot import data_loader
+from plot.data_loader import CACHE_DIR_NAME, load_columns, open_grid
+
+
+def _write_text(path, data, header=None):
+    with open(path, "w", encoding="utf-8") as f:
+        if header:
+            f.write(" ".join(header) + "\n")
+        for row in data:
+            f.write(" ".join(repr(float(v)) for v in row) + "\n")
+
+
+def test_text_file_with_header(tmp_path):
+    data = np.column_stack([np.arange(5.0), np.arange(5.0) ** 2])
+    path = str(tmp_path / "a.txt")
+    _write_text(path, data, header=["t", "v"])
+
+    columns, labels = load_columns(path)
+    assert labels == ["t", "v"]
+    np.testing.assert_array_equal(columns, data.T)
+
+
+def test_second_load_memory_maps_cache(tmp_path):
+    data = np.column_stack([np.arange(10.0), np.sin(np.arange(10.0))])
+    path = str(tmp_path / "a.txt")
+    _write_text(path, data, header=["x", "y"])
+
+    load_columns(path)
+    cached = os.listdir(tmp_path / CACHE_DIR_NAME)
+    assert sorted(os.path.splitext(n)[1] for n in cached) == [".json", ".npy"]
+
+    columns, labels = load_columns(path)
+    assert isinstance(columns, np.memmap)
+    assert labels == ["x", "y"]
+    np.testing.assert_array_equal(columns, data.T)
+
+
+def test_changed_file_replaces_old_cache(tmp_path):
+    path = str(tmp_path / "a.txt")
+    _write_text(path, [[0, 1], [1, 2]])
+    load_columns(path)
+    _write_text(path, [[0, 5], [1, 6], [2, 7]])
+    os.utime(path, ns=(1, 1))
+
+    columns, _ = load_columns(path)
+    np.testing.assert_array_equal(columns[1], [5, 6, 7])
+    assert len(os.listdir(tmp_path / CACHE_DIR_NAME)) == 2
+
+
+def test_concurrent_cache_writers_use_separate_temp_files(tmp_path, monkeypatch):
+    data = np.random.default_rng(0).random((200, 3))
+    path = str(tmp_path / "a.txt")
+    _write_text(path, data)
+    cache_dir, prefix, npy_path = data_loader._cache_paths(path)
+    columns = np.ascontiguousarray(data.T)
+
+    # 第一個 writer 寫到一半時，第二個 writer 寫完整份 cache
+    real_save = np.save
+    seen_tmp = []
+
+    def save(f, arr):
+        seen_tmp.append(sorted(n for n in os.listdir(cache_dir) if n.endswith(".tmp")))
+        if len(seen_tmp) == 1:
+            data_loader._write_cache(cache_dir, prefix, npy_path, columns, None)
+        real_save(f, arr)
+
+    monkeypatch.setattr(data_loader.np, "save", save)
+    data_loader._write_cache(cache_dir, prefix, npy_path, columns, None)
+
+    assert len(seen_tmp[1]) == 2
+    np.testing.assert_array_equal(np.load(npy_path), columns)
+    assert not [n for n in os.listdir(cache_dir) if n.endswith(".tmp")]
+
+
+def test_npy_is_memory_mapped(tmp_path):
+    data = np.arange(12.0).reshape(4, 3)
+    path = str(tmp_path / "d.npy")
+    np.save(path, data)
+
+    columns, labels = load_columns(path)
+    assert labels is None
+    assert isinstance(columns.base, np.memmap) or isinstance(columns, np.memmap)
+    np.testing.assert_array_equal(columns, data.T)
+    assert not os.path.exists(tmp_path / CACHE_DIR_NAME)
+
+
+def test_npz_columns_use_keys_as_labels(tmp_path):
+    path = str(tmp_path / "d.npz")
+    np.savez(path, t=np.arange(5.0), a=np.arange(5.0) * 2)
+
+    columns, labels = load_columns(path)
+    assert labels == ["t", "a"]
+    assert isinstance(columns[0], np.memmap)
+    np.testing.assert_array_equal(columns[1], np.arange(5.0) * 2)
+
+
+def test_compressed_npz_is_loaded(tmp_path):
+    path = str(tmp_path / "d.npz")
+    np.savez_compressed(path, t=np.arange(5.0), a=np.arange(5.0) + 1)
+
+    columns, labels = load_columns(path)
+    np.testing.assert_array_equal(columns[1], np.arange(5.0) + 1)
+
+
+def test_raw_binary_with_descriptor(tmp_path):
+    data = np.arange(12, dtype="<f4").reshape(4, 3)
+    path = str(tmp_path / "d.bin")
+    data.tofile(path)
+    with open(path + ".json", "w") as f:
+        json.dump({"dtype": "<f4", "columns": 3, "labels": ["t", "a", "b"]}, f)
+
+    columns, labels = load_columns(path)
+    assert labels == ["t", "a", "b"]
+    np.testing.assert_array_equal(columns, data.T)
+
+
+def test_raw_binary_without_descriptor(tmp_path):
+    path = str(tmp_path / "d.bin")
+    np.zeros(4).tofile(path)
+    with pytest.raises(FileNotFoundError):
+        load_columns(path)
+
+
+def test_grid_from_raw_binary(tmp_path):
+    Z = np.arange(6, dtype="<f8").reshape(2, 3)
+    path = str(tmp_path / "g.raw")
+    Z.tofile(path)
+    with open(path + ".json", "w") as f:
+        json.dump({"dtype": "<f8", "shape": [2, 3]}, f)
+
+    x, y, grid = open_grid(path)
+    np.testing.assert_array_equal(x, [0, 1, 2])
+    np.testing.assert_array_equal(y, [0, 1])
+    np.testing.assert_array_equal(grid, Z)
+
+
+def test_npy_with_three_columns_is_not_a_grid(tmp_path):
+    path = str(tmp_path / "p.npy")
+    np.save(path, np.zeros((5, 3)))
+    assert open_grid(path) is None
@@ -0,0 +1,41 @@
+# tests/test_dataflow.py
+
+from document.controller import DocumentController
+from document.element import PythonElement
+from executor.dataflow import DataflowGraph, analyze
+from executor.python_executor import PythonExecutor
+
+
+def test_analyze_defs_and_uses():
+    defs, uses = analyze("import numpy as np\ny = np.sin(x)\ndef f(a):\n    return a + z")
+    assert defs == {"np", "y", "f"}
+    assert uses == {"x", "z"}
+
+
+def test_downstream_dependents_and_redefiners():
+    g = DataflowGraph(["x = 1", "y = x + 1", "print(y)", "x = 5", "print(1)"])
+    assert g.downstream({0}) == {0, 1, 2, 3}
+    assert g.downstream({2}) == {2}
+
+
+def test_downstream_includes_definer_of_updated_name():
+    g = DataflowGraph(["x = 1", "x += 1\nprint(x)", "x += 1"])
+    assert g.downstream({1}) == {0, 1, 2}
+    assert g.downstream({2}) == {0, 1, 2}
+
+
+def _blocks(*codes):
+    return [PythonElement(code) for code in codes]
+
+
+def test_notebook_rerun_is_reproducible():
+    controller = DocumentController(html_renderer=None)
+    controller.executor = PythonExecutor(backend="inprocess")
+    controller.notebook_mode = True
+
+    outputs = []
+    for comment in ("", "# a", "# b"):
+        blocks = _blocks("x = 1", f"x += 1{comment}\nprint(x)")
+        controller._execute_notebook(blocks)
+        outputs.append(str(blocks[1].output).strip())
+    assert outputs == ["2", "2", "2"]
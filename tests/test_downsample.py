@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from plot import downsample
+from plot.downsample import (downsample_xy, lttb_indices, minmax_indices,
+                             slice_x_range, x_is_sorted)
+
+
+def test_lttb_keeps_endpoints_and_size():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50)
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_keeps_a_single_spike():
+    x = np.arange(1000.0)
+    y = np.zeros(1000)
+    y[567] = 10.0
+    assert 567 in lttb_indices(x, y, 50)
+
+
+def test_lttb_small_input_is_unchanged():
+    np.testing.assert_array_equal(lttb_indices(np.arange(5.0), np.arange(5.0), 10),
+                                  np.arange(5))
+
+
+def test_minmax_keeps_extremes_of_every_bucket():
+    rng = np.random.default_rng(1)
+    y = rng.normal(size=10_000)
+    idx = minmax_indices(y, 200)
+    assert len(idx) <= 202
+    assert (np.diff(idx) > 0).all()
+    assert int(np.argmin(y)) in idx and int(np.argmax(y)) in idx
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+
+
+def test_minmax_chunked_matches_single_pass():
+    y = np.random.default_rng(2).normal(size=50_001)
+    np.testing.assert_array_equal(minmax_indices(y, 500, chunk=7_000),
+                                  minmax_indices(y, 500, chunk=10 ** 9))
+
+
+def test_downsample_xy_methods():
+    x = np.arange(20_000.0)
+    y = np.cos(x / 100)
+    for method in ("lttb", "minmax"):
+        xs, ys = downsample_xy(x, y, 1000, method=method)
+        assert len(xs) == len(ys) <= 1002
+        np.testing.assert_array_equal(ys, y[xs.astype(int)])
+    with pytest.raises(ValueError):
+        downsample_xy(x, y, 1000, method="nope")
+
+
+def test_downsample_xy_chunked_lttb_path(monkeypatch):
+    monkeypatch.setattr(downsample, "CHUNKED_THRESHOLD", 1000)
+    x = np.arange(5000.0)
+    y = np.sin(x / 30)
+    xs, ys = downsample_xy(x, y, 200)
+    assert len(xs) == 200
+    assert xs[0] == 0 and xs[-1] == 4999
+
+
+def test_x_is_sorted_across_chunks():
+    x = np.arange(100.0)
+    assert x_is_sorted(x, chunk=7)
+    x[50] = -1
+    assert not x_is_sorted(x, chunk=7)
+
+
+def test_slice_x_range_sorted_and_unsorted():
+    x = np.arange(10.0)
+    sel = slice_x_range(x, 3, 5, is_sorted=True)
+    assert sel == slice(2, 7)
+
+    xu = np.array([5.0, 1.0, 3.0, 9.0])
+    mask = slice_x_range(xu, 2, 6)
+    np.testing.assert_array_equal(mask, [True, False, True, False])
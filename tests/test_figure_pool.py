@@ -0,0 +1,34 @@
+# tests/test_figure_pool.py
+
+from plot.figure_pool import FigurePool
+
+
+def _draw_dark(fig, ax):
+    ax.plot([0, 1], [1, 0], label="a")
+    ax.tick_params(colors="white", top=True, right=True)
+    ax.legend()
+    ax.grid(True)
+    ax.set_title("dark", color="white")
+    fig.set_size_inches(3, 2)
+
+
+def _draw(fig, ax):
+    ax.plot([0, 1, 2], [0, 1, 4], label="y")
+    ax.legend()
+    ax.set_xlabel("x")
+
+
+def test_pooled_figure_renders_like_fresh():
+    fresh = FigurePool(size=1).render_png(_draw)
+    pool = FigurePool(size=1)
+    pool.render_png(_draw_dark, facecolor="black")
+    assert pool.render_png(_draw) == fresh
+
+
+def test_pool_reuses_figure():
+    pool = FigurePool(size=1)
+    with pool.axes() as (fig1, _):
+        pass
+    with pool.axes() as (fig2, ax):
+        assert fig2 is fig1
+        assert not ax.lines
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from plot.gridding import bin_average, fill_linear, fill_nearest, grid_xyz
+
+
+def test_bin_average_means_points_per_cell():
+    xs = [0.0, 0.1, 1.0, 1.0]
+    ys = [0.0, 0.1, 1.0, 1.0]
+    zs = [1.0, 3.0, 10.0, 20.0]
+    x, y, Z = bin_average(xs, ys, zs, 2, 2)
+    np.testing.assert_allclose(x, [0.25, 0.75])
+    assert Z[0, 0] == 2.0
+    assert Z[1, 1] == 15.0
+    assert np.isnan(Z[0, 1]) and np.isnan(Z[1, 0])
+
+
+def test_bin_average_skips_non_finite_and_rejects_empty():
+    x, y, Z = bin_average([0, 1, np.nan], [0, 1, 0], [1, 2, 3], 2, 2)
+    assert np.nansum(Z) == 3.0
+    with pytest.raises(ValueError):
+        bin_average([np.nan], [0], [0], 2, 2)
+
+
+def test_fill_nearest_spreads_outwards():
+    Z = np.full((3, 3), np.nan)
+    Z[1, 1] = 5.0
+    filled = fill_nearest(Z)
+    assert not np.isnan(filled).any()
+    assert (filled == 5.0).all()
+    assert np.isnan(Z).sum() == 8          # 不改原陣列
+
+
+def test_fill_nearest_all_nan_is_unchanged():
+    Z = np.full((2, 2), np.nan)
+    assert np.isnan(fill_nearest(Z)).all()
+
+
+def test_fill_linear_interpolates_between_known_cells():
+    Z = np.array([[0.0, np.nan, np.nan, 3.0]])
+    Z = np.vstack([Z, Z])
+    filled = fill_linear(Z, np.arange(4.0), np.arange(2.0))
+    np.testing.assert_allclose(filled[0], [0, 1, 2, 3])
+
+
+def test_grid_xyz_recovers_a_plane():
+    rng = np.random.default_rng(3)
+    xs, ys = rng.random(20_000), rng.random(20_000)
+    zs = 2 * xs + ys
+    X, Y, Z = grid_xyz(xs, ys, zs, nx=20, fill="linear")
+    assert X.shape == Y.shape == Z.shape == (20, 20)
+    np.testing.assert_allclose(Z, 2 * X + Y, atol=0.05)
+
+
+def test_grid_xyz_validates_arguments():
+    with pytest.raises(ValueError):
+        grid_xyz([0, 1], [0, 1], [0, 1], nx=1)
+    with pytest.raises(ValueError):
+        grid_xyz([0, 1], [0, 1], [0, 1], fill="cubic")
+    _, _, Z = grid_xyz([0, 1], [0, 1], [0, 1], nx=4, fill="none")
+    assert np.isnan(Z).any()
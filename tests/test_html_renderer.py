@@ -0,0 +1,73 @@
+# tests/test_html_renderer.py
+"""連續渲染兩份文件：LaTeX token 不可沿用上一份文件的 token_map"""
+
+import pytest
+
+from document.parser import DocumentParser
+from renderer.html_renderer import HtmlRenderer
+
+
+@pytest.fixture
+def renderer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)      # render 會寫 debug_output.html
+    r = HtmlRenderer()
+    yield r
+    r.plot_pool.shutdown()
+
+
+def _parse(text):
+    return DocumentParser().parse(text)
+
+
+def test_full_then_full(renderer):
+    renderer.render(_parse("old $OLD_MATH$"), virtual=False)
+    html, _ = renderer.render(_parse("new $NEW_0$"), virtual=False)
+    assert "$NEW_0$" in html
+    assert "OLD_MATH" not in html
+
+
+def test_full_then_virtual(renderer):
+    renderer.render(_parse("old $OLD_MATH$"), virtual=False)
+    doc = _parse("new $NEW_0$")
+    renderer.render(doc, virtual=True)
+    blocks = renderer.render_blocks([e.id for e in doc.elements])
+    assert any("$NEW_0$" in h for h in blocks.values())
+    assert not any("OLD_MATH" in h for h in blocks.values())
+
+
+def test_virtual_first_page(renderer):
+    doc = _parse("# title\n\ntext $x^2$")
+    html, _ = renderer.render(doc, virtual=True)
+    assert 'id="src-' in html
+    blocks = renderer.render_blocks([e.id for e in doc.elements])
+    assert len(blocks) == 2
+    assert any("$x^2$" in h for h in blocks.values())
+
+
+def test_background_render_keeps_active_page(renderer):
+    shown = _parse("shown $SHOWN$")
+    renderer.render(shown, virtual=True)
+    pending = _parse("pending $PENDING$")
+    renderer.render(pending, virtual=True, activate=False)
+    blocks = renderer.render_blocks([e.id for e in shown.elements])
+    assert any("$SHOWN$" in h for h in blocks.values())
+    assert renderer.render_blocks([e.id for e in pending.elements]) == {}
+    renderer.activate(pending)
+    assert renderer.render_blocks([e.id for e in pending.elements])
+
+
+def test_full_and_virtual_render_share_plot_pool(renderer):
+    import threading
+
+    text = "\n\n".join(f"plot('sin({k} * x)', -5, 5)" for k in range(1, 5))
+    full, virtual = _parse(text), _parse(text)
+    renderer.render(virtual, virtual=True)
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault(
+        "blocks", renderer.render_blocks([e.id for e in virtual.elements])))
+    t.start()
+    html, _ = renderer.render(full, virtual=False)
+    t.join()
+    assert "Plot 錯誤" not in html
+    assert len(out["blocks"]) == 4
+    assert not any("Plot 錯誤" in h for h in out["blocks"].values())
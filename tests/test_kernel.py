@@ -0,0 +1,58 @@
+# tests/test_kernel.py
+
+import threading
+
+import pytest
+
+from executor.kernel import KernelClient
+
+SLEEP = "import time\nfor _ in range(40):\n    time.sleep(0.05)\nprint('finished')"
+
+
+@pytest.fixture(scope="module")
+def kernel():
+    k = KernelClient(preload=())
+    yield k
+    k.shutdown()
+
+
+def _interrupt_when_started(kernel, tag):
+    started = threading.Event()
+    timer = threading.Thread(target=lambda: started.wait(5) and kernel.interrupt(tag))
+    timer.start()
+    return started, timer
+
+
+def test_interrupt_other_tag_is_ignored(kernel):
+    started, timer = _interrupt_when_started(kernel, "e-other")
+    out = kernel.execute(SLEEP, tag="e-run", on_start=started.set)
+    timer.join()
+    assert "finished" in out
+
+
+def test_interrupt_matching_tag(kernel):
+    started, timer = _interrupt_when_started(kernel, "e-run")
+    out = kernel.execute(SLEEP, tag="e-run", on_start=started.set)
+    timer.join()
+    assert "KeyboardInterrupt" in out
+
+
+def test_execute_result_keeps_state(kernel):
+    assert kernel.execute("print(1 + 1)").strip() == "2"
+    assert kernel.execute("y = 3", shared=True) == "(no output)"
+    assert kernel.execute("print(y)", shared=True).strip() == "3"
+
+
+def test_interrupt_before_kernel_starts_is_kept(kernel):
+    timer = threading.Thread(target=lambda: kernel._running.wait(5) and kernel.interrupt("e-run"))
+    timer.start()
+    out = kernel.execute(SLEEP, tag="e-run")
+    timer.join()
+    assert "KeyboardInterrupt" in out
+
+
+def test_timeout_keeps_result_attributes(kernel):
+    out = kernel.execute("print('x' * 100000)\n" + SLEEP, timeout=0.5)
+    assert out.rstrip().endswith("已中斷)")
+    assert out.stats and out.stats["wall_ms"] > 0
+    assert out.spill_path is not None and out.total_chars > 100000
@@ -0,0 +1,50 @@
+import sys
+
+import pytest
+
+from executor.kernel import KernelClient, exec_capture
+from executor.limits import (CPUTimeLimitExceeded, ExecutionLimits,
+                             describe_limit_error)
+from executor.output_capture import OutputLimitExceeded
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="需要 resource 模組")
+
+
+def test_describe_limit_error():
+    limits = ExecutionLimits(memory_mb=512, cpu_seconds=3, output_chars=1000)
+    assert "512 MB" in describe_limit_error(MemoryError(), limits)
+    assert "3 秒" in describe_limit_error(CPUTimeLimitExceeded(), limits)
+    assert "1,000" in describe_limit_error(OutputLimitExceeded(), limits)
+    assert describe_limit_error(ValueError(), limits) is None
+    assert "MB" in describe_limit_error(MemoryError(), None)
+
+
+def test_output_limit_stops_in_process_run():
+    limits = ExecutionLimits(output_chars=10_000)
+    out = exec_capture("while True:\n    print('x' * 100)", limits=limits)
+    assert "OutputLimitExceeded" in out
+
+
+def test_user_except_cannot_swallow_output_limit():
+    code = ("try:\n    while True:\n        print('x' * 100)\n"
+            "except Exception:\n    print('swallowed')")
+    out = exec_capture(code, limits=ExecutionLimits(output_chars=10_000))
+    assert "OutputLimitExceeded" in out
+    assert "swallowed" not in out
+
+
+@posix_only
+def test_kernel_enforces_cpu_and_memory_limits():
+    kernel = KernelClient(preload=(), limits=ExecutionLimits(memory_mb=512, cpu_seconds=1,
+                                                             wall_seconds=20))
+    try:
+        out = kernel.execute("while True:\n    pass")
+        assert "CPUTimeLimitExceeded" in out
+
+        out = kernel.execute("b = bytearray(2 * 1024 ** 3)")
+        assert "MemoryLimitExceeded" in out
+
+        # 超過上限後 kernel 仍可繼續使用
+        assert kernel.execute("print(1 + 1)").strip() == "2"
+    finally:
+        kernel.shutdown()
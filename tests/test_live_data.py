@@ -0,0 +1,59 @@
+# tests/test_live_data.py
+
+import numpy as np
+
+from plot import live_data
+from plot.live_data import read_appended, read_tail
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_read_tail_reads_only_last_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(live_data, "TAIL_CHUNK", 64)
+    lines = "".join(f"{i} {i * i}\n" for i in range(1000))
+    path = _write(tmp_path / "run.log", "t v\n" + lines + "1000 5")
+    labels, rows, offset = read_tail(path, 5)
+    assert labels == ["t", "v"]
+    assert rows[:, 0].tolist() == [995, 996, 997, 998, 999]
+    # 寫到一半的最後一行不讀，之後從它開始接著讀
+    assert offset == len("t v\n" + lines)
+
+
+def test_read_tail_short_file(tmp_path):
+    path = _write(tmp_path / "run.log", "0 1\n1 2\n")
+    labels, rows, offset = read_tail(path, 10)
+    assert labels is None
+    assert rows.tolist() == [[0, 1], [1, 2]]
+    assert offset == 8
+
+
+def test_read_tail_empty_and_header_only(tmp_path):
+    labels, rows, offset = read_tail(_write(tmp_path / "a.log", ""), 10)
+    assert (labels, rows.shape, offset) == (None, (0, 0), 0)
+    labels, rows, offset = read_tail(_write(tmp_path / "b.log", "t a b\n"), 10)
+    assert (labels, rows.shape, offset) == (["t", "a", "b"], (0, 3), 6)
+
+
+def test_read_appended_infers_columns_and_skips_bad_lines(tmp_path):
+    path = _write(tmp_path / "run.log", "")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("0 1 2\noops\n1 2 3\n2 3")
+    rows, offset, reset, skipped = read_appended(path, 0, 0)
+    assert rows.tolist() == [[0, 1, 2], [1, 2, 3]]
+    assert (offset, reset, skipped) == (len("0 1 2\noops\n1 2 3\n"), False, 1)
+
+
+def test_read_appended_detects_truncation(tmp_path):
+    path = _write(tmp_path / "run.log", "0 1\n")
+    rows, offset, reset, _ = read_appended(path, 100, 2)
+    assert reset and offset == 0 and rows.shape == (0, 2)
+    assert np.array_equal(read_appended(path, 4, 2)[0], np.empty((0, 2)))
+
+
+def test_live_plot_of_empty_file(tmp_path):
+    from plot.core_plot_data import PlotDataEngine
+    html = PlotDataEngine.make_live_plot(_write(tmp_path / "run.log", ""))
+    assert "followFile(" in html and ", 0, 0, " in html
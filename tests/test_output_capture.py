@@ -0,0 +1,84 @@
+# tests/test_output_capture.py
+
+import io
+import threading
+
+import pytest
+
+from executor.kernel import exec_capture
+from executor.limits import ExecutionLimits
+from executor.output_capture import (
+    OutputBuffer, OutputLimitExceeded, _DispatchingStream, capture, read_page,
+)
+
+
+def test_small_output_stays_in_memory():
+    buf = OutputBuffer()
+    buf.write("hello\n")
+    result = buf.getvalue()
+    assert result == "hello\n" and not result.omitted
+    assert read_page(result, 0) == ("hello\n", 1)
+
+
+def test_long_output_spills_to_file():
+    buf = OutputBuffer(head_chars=10, tail_chars=5)
+    text = "".join(f"{i:04d}\n" for i in range(100))
+    for line in text.splitlines(keepends=True):
+        buf.write(line)
+    buf.close()
+    result = buf.getvalue()
+    assert result.omitted and result.total_chars == len(text)
+    assert result.startswith(text[:10]) and result.endswith(text[-5:])
+    assert read_page(result, 0, page_chars=len(text)) == (text, 1)
+    assert read_page(result, 1, page_chars=100) == (text[100:200], 5)
+
+
+def test_output_limit_raises():
+    buf = OutputBuffer(max_chars=10)
+    with pytest.raises(OutputLimitExceeded):
+        buf.write("x" * 20)
+    assert buf.getvalue() == "x" * 10
+
+
+def test_error_keeps_spilled_output():
+    code = "for i in range(30000):\n    print(i)\nraise ValueError('late')"
+    result = exec_capture(code)
+    assert "ValueError: late" in result
+    assert result.omitted
+    assert read_page(result, 0, page_chars=10)[0] == "0\n1\n2\n3\n4\n"
+
+
+def test_limit_error_keeps_spilled_output():
+    result = exec_capture("while True:\n    print('x' * 1000)",
+                          limits=ExecutionLimits(output_chars=100_000))
+    assert result.startswith("Error:")
+    assert result.omitted and result.total_chars == 100_000
+
+
+def test_threads_capture_separately():
+    outputs = {}
+
+    def run(name):
+        with capture() as buf:
+            for _ in range(200):
+                print(name)
+        outputs[name] = buf.getvalue()
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert outputs == {"a": "a\n" * 200, "b": "b\n" * 200}
+
+
+def test_dispatching_stream_without_fallback():
+    stream = _DispatchingStream(None)
+    assert stream.write("lost") == 4
+    stream.flush()
+    assert stream.isatty() is False
+    assert stream.encoding == "utf-8"
+    with pytest.raises(io.UnsupportedOperation):
+        stream.fileno()
+    with pytest.raises(AttributeError):
+        stream.no_such_attribute
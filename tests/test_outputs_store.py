@@ -0,0 +1,61 @@
+import json
+
+from document import outputs_store
+from document.controller import DocumentController
+from document.element import PythonElement
+from executor.output_capture import ExecutionResult
+from executor.result_cache import ExecutionCache, code_key
+
+
+def _block(code, output):
+    elem = PythonElement(code)
+    elem.output = output
+    return elem
+
+
+def test_round_trip_keeps_output_and_stats(tmp_path):
+    note = str(tmp_path / "note.md")
+    out = ExecutionResult("42\n")
+    out.stats = {"wall_ms": 1.0, "cpu_ms": 1.0, "rss_kb": 100, "peak_kb": None}
+    outputs_store.save_outputs(note, [_block("print(42)", out)])
+
+    loaded = outputs_store.load_outputs(note)
+    assert loaded[code_key("print(42)")] == "42\n"
+    assert loaded[code_key("print(42)")].stats == out.stats
+
+
+def test_transient_outputs_are_not_saved(tmp_path):
+    note = str(tmp_path / "note.md")
+    outputs_store.save_outputs(note, [_block("x", "Traceback...\nKeyboardInterrupt")])
+    assert outputs_store.load_outputs(note) == {}
+
+
+def test_sidecar_has_no_unused_fields(tmp_path):
+    note = str(tmp_path / "note.md")
+    outputs_store.save_outputs(note, [_block("print(1)", ExecutionResult("1\n"))])
+    with open(outputs_store.sidecar_path(note), encoding="utf-8") as f:
+        entry = json.load(f)["blocks"][0]
+    assert set(entry) == {"hash", "output", "stats"}
+
+
+def test_restore_large_notebook_survives_cache_cap(tmp_path):
+    note = str(tmp_path / "note.md")
+    n = 300
+    blocks = [_block(f"print({i})", ExecutionResult(f"{i}\n")) for i in range(n)]
+    outputs_store.save_outputs(note, blocks)
+
+    controller = DocumentController(html_renderer=None)
+    controller.exec_cache = ExecutionCache(max_entries=16)
+    assert controller.restore_outputs(note) == n
+    for i in (0, n // 2, n - 1):
+        assert controller.exec_cache.get(f"print({i})") == f"{i}\n"
+
+
+def test_ensure_capacity_only_grows():
+    cache = ExecutionCache(max_entries=4)
+    cache.ensure_capacity(10)
+    cache.ensure_capacity(2)
+    assert cache.max_entries == 10
+    for i in range(10):
+        cache.put(str(i), str(i))
+    assert cache.get("0") == "0"
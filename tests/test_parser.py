@@ -0,0 +1,25 @@
+# tests/test_parser.py
+
+from document.parser import DocumentParser
+
+
+def _python(text):
+    return DocumentParser().parse(text).elements[0]
+
+
+def test_single_line_fence_is_code():
+    elem = _python("```python print(1)```")
+    assert elem.code == "print(1)"
+    assert elem.flags == set()
+
+
+def test_fence_flags():
+    elem = _python("```python nocache\nprint(2)\n```")
+    assert elem.code == "print(2)"
+    assert elem.flags == {"nocache"}
+
+
+def test_ids_unique_across_parsers():
+    a = DocumentParser().parse("one\n\ntwo")
+    b = DocumentParser().parse("one\n\ntwo")
+    assert not {e.id for e in a.elements} & {e.id for e in b.elements}
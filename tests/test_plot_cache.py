@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+from plot import plot_cache
+
+
+def _touch(path, size, age_days):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    t = time.time() - age_days * 86400
+    os.utime(path, (t, t))
+
+
+def test_cache_path_is_stable_and_parameter_sensitive():
+    a = plot_cache.cache_path("plot", "sin(x)", -5, 5, "dark")
+    assert a == plot_cache.cache_path("plot", "sin(x)", -5, 5, "dark")
+    assert a != plot_cache.cache_path("plot", "sin(x)", -5, 5, "light")
+    assert plot_cache._cache_name_re.match(os.path.basename(a))
+
+
+def test_lookup_refreshes_mtime(tmp_path):
+    path = str(tmp_path / ("plot_" + "0" * 20 + ".png"))
+    assert not plot_cache.lookup(path)
+    _touch(path, 10, age_days=5)
+    assert plot_cache.lookup(path)
+    assert time.time() - os.path.getmtime(path) < 60
+
+
+def test_gc_removes_old_files_and_keeps_foreign_ones(tmp_path):
+    d = str(tmp_path)
+    old = os.path.join(d, "plot_" + "a" * 20 + ".png")
+    fresh = os.path.join(d, "plot_" + "b" * 20 + ".png")
+    manual = os.path.join(d, "plot_20240101_120000.png")
+    _touch(old, 10, age_days=40)
+    _touch(fresh, 10, age_days=1)
+    _touch(manual, 10, age_days=400)
+
+    assert plot_cache.collect_garbage(d, max_bytes=10 ** 6, max_age_days=30) == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh) and os.path.exists(manual)
+
+
+def test_gc_trims_least_recently_used_over_size(tmp_path):
+    d = str(tmp_path)
+    paths = [os.path.join(d, f"plot_{i:020x}.png") for i in range(5)]
+    for age, path in enumerate(reversed(paths)):
+        _touch(path, 100, age_days=age)       # paths[0] 最久沒用
+
+    assert plot_cache.collect_garbage(d, max_bytes=300, max_age_days=30) == 2
+    assert [os.path.exists(p) for p in paths] == [False, False, True, True, True]
+
+
+def test_concurrent_store_of_same_plot(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_cache, "maybe_collect", lambda: None)
+    path = str(tmp_path / "plots" / ("plot_" + "c" * 20 + ".png"))
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                plot_cache.store(path, b"png" * 1000)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert os.listdir(tmp_path / "plots") == [os.path.basename(path)]
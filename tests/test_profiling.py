@@ -0,0 +1,40 @@
+# tests/test_profiling.py
+
+import tracemalloc
+
+from executor.profiling import format_stats, measure, report_table
+
+
+def test_measure_skips_tracemalloc_by_default():
+    with measure() as stats:
+        assert not tracemalloc.is_tracing()
+        [0] * 1000
+    assert stats["peak_kb"] is None
+    assert stats["wall_ms"] >= 0 and stats["cpu_ms"] >= 0
+    assert "profile" not in stats
+
+
+def test_measure_profile_traces_memory():
+    with measure(profile=True) as stats:
+        assert tracemalloc.is_tracing()
+        data = bytearray(2 * 1024 * 1024)
+        del data
+    assert not tracemalloc.is_tracing()
+    assert stats["peak_kb"] >= 2048
+    assert "cProfile" in stats["profile"]
+
+
+def test_format_stats_memory_column():
+    assert format_stats({"wall_ms": 5, "cpu_ms": 4, "rss_kb": 2048, "peak_kb": None}) \
+        == "⏱ 5 ms · CPU 4 ms · RSS 2.0 MB"
+    assert format_stats({"wall_ms": 5, "cpu_ms": 4, "peak_kb": 512}, cached=True) \
+        == "⏱ 5 ms · CPU 4 ms · 512 KB（cache）"
+    assert format_stats(None) == ""
+
+
+def test_report_table_sorted_by_wall():
+    rows = [("a", {"wall_ms": 1, "cpu_ms": 1}, False),
+            ("b", {"wall_ms": 9, "cpu_ms": 9}, False),
+            ("c", None, False)]
+    lines = report_table(rows).splitlines()
+    assert lines[-2].endswith("b") and lines[-1].endswith("a")
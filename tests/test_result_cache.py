@@ -0,0 +1,65 @@
+from document.controller import DocumentController
+from document.element import PythonElement
+from executor.python_executor import PythonExecutor
+from executor.result_cache import ExecutionCache, is_transient
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ExecutionCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"        # a 變成最近使用
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1, "skipped": 0}
+
+
+def test_transient_results_are_not_cached():
+    cache = ExecutionCache()
+    interrupted = "Traceback (most recent call last):\nKeyboardInterrupt"
+    assert is_transient(interrupted)
+    cache.put("x", interrupted)
+    assert cache.get("x") is None
+
+
+def test_clear_resets_entries_and_stats():
+    cache = ExecutionCache()
+    cache.put("a", "1")
+    cache.get("a")
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "hits": 0, "misses": 0, "skipped": 0}
+
+
+def _controller():
+    controller = DocumentController(html_renderer=None)
+    controller.executor = PythonExecutor(backend="inprocess")
+    controller.parallel_blocks = False
+    return controller
+
+
+def test_unchanged_blocks_are_not_rerun(tmp_path):
+    counter = tmp_path / "runs.txt"
+    code = f"open({str(counter)!r}, 'a').write('x')\nprint('ok')"
+    controller = _controller()
+
+    for _ in range(3):
+        blocks = [PythonElement(code, "b0"), PythonElement("print(1)", "b1", flags={"nocache"})]
+        controller._execute_cached(blocks)
+
+    assert counter.read_text() == "x"
+    assert blocks[0].cached and blocks[0].output.strip() == "ok"
+    assert not blocks[1].cached
+    assert controller.cache_stats()["skipped"] == 3
+
+
+def test_large_document_keeps_its_own_results():
+    controller = _controller()
+    controller.exec_cache = ExecutionCache(max_entries=8)
+    codes = [f"print({i})" for i in range(20)]
+
+    controller._execute_cached([PythonElement(c, f"b{i}") for i, c in enumerate(codes)])
+    blocks = [PythonElement(c, f"b{i}") for i, c in enumerate(codes)]
+    controller._execute_cached(blocks)
+
+    assert all(b.cached for b in blocks)
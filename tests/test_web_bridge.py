@@ -0,0 +1,32 @@
+# tests/test_web_bridge.py
+
+from ui.web_bridge import _BlockJob
+
+
+class _Controller:
+    def __init__(self, fail):
+        self.fail = fail
+
+    def execute_block(self, elem_id, on_output=None, on_dependent=None, on_start=None):
+        if self.fail:
+            raise RuntimeError("boom")
+        on_start()
+        return "ok"
+
+
+def _run(controller):
+    job = _BlockJob(controller, "e1")
+    events = []
+    job.signals.started.connect(lambda i: events.append(("started", i)))
+    job.signals.finished.connect(lambda i, out: events.append(("finished", i, str(out))))
+    job.run()
+    return events
+
+
+def test_block_job_reports_running_when_started():
+    assert _run(_Controller(fail=False)) == [("started", "e1"), ("finished", "e1", "ok")]
+
+
+def test_block_job_always_finishes():
+    events = _run(_Controller(fail=True))
+    assert events == [("finished", "e1", "Error:\nRuntimeError: boom")]
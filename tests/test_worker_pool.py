@@ -0,0 +1,54 @@
+# tests/test_worker_pool.py
+
+import threading
+import time
+
+import pytest
+
+from executor.worker_pool import WarmProcessPool
+
+
+def _append(path, text):
+    """在 worker 內執行：留下執行紀錄"""
+    with open(path, "a") as f:
+        f.write(text)
+    time.sleep(0.2)
+
+
+@pytest.fixture
+def pool():
+    p = WarmProcessPool(max_workers=2)
+    yield p
+    p.shutdown()
+
+
+def test_map_ordered_keeps_order(pool):
+    results = pool.map_ordered(pow, [(2, k) for k in range(6)])
+    assert results == [(True, 2 ** k) for k in range(6)]
+
+
+def test_exception_and_timeout_are_per_item(pool):
+    results = pool.map_ordered(time.sleep, [(0,), (5,), ("x",)], timeout=0.5)
+    assert results[0] == (True, None)
+    assert isinstance(results[1][1], TimeoutError)
+    assert isinstance(results[2][1], TypeError)
+
+
+def test_restart_does_not_touch_other_callers(pool, tmp_path):
+    """另一個 thread 逾時重建 pool 時，這邊的工作既不會失敗，也不會被重跑"""
+    log = tmp_path / "runs.txt"
+    pool.warm()
+    other = {}
+
+    def run_other():
+        time.sleep(0.1)
+        other["results"] = pool.map_ordered(_append, [(str(log), str(k)) for k in range(6)],
+                                            timeout=10)
+
+    t = threading.Thread(target=run_other)
+    t.start()
+    timed_out = pool.map_ordered(time.sleep, [(5,)], timeout=0.3)
+    t.join()
+    assert isinstance(timed_out[0][1], TimeoutError)
+    assert other["results"] == [(True, None)] * 6
+    assert sorted(log.read_text()) == list("012345")
@@ -0,0 +1,122 @@
+# ui/live_follower.py
+"""
+plot_data(..., live) 的檔案監看器。
+
+- QFileSystemWatcher 偵測檔案變動，只標記為 dirty
+- QTimer 以固定間隔（預設 100 ms）統一處理 dirty 檔案，
+  從上次的 offset 讀新增的完整行（plot.live_data.read_appended）
+- 每個 plot div 透過 rowsAppended(div_id, json) 收到新資料，
+  網頁端用 Plotly.extendTraces 加上去，不重新渲染整份筆記
+"""
+
+import json
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+
+class LiveDataFollower(QObject):
+
+    # (div_id, payload JSON)
+    rowsAppended = pyqtSignal(str, str)
+
+    def __init__(self, interval_ms: int = 100, parent=None):
+        super().__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+
+        # abspath → {"offset", "ncol", "window", "divs": [div_id, ...]}
+        self._files = {}
+        self._dirty = set()
+
+        # 單次 timer：變動後最多延遲 interval_ms 才讀，期間的多次寫入合併成一次
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._flush)
+
+    # ---------- 註冊 / 清除 ----------
+
+    def follow(self, div_id: str, filepath: str, offset: int, ncol: int, window: int) -> None:
+        path = os.path.abspath(filepath)
+        entry = self._files.get(path)
+        if entry is None:
+            entry = {"offset": offset, "ncol": ncol, "window": window, "divs": []}
+            self._files[path] = entry
+            self._watcher.addPath(path)
+        if div_id not in entry["divs"]:
+            entry["divs"].append(div_id)
+
+        # 渲染到註冊之間檔案可能已經又長了
+        self._mark_dirty(path)
+
+    def clear(self) -> None:
+        """重新渲染預覽前呼叫：舊的 div 已經不存在"""
+        if self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+        self._files.clear()
+        self._dirty.clear()
+        self._timer.stop()
+
+    # ---------- 內部 ----------
+
+    def _mark_dirty(self, path: str) -> None:
+        self._dirty.add(path)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _on_file_changed(self, path: str) -> None:
+        if path in self._files:
+            self._mark_dirty(path)
+            # 有些程式以「寫新檔再改名」方式更新，watcher 會失去這個路徑
+            if path not in self._watcher.files() and os.path.exists(path):
+                self._watcher.addPath(path)
+
+    def _flush(self) -> None:
+        from plot.live_data import read_appended, read_tail
+
+        dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            entry = self._files.get(path)
+            if entry is None or not os.path.exists(path):
+                continue
+
+            try:
+                rows, offset, reset, skipped = read_appended(path, entry["offset"], entry["ncol"])
+                if reset:
+                    # 檔案被截斷或重寫：重新讀尾端，網頁端整條替換
+                    _, rows, offset = read_tail(path, entry["window"])
+                    skipped = 0
+            except OSError:
+                # 暫時讀不到（例如正在重寫），下次再讀
+                self._mark_dirty(path)
+                continue
+            except ValueError as e:
+                # 重讀尾端時格式錯誤：從目前的檔尾接著跟，不反覆重試同一段
+                print(f"[live] {path}: {e}")
+                entry["offset"] = os.path.getsize(path)
+                continue
+
+            if skipped:
+                print(f"[live] {path}: 略過 {skipped} 行格式錯誤的資料")
+
+            entry["offset"] = offset
+            if len(rows) == 0 and not reset:
+                continue
+            if not entry["ncol"]:
+                # 檔案原本是空的：欄數由第一批資料決定（網頁端會補上缺的線）
+                entry["ncol"] = rows.shape[1]
+
+            ncurves = entry["ncol"] - 1
+            x = rows[:, 0].tolist() if len(rows) else []
+            payload = {
+                "reset": reset,
+                "x": [x] * ncurves,
+                "y": [rows[:, i].tolist() if len(rows) else [] for i in range(1, entry["ncol"])],
+                "idx": list(range(ncurves)),
+                "window": entry["window"],
+            }
+
+            js = json.dumps(payload)
+            for div_id in entry["divs"]:
+                self.rowsAppended.emit(div_id, js)
@@ -0,0 +1,120 @@
+# ui/live_preview.py
+"""
+即時預覽：打字時自動更新，不阻塞編輯器。
+
+- textChanged → schedule()：單次 timer 做 debounce，停止輸入 debounce_ms 後才更新
+- parse + 執行 python block + render 在 worker thread（QThreadPool，1 個 thread）
+- 每次要求更新時 generation + 1；完成的結果 generation 不是最新的就丟掉
+- 同一時間只有一個更新在跑：執行中又有新的要求時，跑完後用最新的文字再跑一次
+  （中間的版本直接略過，不會排隊）
+- 結果以 ready(doc_model, html, base_url) 送回 GUI thread，由主視窗 setHtml
+- 關閉視窗時 stop() + wait()：不再開始新的更新，等執行中的做完
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+
+class _PreviewSignals(QObject):
+    finished = pyqtSignal(int, object)   # (generation, (doc_model, html, base_url))
+    failed = pyqtSignal(int, str)        # (generation, 錯誤訊息)
+
+
+class _PreviewJob(QRunnable):
+    """在 worker thread 產生一次預覽"""
+
+    def __init__(self, controller, text, generation):
+        super().__init__()
+        self.setAutoDelete(False)       # 結果送回前 LivePreview 仍持有這個 job
+        self.controller = controller
+        self.text = text
+        self.generation = generation
+        self.signals = _PreviewSignals()
+
+    def run(self):
+        try:
+            result = self.controller.render_text(self.text)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, f"{type(e).__name__}: {e}")
+            return
+        self.signals.finished.emit(self.generation, result)
+
+
+class LivePreview(QObject):
+
+    ready = pyqtSignal(object, str, object)   # (doc_model, html, base_url)
+    failed = pyqtSignal(str)
+
+    def __init__(self, controller, text_source, debounce_ms: int = 300, parent=None):
+        """text_source()：在 GUI thread 呼叫，回傳目前的筆記文字"""
+        super().__init__(parent)
+        self.controller = controller
+        self.text_source = text_source
+        self.enabled = True      # False：打字不自動更新（手動更新仍可用）
+
+        self._generation = 0
+        self._job = None         # 執行中的 _PreviewJob
+        self._rerun = False      # 執行中又收到要求：跑完後再跑一次
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._start)
+
+    @property
+    def busy(self) -> bool:
+        return self._job is not None or self._timer.isActive()
+
+    def schedule(self) -> None:
+        """文字改變：重新開始 debounce 計時"""
+        if not self.enabled:
+            return
+        self._generation += 1
+        self._timer.start()
+
+    def refresh_now(self) -> None:
+        """立即更新（手動更新、插入公式、切換主題等）"""
+        self._generation += 1
+        self._timer.stop()
+        self._start()
+
+    def stop(self) -> None:
+        """不再開始新的更新（執行中的讓它做完，結果不再送出）"""
+        self.enabled = False
+        self._timer.stop()
+        self._rerun = False
+        self._generation += 1
+
+    def wait(self, msecs: int = -1) -> bool:
+        """等目前的更新做完（關閉視窗時用）"""
+        return self.pool.waitForDone(msecs)
+
+    # ---------- 內部 ----------
+
+    def _start(self) -> None:
+        if self._job is not None:
+            self._rerun = True
+            return
+        job = _PreviewJob(self.controller, self.text_source(), self._generation)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        self._job = job
+        self.pool.start(job)
+
+    def _done(self, generation: int) -> bool:
+        """job 結束的共同處理；回傳這個結果是否仍是最新的"""
+        self._job = None
+        if self._rerun:
+            self._rerun = False
+            self._start()
+        return generation == self._generation
+
+    def _on_finished(self, generation, result):
+        if self._done(generation):
+            self.ready.emit(*result)
+
+    def _on_failed(self, generation, message):
+        if self._done(generation):
+            self.failed.emit(message)
@@ -0,0 +1,126 @@
+# ui/scroll_sync.py
+"""
+編輯區 ↔ 預覽的捲動同步。
+
+位置以「element + element 內的比例」表示：
+  編輯區：第 line 行（可含小數） ↔ 包含這一行的 element（src_lines）
+  預覽  ：捲動位置 ↔ <div class="src-block" id="src-{elem_id}"> 與其內的比例
+每個 element 的起始行存成排序陣列，行號 → element 以 bisect 查詢（O(log n)）；
+網頁端同樣以二分搜尋找出畫面頂端的 block。
+
+- 編輯區捲動：以 QTimer 節流（最多每 interval_ms 一次），經 previewTarget 送到網頁
+- 預覽捲動：網頁端節流後呼叫 bridge.previewScrolled → sync_editor()
+- 程式造成的捲動不再回傳給另一邊（避免來回觸發）
+- 預覽重新載入後，網頁向 bridge.scrollTarget() 取目前編輯區的位置，捲回同一處
+"""
+
+from bisect import bisect_right
+
+from PyQt5.QtCore import QObject, QPoint, QTimer, pyqtSignal
+
+
+class ScrollSync(QObject):
+
+    # (elem_id, element 內的比例 0..1)
+    previewTarget = pyqtSignal(str, float)
+
+    def __init__(self, text_edit, interval_ms: int = 50, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.enabled = True
+
+        self._starts = []     # 每個 element 的第一行（遞增）
+        self._ids = []        # 與 _starts 對應的 elem_id
+        self._lines = {}      # elem_id → (第一行, 最後一行)
+        self._applying = False
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._emit_target)
+
+        text_edit.verticalScrollBar().valueChanged.connect(self._on_editor_scrolled)
+
+    def set_document(self, doc_model) -> None:
+        """預覽換成新的文件模型時呼叫（同一個 block 拆出的多個 element 只取第一個）"""
+        self._starts, self._ids, self._lines = [], [], {}
+        for elem in doc_model.elements:
+            lines = getattr(elem, "src_lines", None)
+            if lines is None:
+                continue
+            self._lines[elem.id] = lines
+            if self._starts and lines[0] <= self._starts[-1]:
+                continue
+            self._starts.append(lines[0])
+            self._ids.append(elem.id)
+
+    # ---------- 行號 ↔ element ----------
+
+    def element_at_line(self, line: float):
+        """回傳 (elem_id, 比例)；沒有 element 時回傳 (None, 0.0)"""
+        i = bisect_right(self._starts, line) - 1
+        if not self._ids:
+            return None, 0.0
+        if i < 0:
+            return self._ids[0], 0.0
+        elem_id = self._ids[i]
+        first, last = self._lines[elem_id]
+        fraction = (line - first) / (last - first + 1)
+        return elem_id, min(max(fraction, 0.0), 1.0)
+
+    def line_of(self, elem_id: str, fraction: float):
+        lines = self._lines.get(elem_id)
+        if lines is None:
+            return None
+        first, last = lines
+        return first + fraction * (last - first + 1)
+
+    # ---------- 編輯區 ----------
+
+    def editor_top_line(self) -> float:
+        """編輯區畫面頂端的行號（含小數：該行已捲出畫面的比例）"""
+        edit = self.text_edit
+        block = edit.cursorForPosition(QPoint(0, 0)).block()
+        rect = edit.document().documentLayout().blockBoundingRect(block)
+        offset = edit.verticalScrollBar().value() - rect.top()
+        partial = offset / rect.height() if rect.height() > 0 else 0.0
+        return block.blockNumber() + min(max(partial, 0.0), 1.0)
+
+    def scroll_editor_to_line(self, line: float) -> None:
+        doc = self.text_edit.document()
+        number = min(max(int(line), 0), doc.blockCount() - 1)
+        rect = doc.documentLayout().blockBoundingRect(doc.findBlockByNumber(number))
+        value = rect.top() + (line - number) * rect.height()
+        self._applying = True
+        try:
+            self.text_edit.verticalScrollBar().setValue(int(value))
+        finally:
+            self._applying = False
+
+    def element_at_cursor(self):
+        """游標所在行對應的 (elem_id, 比例)"""
+        cursor = self.text_edit.textCursor()
+        return self.element_at_line(cursor.blockNumber() + 0.5)
+
+    def preview_target(self):
+        """目前編輯區位置對應的 (elem_id, 比例)"""
+        return self.element_at_line(self.editor_top_line())
+
+    def sync_editor(self, elem_id: str, fraction: float) -> None:
+        """預覽捲動到 elem_id 的 fraction 處：編輯區跟著捲動"""
+        if not self.enabled:
+            return
+        line = self.line_of(elem_id, fraction)
+        if line is not None:
+            self.scroll_editor_to_line(line)
+
+    def _on_editor_scrolled(self, _value) -> None:
+        if self._applying or not self.enabled:
+            return
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _emit_target(self) -> None:
+        elem_id, fraction = self.preview_target()
+        if elem_id is not None:
+            self.previewTarget.emit(elem_id, fraction)
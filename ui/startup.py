@@ -0,0 +1,158 @@
+# ui/startup.py
+"""
+啟動時間相關工具。
+
+- 重量級模組（numpy、matplotlib、markdown2、各 plot 引擎）都改成第一次使用時才 import；
+  視窗顯示後再由 warm_up_in_background() 在背景 thread 先載入，
+  使用者第一次畫圖時就不用等
+- import_time_report()：以 `python -X importtime` 量測啟動時會載入的模組，
+  列出最慢的幾個，並與 STARTUP_BUDGET_MS 比較
+    python main.py --startup-report
+- STARTUP_TIMER：記錄 time-to-window / time-to-first-preview，
+  每次啟動附加一行 JSON 到 startup_metrics.jsonl，方便長期追蹤
+"""
+
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+# 冷啟動到視窗出現前，import 應該花的時間上限（毫秒）
+STARTUP_BUDGET_MS = 800
+
+# 啟動時間紀錄（每次啟動一行 JSON）
+METRICS_FILE = "startup_metrics.jsonl"
+
+# 啟動路徑上必須 import 的模組（main.py 在顯示視窗前會 import 的）
+STARTUP_MODULES = ("ui.ui_mainwindow", "editor")
+
+# 視窗顯示後才在背景載入
+HEAVY_MODULES = (
+    "numpy",
+    "markdown2",
+    "plot.figure_pool",
+    "plot.core_plot",
+    "plot.core_plot3d",
+    "plot.core_plot_data",
+    "plot.core_plot_func",
+    "latex.core_latex",
+)
+
+
+class StartupTimer:
+    """
+    以 main.py 最早 import 本模組的時間為 0 點，記錄各階段的毫秒數：
+      imports_done   主視窗模組 import 完成
+      window_shown   視窗顯示、event loop 開始
+      first_preview  第一次預覽載入完成（QWebEngineView.loadFinished）
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = {}
+        self.reported = False
+
+    def mark(self, name: str) -> float:
+        ms = (time.perf_counter() - self.t0) * 1000
+        self.marks.setdefault(name, ms)
+        return self.marks[name]
+
+    def report(self, path: str = METRICS_FILE) -> None:
+        """輸出到 console，並附加一行 JSON 到 path（只做一次）"""
+        if self.reported:
+            return
+        self.reported = True
+
+        summary = ", ".join(f"{k} {v:.0f} ms" for k, v in self.marks.items())
+        print(f"[startup] {summary}")
+
+        record = {"time": datetime.now().isoformat(timespec="seconds"),
+                  "frozen": bool(getattr(sys, "frozen", False))}
+        record.update({k: round(v, 1) for k, v in self.marks.items()})
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+
+STARTUP_TIMER = StartupTimer()
+
+
+def warm_up_in_background(modules=HEAVY_MODULES, on_done=None) -> threading.Thread:
+    """在 daemon thread 依序 import modules；失敗的模組略過（真正使用時才會報錯）"""
+
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+        if on_done is not None:
+            on_done()
+
+    t = threading.Thread(target=run, name="eqnote-warmup", daemon=True)
+    t.start()
+    return t
+
+
+# ---------------------------------------------------------
+# -X importtime 報告
+# ---------------------------------------------------------
+_importtime_re = re.compile(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str):
+    """
+    解析 -X importtime 的輸出，回傳 (total_us, [(cumulative_us, self_us, module), ...])。
+    total 為最外層（縮排 1 格）模組的 cumulative 總和。
+    """
+    rows = []
+    total = 0
+    for line in stderr.splitlines():
+        m = _importtime_re.match(line)
+        if not m:
+            continue
+        self_us, cum_us, indent, name = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        rows.append((cum_us, self_us, name))
+        if len(indent) <= 1:
+            total += cum_us
+    rows.sort(reverse=True)
+    return total, rows
+
+
+def import_time_report(modules=STARTUP_MODULES, top: int = 20,
+                       budget_ms: float = STARTUP_BUDGET_MS) -> str:
+    """以子行程執行 `python -X importtime -c "import ..."`，回傳文字報告"""
+    if getattr(sys, "frozen", False):
+        return ("打包版（PyInstaller）無法使用 -X importtime；"
+                "請參考啟動時輸出的 time-to-window。")
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=root, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        err = "\n".join(ln for ln in proc.stderr.splitlines()
+                        if not ln.startswith("import time:"))
+        return f"import 失敗：\n{err[-2000:]}"
+
+    total_us, rows = parse_importtime(proc.stderr)
+    total_ms = total_us / 1000
+
+    lines = [
+        f"啟動 import：{total_ms:.1f} ms（預算 {budget_ms:.0f} ms）"
+        + ("  ✔" if total_ms <= budget_ms else "  ✘ 超出預算"),
+        "",
+        f"{'cumulative(ms)':>15} {'self(ms)':>9}  module",
+    ]
+    for cum_us, self_us, name in rows[:top]:
+        lines.append(f"{cum_us / 1000:>15.1f} {self_us / 1000:>9.1f}  {name}")
+    return "\n".join(lines)
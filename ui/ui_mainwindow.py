@@ -12,15 +12,20 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import QUrl, Qt
+from PyQt5.QtCore import QUrl, Qt, QTimer
 from PyQt5.QtGui import QIcon
 import sys
 import os
+import html
 from ui.formula_menu_standard import create_formula_menu
 from renderer.html_renderer import HtmlRenderer  # ★ 新增：統一處理 Markdown + LaTeX + Plot 渲染
 from document.controller import DocumentController
 from PyQt5.QtWebChannel import QWebChannel
 from ui.web_bridge import WebBridge   # 你需要新增這個檔案
+from ui.live_preview import LivePreview
+from editor.highlighter import NoteHighlighter
+from ui.scroll_sync import ScrollSync
+from ui.startup import STARTUP_TIMER
 
 class SmartMathNote(QMainWindow):
     """
@@ -69,6 +74,8 @@ class SmartMathNote(QMainWindow):
             "\\end{bmatrix}\n"
             "$$"
         )
+        # 數學、繪圖指令、python block 上色（只重新處理被編輯到的行）
+        self.highlighter = NoteHighlighter(self.text_input.document(), dark_mode=self.is_dark)
         self._apply_textedit_theme()
 
         # Controller
@@ -85,12 +92,18 @@ class SmartMathNote(QMainWindow):
         self.btn_insert_img = QPushButton("📷")
         self.btn_toggle_theme = QPushButton("🌙")
         self.btn_refresh = QPushButton("🔄")
+        self.btn_notebook = QPushButton("📓")
+        self.btn_notebook.setCheckable(True)
+        self.btn_exec_report = QPushButton("⏱")
+        self.btn_live = QPushButton("⚡")
+        self.btn_live.setCheckable(True)
+        self.btn_live.setChecked(True)
 
         all_buttons = [
             self.btn_new, self.btn_open, self.btn_save, self.btn_save_as,
             self.btn_export_pdf,
             self.btn_insert_formula, self.btn_insert_greek, self.btn_insert_img,
-            self.btn_toggle_theme, self.btn_refresh
+            self.btn_toggle_theme, self.btn_notebook, self.btn_exec_report, self.btn_live, self.btn_refresh
         ]
 
         for btn in all_buttons:
@@ -107,6 +120,10 @@ class SmartMathNote(QMainWindow):
                     background-color: #333;
                     color: white;
                 }
+                QPushButton:checked {
+                    background-color: #2a4a6a;
+                    color: white;
+                }
             """)
 
         button_row = QHBoxLayout()
@@ -125,6 +142,16 @@ class SmartMathNote(QMainWindow):
         self.channel.registerObject("bridge", self.bridge)
         self.preview.page().setWebChannel(self.channel)
 
+        # 即時預覽：parse / 執行 / render 在 worker thread，結果回到 GUI thread 才顯示
+        self.live_preview = LivePreview(self.document_controller, self.text_input.toPlainText,
+                                        parent=self)
+        self.live_preview.ready.connect(self._apply_preview)
+        self.live_preview.failed.connect(self._on_preview_failed)
+
+        # 編輯區 ↔ 預覽捲動同步
+        self.scroll_sync = ScrollSync(self.text_input, parent=self)
+        self.bridge.set_scroll_sync(self.scroll_sync)
+
         # ======================================================
         # ③ 左側 widget（把 text_input + button_row 組起來）
         # ======================================================
@@ -159,6 +186,10 @@ class SmartMathNote(QMainWindow):
         self.btn_insert_greek.clicked.connect(self.insert_greek_symbol)
         self.btn_insert_img.clicked.connect(self.insert_image)
         self.btn_toggle_theme.clicked.connect(self.toggle_theme)
+        self.btn_notebook.toggled.connect(self.toggle_notebook_mode)
+        self.btn_exec_report.clicked.connect(self.show_execution_report)
+        self.btn_live.toggled.connect(self.toggle_live_preview)
+        self.text_input.textChanged.connect(self.live_preview.schedule)
         self.btn_refresh.clicked.connect(self.update_preview)
 
         # === 快捷鍵：Ctrl+R 更新預覽 ===
@@ -175,6 +206,9 @@ class SmartMathNote(QMainWindow):
         self.btn_insert_greek.setToolTip("插入希臘符號")
         self.btn_insert_img.setToolTip("插入圖片")
         self.btn_toggle_theme.setToolTip("切換黑/白主題")
+        self.btn_notebook.setToolTip("筆記本模式：python block 共用變數，\n只重跑改過的 block 與相依於它的 block")
+        self.btn_exec_report.setToolTip("python block 執行時間 / 記憶體報表")
+        self.btn_live.setToolTip("即時預覽：停止輸入後自動更新（背景執行，不影響打字）")
         self.btn_refresh.setToolTip("手動重新整理預覽")
 
         # ======================================================
@@ -190,15 +224,40 @@ class SmartMathNote(QMainWindow):
             activated=self.toggleReadingMode
         )
 
-        # 在 __init__ 最後（QMessageBox 之後或之前都可）
-        self.update_preview()
+        # ======================================================
+        # ⑦ 非阻塞啟動
+        # ======================================================
+        # 先載入空白頁：web engine 在背景啟動，QWebChannel / MathJax / Plotly
+        # 與下面的第一次渲染平行準備
+        shell_html, base_url = self.html_renderer.render_shell()
+        self.preview.setHtml(shell_html, base_url)
+
+        # 第一次預覽等 event loop 開始（視窗已顯示）後才做
+        self._first_preview_pending = False
+        self.preview.loadFinished.connect(self._on_preview_loaded)
+        QTimer.singleShot(0, self.update_preview)
+
+    def _on_preview_loaded(self, ok):
+        """第一次「真正內容」的預覽載入完成：記錄時間並顯示啟動訊息（非 modal）"""
+        # 空白頁被第一次預覽中斷時 ok 為 False
+        if not self._first_preview_pending or not ok:
+            return
+        self._first_preview_pending = False
+
+        STARTUP_TIMER.mark("first_preview")
+        STARTUP_TIMER.report()
 
         # === 啟動訊息 ===
-        QMessageBox.information(
-            self,
+        box = QMessageBox(
+            QMessageBox.Information,
             "EQ-Note 啟動",
-            "本軟體由 Cheng Yung-Yin 開發。\n© 2025 All rights reserved."
+            "本軟體由 Cheng Yung-Yin 開發。\n© 2025 All rights reserved.",
+            QMessageBox.Ok,
+            self
         )
+        box.setWindowModality(Qt.NonModal)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.show()
 
     # ------------------------------------------------------------------
     #  主題 / 外觀
@@ -243,6 +302,7 @@ class SmartMathNote(QMainWindow):
 
     def _apply_textedit_theme(self):
         """依照 self.is_dark 套用輸入區樣式。"""
+        self.highlighter.set_dark_mode(self.is_dark)
         if self.is_dark:
             self.text_input.setStyleSheet("""
                 QTextEdit {
@@ -266,6 +326,27 @@ class SmartMathNote(QMainWindow):
                 }
             """)
 
+    def toggle_notebook_mode(self, enabled):
+        """切換筆記本模式（共用 namespace 會清空），並重新執行預覽"""
+        self.document_controller.set_notebook_mode(enabled)
+        self.update_preview()
+
+    def toggle_live_preview(self, enabled):
+        """開關即時預覽；打開時立刻更新一次"""
+        self.live_preview.enabled = enabled
+        if enabled:
+            self.update_preview()
+
+    def show_execution_report(self):
+        """顯示目前筆記每個 python block 的執行時間與記憶體峰值（非 modal）"""
+        report = self.document_controller.execution_report()
+        box = QMessageBox(QMessageBox.NoIcon, "執行報表", "", QMessageBox.Ok, self)
+        box.setTextFormat(Qt.RichText)
+        box.setText(f"<pre>{html.escape(report)}</pre>")
+        box.setWindowModality(Qt.NonModal)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.show()
+
     def toggle_theme(self):
         """切換黑/白主題，並通知 HtmlRenderer 更新樣式。"""
         self.is_dark = not self.is_dark
@@ -284,23 +365,34 @@ class SmartMathNote(QMainWindow):
     # ------------------------------------------------------------------
 
     def update_preview(self):
-        # 1. 從 Editor 取得文字
-        # raw_text = self.editor.get_text()
-        raw_text = self.text_input.toPlainText()
-
-        # print("PREVIEW: start")
-
-        # 2. 先交給 Parser → DocumentModel
-        doc_model = self.document_controller.parse_text(raw_text)
-        # print("PREVIEW: after parse")
+        """
+        立即更新預覽（不等 debounce）。
+        parse → 執行 python block → render 都在背景 thread，完成後由 _apply_preview 顯示。
+        """
+        self.live_preview.refresh_now()
+
+    def _apply_preview(self, doc_model, html, base_url):
+        """背景產生的最新預覽：採用文件模型並顯示"""
+        self.document_controller.adopt(doc_model)
+        self.scroll_sync.set_document(doc_model)
+
+        # 第一次預覽載入完成時記錄啟動時間（見 _on_preview_loaded）
+        if "first_preview" not in STARTUP_TIMER.marks:
+            self._first_preview_pending = True
+
+        # 舊頁面的 live plot 不再存在，新頁面載入後會重新註冊
+        self.bridge.live_follower.clear()
+        self.preview.setHtml(html, base_url)
 
-        # 3. 渲染器 + 執行 python block 都交給 controller
-        html, base_url = self.document_controller.render_with_execution(doc_model)
-        # print("PREVIEW: after render_with_execution")
+        stats = self.document_controller.cache_stats()
+        self.btn_refresh.setToolTip(
+            f"更新預覽\n執行 cache：命中 {stats['hits']}、執行 {stats['misses']}、"
+            f"nocache {stats['skipped']}（{stats['entries']} 筆）"
+        )
 
-        # 4. 顯示
-        self.preview.setHtml(html, base_url)
-        # print("PREVIEW: after setHtml")
+    def _on_preview_failed(self, message):
+        """預覽失敗時保留上一次的畫面，錯誤顯示在更新按鈕的提示"""
+        self.btn_refresh.setToolTip(f"更新預覽\n上次更新失敗：{message}")
 
     # ------------------------------------------------------------------
     #  插入/選單相關
@@ -385,6 +477,7 @@ class SmartMathNote(QMainWindow):
 
         with open(self.current_file, "w", encoding="utf-8") as f:
             f.write(self.text_input.toPlainText())
+        self.document_controller.save_outputs(self.current_file)
 
         self.setWindowTitle(f"{os.path.basename(self.current_file)} - EQ-Note　by Cheng Yung-Yin")
         QMessageBox.information(self, "已儲存", f"已存檔至：\n{self.current_file}")
@@ -410,6 +503,7 @@ class SmartMathNote(QMainWindow):
 
         with open(self.current_file, "w", encoding="utf-8") as f:
             f.write(text)
+        self.document_controller.save_outputs(self.current_file)
 
         self.text_input.setPlainText(text)
         self.setWindowTitle(f"{filename} - EQ-Note　by Cheng Yung-Yin")
@@ -427,7 +521,11 @@ class SmartMathNote(QMainWindow):
             return
 
         with open(path, "r", encoding="utf-8") as f:
-            self.text_input.setPlainText(f.read())
+            text = f.read()
+
+        # 上次存檔時的 block 輸出：程式碼沒變的 block 直接顯示，不重新執行
+        self.document_controller.restore_outputs(path)
+        self.text_input.setPlainText(text)
 
         self.current_file = path
         self.setWindowTitle(f"{os.path.basename(self.current_file)} - EQ-Note　by Cheng Yung-Yin")
@@ -446,6 +544,30 @@ class SmartMathNote(QMainWindow):
         if not path.lower().endswith(".pdf"):
             path += ".pdf"
 
+        doc_model = self.document_controller.doc_model
+        if doc_model is None or not self.html_renderer.is_virtual(doc_model):
+            self._print_pdf(path)
+            return
+
+        # 虛擬化預覽只載入了畫面附近的 block：先完整渲染一次，排版完成後再輸出
+        def on_loaded(ok):
+            self.preview.loadFinished.disconnect(on_loaded)
+            self._print_pdf_when_typeset(path)
+
+        html_text, base_url = self.html_renderer.render(doc_model, virtual=False)
+        self.preview.loadFinished.connect(on_loaded)
+        self.preview.setHtml(html_text, base_url)
+
+    def _print_pdf_when_typeset(self, path, tries=0):
+        """等 MathJax 排版完成（最多約 30 秒）再輸出 PDF"""
+        def check(done):
+            if done or tries >= 150:
+                self._print_pdf(path)
+            else:
+                QTimer.singleShot(200, lambda: self._print_pdf_when_typeset(path, tries + 1))
+        self.preview.page().runJavaScript("window.typesetDone === true", check)
+
+    def _print_pdf(self, path):
         self.preview.page().printToPdf(path)
         QMessageBox.information(self, "匯出成功", f"PDF 已輸出至：\n{path}")
 
@@ -453,12 +575,18 @@ class SmartMathNote(QMainWindow):
     #  事件過濾（快捷鍵）
     # ------------------------------------------------------------------
 
+    def closeEvent(self, event):
+        """關閉前停止即時預覽，並等背景的更新做完（避免 thread 還在用 renderer / executor）"""
+        self.live_preview.stop()
+        self.document_controller.executor.interrupt()
+        self.live_preview.wait()
+        super().closeEvent(event)
+
     def eventFilter(self, obj, event):
         """攔截 Ctrl+R，做為『更新預覽』快捷鍵。"""
         if obj == self.text_input and event.type() == event.KeyPress:
             if event.modifiers() == Qt.ControlModifier and event.key() == Qt.Key_R:
                 self.update_preview()
-                QMessageBox.information(self, "已更新", "手動更新預覽完成。")
                 return True  # 阻止事件繼續傳遞
 
         return super().eventFilter(obj, event)
@@ -1,14 +1,199 @@
-from PyQt5.QtCore import QObject, pyqtSlot, pyqtSignal
+import html
+import json
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSlot, pyqtSignal
+
+from executor.output_capture import ExecutionResult
+from executor.profiling import format_stats
+from renderer.element_renderer import render_output
+from ui.live_follower import LiveDataFollower
+
+
+class _JobSignals(QObject):
+    started = pyqtSignal(str)           # elem_id：kernel 真正開始執行（不含排隊等待）
+    progress = pyqtSignal(str, str)     # (elem_id, 新的輸出文字)
+    # (elem_id, 完整輸出)；object 才能保留 ExecutionResult 的 spill_path / stats
+    # （宣告成 str 會在跨 thread 時轉成單純的 str）
+    finished = pyqtSignal(str, object)
+
+
+class _BlockJob(QRunnable):
+    """在 worker thread 執行一個 python block（kernel 會序列化實際的執行）"""
+
+    def __init__(self, controller, elem_id):
+        super().__init__()
+        self.setAutoDelete(False)       # 排隊中的 job 要能被 tryTake 取消
+        self.controller = controller
+        self.elem_id = elem_id
+        self.signals = _JobSignals()
+
+    def run(self):
+        output = ""
+        try:
+            output = self.controller.execute_block(
+                self.elem_id,
+                on_output=lambda text: self.signals.progress.emit(self.elem_id, text),
+                # 筆記本模式：downstream block 跟著重跑，結果一併送回頁面
+                on_dependent=self.signals.finished.emit,
+                on_start=lambda: self.signals.started.emit(self.elem_id),
+            )
+        except Exception as e:
+            output = ExecutionResult(f"Error:\n{type(e).__name__}: {e}")
+        finally:
+            # 一定要送出：WebBridge 靠它把 job 從 _jobs 移除
+            self.signals.finished.emit(self.elem_id, output)
+
+
+class _RenderSignals(QObject):
+    finished = pyqtSignal(str)          # {elem_id: HTML} 的 JSON
+
+
+class _RenderJob(QRunnable):
+    """虛擬化預覽：在 worker thread 產生一批 block 的 HTML"""
+
+    def __init__(self, renderer, elem_ids):
+        super().__init__()
+        self.setAutoDelete(False)       # 結果送回前 WebBridge 仍持有這個 job
+        self.renderer = renderer
+        self.elem_ids = elem_ids
+        self.signals = _RenderSignals()
+
+    def run(self):
+        try:
+            blocks = self.renderer.render_blocks(self.elem_ids)
+        except Exception as e:
+            message = html.escape(f"{type(e).__name__}: {e}")
+            blocks = {i: f'<pre style="color:red;">預覽錯誤：{message}</pre>' for i in self.elem_ids}
+        self.signals.finished.emit(json.dumps(blocks))
 
 
 class WebBridge(QObject):
 
-    executionFinished = pyqtSignal(str, str)
+    # (elem_id, 狀態)：queued / running / done / cancelled
+    executionStarted = pyqtSignal(str, str)
+    executionProgress = pyqtSignal(str, str)    # (elem_id, 新的輸出文字，純文字)
+    executionFinished = pyqtSignal(str, str)    # (elem_id, 輸出 HTML)
+    executionStats = pyqtSignal(str, str)       # (elem_id, 執行時間 / 記憶體摘要)
+    liveRows = pyqtSignal(str, str)     # plot_data(..., live)：(div_id, payload JSON)
+    scrollPreview = pyqtSignal(str, float)     # 編輯區捲動：(elem_id, element 內的比例)
+    blocksReady = pyqtSignal(str)              # 虛擬化預覽：{elem_id: HTML} 的 JSON
+
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
 
+        # block 依序排隊執行：一個 thread 就夠（kernel 同時只跑一段 code）
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._jobs = {}      # elem_id → _BlockJob（排隊中或執行中）
+
+        # 虛擬化預覽的 block HTML 另用一個 thread（不必等 python block 執行完）
+        self.render_pool = QThreadPool(self)
+        self.render_pool.setMaxThreadCount(1)
+        self._render_jobs = set()
+
+        self.live_follower = LiveDataFollower(parent=self)
+        self.live_follower.rowsAppended.connect(self.liveRows)
+
+        # 捲動同步（ui.scroll_sync.ScrollSync），由主視窗設定
+        self.scroll_sync = None
+
+    def set_scroll_sync(self, scroll_sync) -> None:
+        self.scroll_sync = scroll_sync
+        scroll_sync.previewTarget.connect(self.scrollPreview)
+
+    # ---------- python block ----------
+
     @pyqtSlot(str)
     def runBlock(self, elem_id):
-        output = self.controller.execute_block(elem_id)
-        self.executionFinished.emit(elem_id, output)
+        """非同步執行：立即回傳，狀態與輸出由 signal 陸續送回頁面"""
+        if elem_id in self._jobs:
+            return
+        job = _BlockJob(self.controller, elem_id)
+        job.signals.started.connect(lambda i: self.executionStarted.emit(i, "running"))
+        job.signals.progress.connect(self.executionProgress)
+        job.signals.finished.connect(self._on_job_finished)
+        self._jobs[elem_id] = job
+        self.executionStarted.emit(elem_id, "queued")
+        self.pool.start(job)
+
+    @pyqtSlot(str)
+    def cancelBlock(self, elem_id):
+        """排隊中：直接取消；執行中：中斷 kernel（只在 kernel 正在跑這個 block 時）"""
+        job = self._jobs.get(elem_id)
+        if job is None:
+            return
+        if self.pool.tryTake(job):
+            del self._jobs[elem_id]
+            self.executionStarted.emit(elem_id, "cancelled")
+        else:
+            self.controller.executor.interrupt(elem_id)
+
+    def _on_job_finished(self, elem_id, output):
+        self._jobs.pop(elem_id, None)
+        self.executionFinished.emit(elem_id, render_output(elem_id, output))
+        stats = getattr(output, "stats", None)
+        if stats:
+            # 沒有量測結果（例如找不到 block）時保留原本的摘要
+            self.executionStats.emit(elem_id, format_stats(stats))
+        self.executionStarted.emit(elem_id, "done")
+
+    @pyqtSlot(str, int, result=str)
+    def fetchOutputPage(self, elem_id, page):
+        """「顯示更多」：取回 block 完整輸出的第 page 頁（JSON：text / page / pages）"""
+        try:
+            text, pages = self.controller.output_page(elem_id, page)
+        except (KeyError, OSError) as e:
+            return json.dumps({"error": f"無法讀取完整輸出：{e}"})
+        return json.dumps({"text": text, "page": page, "pages": pages})
+
+    @pyqtSlot(result=str)
+    def executionReport(self):
+        """每個 block 的執行時間 / 記憶體報表（文字）"""
+        return self.controller.execution_report()
+
+    @pyqtSlot(result=str)
+    def cacheStats(self):
+        """執行結果 cache 的統計（JSON）"""
+        return json.dumps(self.controller.cache_stats())
+
+    @pyqtSlot(str, float, float, int, result=str)
+    def fetchPlotRange(self, filepath, x0, x1, budget):
+        """plot_data zoom 時取回 [x0, x1] 範圍的細節（JSON）"""
+        from plot.core_plot_data import PlotDataEngine
+        try:
+            return PlotDataEngine.range_json(filepath, x0, x1, budget)
+        except Exception as e:
+            return '{"traces": [], "error": %s}' % json.dumps(str(e))
+
+    # ---------- 虛擬化預覽 ----------
+
+    @pyqtSlot(str)
+    def requestBlocks(self, ids_json):
+        """網頁要求一批接近畫面的 block（JSON 陣列）；HTML 由 blocksReady 送回"""
+        job = _RenderJob(self.controller.html_renderer, json.loads(ids_json))
+        job.signals.finished.connect(self.blocksReady)
+        job.signals.finished.connect(lambda _, job=job: self._render_jobs.discard(job))
+        self._render_jobs.add(job)
+        self.render_pool.start(job)
+
+    # ---------- 捲動同步 ----------
+
+    @pyqtSlot(str, float)
+    def previewScrolled(self, elem_id, fraction):
+        """預覽捲動（網頁端已節流）：編輯區捲到對應的行"""
+        if self.scroll_sync is not None:
+            self.scroll_sync.sync_editor(elem_id, fraction)
+
+    @pyqtSlot(result=str)
+    def scrollTarget(self):
+        """預覽載入後取回編輯區目前的位置（JSON：id / fraction）"""
+        if self.scroll_sync is None or not self.scroll_sync.enabled:
+            return json.dumps({"id": None})
+        elem_id, fraction = self.scroll_sync.preview_target()
+        return json.dumps({"id": elem_id, "fraction": fraction})
+
+    @pyqtSlot(str, str, int, int, int)
+    def followFile(self, div_id, filepath, offset, ncol, window):
+        """plot_data(..., live) 的圖載入後註冊，之後新增的列由 liveRows 推送"""
+        self.live_follower.follow(div_id, filepath, offset, ncol, window)